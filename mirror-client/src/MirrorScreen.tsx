@@ -11,6 +11,7 @@ import { QuotesWidget } from "./components/widgets/QuotesWidget";
 import { AlarmsWidget } from "./components/widgets/AlarmsWidget";
 
 import { defaultConfig, API_BASE_URL } from "./config";
+import { useServerEvents } from "./hooks/useServerEvents";
 import type {
   MirrorConfig,
   FontStyle,
@@ -274,8 +275,22 @@ export const MirrorScreen: React.FC = () => {
     useState<ZoServerStatus | null>(null);
   const [liveWeather, setLiveWeather] = useState<LiveWeather | null>(null);
 
-  // Poll /config every 5 seconds
+  // Live updates pushed by the backend (config + Zo state)
+  const streaming = useServerEvents({
+    snapshot: (data) => {
+      if (data?.config?.config) setConfig(data.config.config);
+      if (data?.zo_state) setZoServerStatus(data.zo_state);
+    },
+    config: (data) => {
+      if (data?.config) setConfig(data.config);
+    },
+    zo_state: (data) => setZoServerStatus(data),
+  });
+
+  // Fallback: poll /config every 5 seconds while the event stream is down
   useEffect(() => {
+    if (streaming) return;
+
     let isMounted = true;
 
     async function load() {
@@ -296,10 +311,12 @@ export const MirrorScreen: React.FC = () => {
       isMounted = false;
       window.clearInterval(id);
     };
-  }, []);
+  }, [streaming]);
 
-  // Poll Zo server state
+  // Fallback: poll Zo server state while the event stream is down
   useEffect(() => {
+    if (streaming) return;
+
     const id = window.setInterval(async () => {
       try {
         const res = await fetch(`${API_BASE_URL}/zo/state`);
@@ -312,7 +329,7 @@ export const MirrorScreen: React.FC = () => {
     }, 1500);
 
     return () => window.clearInterval(id);
-  }, []);
+  }, [streaming]);
 
   const display = config.display ?? defaultConfig.display;
   const isSleeping = !!(display as any).sleepMode;
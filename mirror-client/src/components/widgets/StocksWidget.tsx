@@ -22,6 +22,17 @@ type HistoryPoint = {
 
 type HistoryMap = Record<string, HistoryPoint[]>;
 
+// Server sends nextRefreshAt (market-hours aware); clamp it so a bad clock
+// can't hammer the API or freeze the widget for days.
+const MIN_REFRESH_MS = 60_000;
+const MAX_REFRESH_MS = 6 * 60 * 60 * 1000;
+
+function delayUntil(nextRefreshAt?: string | null): number {
+  const at = nextRefreshAt ? Date.parse(nextRefreshAt) : NaN;
+  if (Number.isNaN(at)) return MIN_REFRESH_MS;
+  return Math.min(MAX_REFRESH_MS, Math.max(MIN_REFRESH_MS, at - Date.now()));
+}
+
 export const StocksWidget: React.FC<Props> = ({ items }) => {
   const baseItems: StockItem[] =
     items && items.length ? items : defaultConfig.stocksItems ?? [];
@@ -41,8 +52,10 @@ export const StocksWidget: React.FC<Props> = ({ items }) => {
     }
 
     let cancelled = false;
+    let timer: number | undefined;
 
     async function load() {
+      let nextDelay = MIN_REFRESH_MS;
       try {
         setLoading(true);
         const symbols = baseItems.map((s) => s.symbol).join(",");
@@ -55,6 +68,7 @@ export const StocksWidget: React.FC<Props> = ({ items }) => {
         );
         if (!resQuotes.ok) throw new Error(`quotes HTTP ${resQuotes.status}`);
         const dataQuotes = await resQuotes.json();
+        nextDelay = delayUntil(dataQuotes.nextRefreshAt);
 
         const map: Record<string, Quote> = {};
         for (const q of dataQuotes.items ?? []) {
@@ -97,16 +111,19 @@ export const StocksWidget: React.FC<Props> = ({ items }) => {
       } catch (err) {
         console.error("[StocksWidget] failed to load quotes/history", err);
       } finally {
-        if (!cancelled) setLoading(false);
+        if (!cancelled) {
+          setLoading(false);
+          // every minute in session; overnight / weekends: next session
+          timer = window.setTimeout(load, nextDelay);
+        }
       }
     }
 
     load();
-    const id = window.setInterval(load, 60_000); // refresh every minute
 
     return () => {
       cancelled = true;
-      window.clearInterval(id);
+      window.clearTimeout(timer);
     };
   }, [symbolKey]);
 
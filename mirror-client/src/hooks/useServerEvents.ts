@@ -0,0 +1,108 @@
+import { useEffect, useRef, useState } from "react";
+import { API_BASE_URL } from "../config";
+
+// Event names pushed by the backend on GET /events
+export type ServerEventName = "snapshot" | "config" | "zo_state" | "widget_state";
+
+export type ServerEventHandlers = Partial<Record<ServerEventName, (data: any) => void>>;
+
+const EVENT_NAMES: ServerEventName[] = ["snapshot", "config", "zo_state", "widget_state"];
+
+type Subscriber = {
+  handlers: { current: ServerEventHandlers };
+  setConnected: (connected: boolean) => void;
+};
+
+// One EventSource for the whole page, shared by every useServerEvents()
+// caller; opened by the first subscriber, closed when the last one leaves.
+const subscribers = new Set<Subscriber>();
+let source: EventSource | null = null;
+let connected = false;
+// Last snapshot plus the newest event per topic since, replayed to hooks
+// that subscribe after the stream is already open (every event carries
+// the full state for its topic).
+let latest: Partial<Record<ServerEventName, any>> = {};
+
+function deliver(subscriber: Subscriber, name: ServerEventName, data: any) {
+  const handler = subscriber.handlers.current[name];
+  if (!handler) return;
+  try {
+    handler(data);
+  } catch (e) {
+    console.error(`[useServerEvents] ${name} handler failed`, e);
+  }
+}
+
+function setAllConnected(value: boolean) {
+  connected = value;
+  subscribers.forEach((s) => s.setConnected(value));
+}
+
+function open() {
+  source = new EventSource(`${API_BASE_URL}/events`);
+
+  EVENT_NAMES.forEach((name) => {
+    source!.addEventListener(name, ((ev: MessageEvent) => {
+      let data: any;
+      try {
+        data = JSON.parse(ev.data);
+      } catch (e) {
+        console.error(`[useServerEvents] bad ${name} event`, e);
+        return;
+      }
+      latest = name === "snapshot" ? { snapshot: data } : { ...latest, [name]: data };
+      subscribers.forEach((s) => deliver(s, name, data));
+    }) as EventListener);
+  });
+
+  source.onopen = () => setAllConnected(true);
+  source.onerror = () => setAllConnected(false);
+}
+
+function subscribe(subscriber: Subscriber): () => void {
+  subscribers.add(subscriber);
+  if (source === null) {
+    open();
+  } else if (connected) {
+    subscriber.setConnected(true);
+    EVENT_NAMES.forEach((name) => {
+      if (name in latest) deliver(subscriber, name, latest[name]);
+    });
+  }
+
+  return () => {
+    subscribers.delete(subscriber);
+    if (subscribers.size === 0 && source !== null) {
+      source.close();
+      source = null;
+      connected = false;
+      latest = {};
+    }
+  };
+}
+
+/**
+ * Subscribe to the backend's Server-Sent Events stream.
+ *
+ * All callers share one EventSource; each gets the topics it has
+ * handlers for. EventSource reconnects on its own and sends
+ * Last-Event-ID, so the server can replay what we missed (or send a
+ * fresh "snapshot").
+ * Returns whether the stream is currently open, so callers can fall back
+ * to polling while it is down.
+ */
+export function useServerEvents(handlers: ServerEventHandlers): boolean {
+  const [isConnected, setConnected] = useState(false);
+  const handlersRef = useRef(handlers);
+
+  useEffect(() => {
+    handlersRef.current = handlers;
+  });
+
+  useEffect(() => {
+    if (typeof EventSource === "undefined") return;
+    return subscribe({ handlers: handlersRef, setConnected });
+  }, []);
+
+  return isConnected;
+}
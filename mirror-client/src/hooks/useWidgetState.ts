@@ -1,11 +1,20 @@
 import { useEffect, useState } from "react";
+import { useServerEvents } from "./useServerEvents";
 
 export type WidgetState = Record<string, any>;
 
+// Pushed over /events; polling only runs while the stream is down.
 export function useWidgetState(pollIntervalMs: number = 3000) {
   const [widgetState, setWidgetState] = useState<WidgetState>({});
 
+  const streaming = useServerEvents({
+    snapshot: (data) => setWidgetState(data?.widget_state?.state ?? {}),
+    widget_state: (data) => setWidgetState(data?.state ?? {}),
+  });
+
   useEffect(() => {
+    if (streaming) return;
+
     let isMounted = true;
 
     async function fetchState() {
@@ -26,8 +35,7 @@ export function useWidgetState(pollIntervalMs: number = 3000) {
       isMounted = false;
       clearInterval(id);
     };
-  }, [pollIntervalMs]);
+  }, [pollIntervalMs, streaming]);
 
   return widgetState;
 }
-
@@ -1,28 +1,67 @@
 # mirror-server/app/actions.py
 from __future__ import annotations
 
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
-from .config_store import load_config, save_config
-from .models import MirrorConfig
-from .widget_store import widget_state
+from .config_store import config_transaction, load_config
+from .config_patch import apply_merge_patch
+from .widget_store import widget_state, set_widget_state, replace_widget_state
 from .os_modes import apply_mode
 
 
 def _save_cfg_dict_patch(patch: Dict[str, Any]) -> None:
     """
-    Safely patch config by dumping -> editing dict -> rehydrating MirrorConfig.
+    Merge-patch the config inside a transaction (only the touched sections
+    are re-validated on commit; joins an enclosing execute_actions batch).
     """
-    cfg = load_config()
-    data = cfg.model_dump()
+    with config_transaction() as tx:
+        tx.data = apply_merge_patch(tx.data, patch)
 
-    for k, v in patch.items():
-        if isinstance(v, dict) and isinstance(data.get(k), dict):
-            data[k] = {**(data.get(k, {}) or {}), **v}
-        else:
-            data[k] = v
 
-    save_config(MirrorConfig(**data))
+def _fetch_quote(categories: Optional[List[str]] = None) -> Dict[str, Any]:
+    from .services_quotes import fetch_random_quote
+
+    if categories is None:
+        categories = load_config().quotesCategories
+    return fetch_random_quote(categories, fresh=True)
+
+
+def _prefetch_quotes(actions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Fetch the quote for each refresh_quote action up front, so the network
+    call never runs while the batch holds the config lock; the action then
+    only applies it ("_quote" in its payload).
+    """
+    categories: Optional[List[str]] = None
+    out: List[Dict[str, Any]] = []
+    for action in actions:
+        payload = action.get("payload", {}) or {}
+        if action.get("type") == "set_quote_categories" and isinstance(payload.get("categories"), list):
+            # a refresh later in the same batch uses the new categories
+            categories = payload["categories"]
+        elif action.get("type") == "refresh_quote" and "_quote" not in payload:
+            action = {**action, "payload": {**payload, "_quote": _fetch_quote(categories)}}
+        out.append(action)
+    return out
+
+
+def execute_actions(actions: List[Dict[str, Any]]) -> None:
+    """
+    Run a batch of {"type": ..., "payload": ...} actions as one transaction:
+    the config is loaded once, patched in memory, validated once and saved
+    once. If any action fails, nothing is persisted and widget_state is
+    restored before the error is re-raised.
+    """
+    actions = _prefetch_quotes(actions)
+    widget_backup = dict(widget_state)
+    try:
+        with config_transaction():
+            for action in actions:
+                execute_action(action["type"], action.get("payload", {}) or {})
+    except Exception:
+        if widget_state != widget_backup:
+            replace_widget_state(widget_backup)
+        raise
 
 
 def execute_action(action_type: str, payload: Dict[str, Any]) -> None:
@@ -37,7 +76,7 @@ def execute_action(action_type: str, payload: Dict[str, Any]) -> None:
         widget = payload.get("widget")
         data = payload.get("data", {})
         if widget:
-            widget_state[widget] = data
+            set_widget_state(widget, data)
             print(f"[AGENT UPDATE_WIDGET] {widget} -> {data}")
         return
 
@@ -64,13 +103,11 @@ def execute_action(action_type: str, payload: Dict[str, Any]) -> None:
         if not widget or not isinstance(enabled, bool):
             return
 
-        cfg = load_config()
-        data = cfg.model_dump()
-        widgets = dict(data.get("widgets") or {})
-        widgets[widget] = enabled
-        data["widgets"] = widgets
+        with config_transaction() as tx:
+            widgets = dict(tx.data.get("widgets") or {})
+            widgets[widget] = enabled
+            tx.data["widgets"] = widgets
 
-        save_config(MirrorConfig(**data))
         print(f"[AGENT WIDGET] {widget} -> {'ON' if enabled else 'OFF'}")
         return
 
@@ -80,16 +117,15 @@ def execute_action(action_type: str, payload: Dict[str, Any]) -> None:
         if not isinstance(widgets_patch, dict):
             return
 
-        cfg = load_config()
-        data = cfg.model_dump()
-        widgets = dict(data.get("widgets") or {})
+        with config_transaction() as tx:
+            widgets = dict(tx.data.get("widgets") or {})
+
+            for k, v in widgets_patch.items():
+                if isinstance(v, bool):
+                    widgets[str(k)] = v
 
-        for k, v in widgets_patch.items():
-            if isinstance(v, bool):
-                widgets[str(k)] = v
+            tx.data["widgets"] = widgets
 
-        data["widgets"] = widgets
-        save_config(MirrorConfig(**data))
         print(f"[AGENT WIDGETS] bulk -> {widgets_patch}")
         return
 
@@ -143,27 +179,20 @@ def execute_action(action_type: str, payload: Dict[str, Any]) -> None:
         if not isinstance(categories, list):
             return
 
-        cfg = load_config()
-        data = cfg.model_dump()
-        data["quotesCategories"] = categories
+        with config_transaction() as tx:
+            tx.data["quotesCategories"] = categories
 
-        save_config(MirrorConfig(**data))
         print(f"[AGENT QUOTES] categories -> {categories}")
         return
 
     # ---------------- REFRESH QUOTE ----------------
     if action_type == "refresh_quote":
-        from .services_quotes import fetch_random_quote
-
-        cfg = load_config()
-        data = cfg.model_dump()
-
-        categories = data.get("quotesCategories", ["inspirational", "wisdom"])
-        new_quote = fetch_random_quote(categories)
+        # Fetched before taking the config lock (see _prefetch_quotes)
+        new_quote = payload["_quote"] if "_quote" in payload else _fetch_quote()
 
         if new_quote:
-            data["currentQuote"] = new_quote
-            save_config(MirrorConfig(**data))
+            with config_transaction() as tx:
+                tx.data["currentQuote"] = new_quote
             print(f"[AGENT QUOTES] refreshed quote")
         return
 
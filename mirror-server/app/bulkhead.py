@@ -0,0 +1,117 @@
+# mirror-server/app/bulkhead.py
+
+"""
+Bulkheads: small dedicated thread pools per subsystem, so slow work in
+one can't starve the others (or the shared anyio pool that FastAPI runs
+the remaining sync routes on).
+
+  upstream     routes that block on providers (/api/mirror/snapshot,
+               /api/context/full, agent utterances)
+  voice        /zo/talk: record -> STT -> chat -> TTS, one turn at a time
+  persistence  config writes (POST / PATCH /config, /os/mode)
+
+Each pool admits at most max_workers running + max_queue waiting calls;
+anything beyond that is rejected at once with BulkheadFull, which main.py
+turns into 503 + Retry-After instead of letting requests pile up.
+
+The per-symbol stock fan-out and cache refreshes keep their own bounded
+pools (services_stocks, ttl_cache); a snapshot running here submits to
+those, so sharing one pool could deadlock.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class BulkheadFull(Exception):
+    def __init__(self, name: str, retry_after: float) -> None:
+        super().__init__(f"{name} is busy, try again in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class Bulkhead:
+    def __init__(self, name: str, max_workers: int, max_queue: int, retry_after: float) -> None:
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"bulkhead-{name}")
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._active = 0
+        self.completed = 0
+        self.rejected = 0
+        _registry[name] = self
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Queue fn(*args, **kwargs) or raise BulkheadFull right away."""
+        with self._lock:
+            if self._admitted >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise BulkheadFull(self.name, self.retry_after)
+            self._admitted += 1
+
+        # Carry contextvars (e.g. rate-limit priority) into the worker
+        ctx = contextvars.copy_context()
+
+        def call() -> Any:
+            with self._lock:
+                self._active += 1
+            try:
+                return ctx.run(fn, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+
+        try:
+            future = self._executor.submit(call)
+        except BaseException:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, _future: Any) -> None:
+        with self._lock:
+            self._admitted -= 1
+            self.completed += 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Await fn(*args, **kwargs) on this pool (async route handlers)."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "maxWorkers": self.max_workers,
+                "maxQueue": self.max_queue,
+                "active": self._active,
+                "queued": self._admitted - self._active,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+_registry: Dict[str, Bulkhead] = {}
+
+upstream = Bulkhead("upstream", max_workers=8, max_queue=16, retry_after=5)
+voice = Bulkhead("voice", max_workers=1, max_queue=1, retry_after=30)
+persistence = Bulkhead("persistence", max_workers=2, max_queue=32, retry_after=1)
+
+
+def shutdown() -> None:
+    for bulkhead in _registry.values():
+        bulkhead.shutdown()
+
+
+def stats() -> Dict[str, Any]:
+    return {name: bulkhead.stats() for name, bulkhead in _registry.items()}
@@ -0,0 +1,362 @@
+# mirror-server/app/candle_store.py
+
+"""
+Local, append-only OHLCV candle store for stock history.
+
+One series per (symbol, resolution), held as NumPy column arrays. On
+disk each series is a compacted .npz base (atomic write) plus a .bars
+log of fixed-size records: a merge only appends the bars that changed
+(a few dozen bytes per refresh instead of rewriting the whole file),
+and the log is folded into the base every COMPACT_AFTER_BARS records
+or when a backfill moves covered_from. Replaying the log on load lets
+later records win, so a re-fetched, still-moving bar is just appended
+again. services_stocks only asks Finnhub for bars after the last stored
+one (re-fetching that last bar), and any `points` window is a slice.
+
+Series are immutable Candles objects; merge() swaps in a new one, so
+readers never see half-updated columns.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .persistence import atomic_write_bytes
+
+CANDLE_DIR = Path(os.getenv("MAISON_CANDLE_DIR", str(Path(__file__).with_name("candles"))))
+
+COLUMNS = ("t", "o", "h", "l", "c", "v")
+
+# One .bars log record per bar
+LOG_RECORD = np.dtype([(k, "<i8" if k == "t" else "<f8") for k in COLUMNS])
+
+# Log records before the next merge rewrites the .npz base
+COMPACT_AFTER_BARS = 2000
+
+Key = Tuple[str, str]  # (symbol, resolution)
+
+
+@dataclass(frozen=True)
+class Candles:
+    t: np.ndarray  # int64 unix seconds, ascending, unique
+    o: np.ndarray  # float64
+    h: np.ndarray
+    l: np.ndarray  # noqa: E741
+    c: np.ndarray
+    v: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.t.shape[0])
+
+    @property
+    def last_t(self) -> Optional[int]:
+        return int(self.t[-1]) if len(self) else None
+
+    def tail(self, n: int) -> "Candles":
+        return self.slice(max(0, len(self) - n), len(self))
+
+    def slice(self, start: int, stop: int) -> "Candles":
+        return Candles(*(getattr(self, k)[start:stop] for k in COLUMNS))
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {k: getattr(self, k) for k in COLUMNS}
+
+    @classmethod
+    def empty(cls) -> "Candles":
+        return cls(np.empty(0, np.int64), *(np.empty(0, np.float64) for _ in COLUMNS[1:]))
+
+    @classmethod
+    def from_columns(cls, cols: Dict[str, Any]) -> "Candles":
+        t = np.asarray(cols["t"], dtype=np.int64)
+        rest = [np.asarray(cols.get(k, np.full(t.shape, np.nan)), dtype=np.float64) for k in COLUMNS[1:]]
+        return cls(t, *rest)
+
+    @classmethod
+    def from_finnhub(cls, data: Dict[str, Any]) -> "Candles":
+        """
+        Finnhub /stock/candle payload {"s": "ok", "t": [...], "o": [...], ...}.
+        Rows with a missing timestamp or close are dropped; output is sorted.
+        """
+        if (data.get("s") or "").lower() != "ok" or not data.get("t"):
+            return cls.empty()
+
+        n = len(data["t"])
+        raw = {}
+        for k in COLUMNS:
+            col = data.get(k) or []
+            if len(col) != n:
+                col = [None] * n
+            # None -> nan
+            raw[k] = np.array(col, dtype=np.float64)
+
+        keep = ~(np.isnan(raw["t"]) | np.isnan(raw["c"]))
+        order = np.argsort(raw["t"][keep], kind="stable")
+        cols = {k: v[keep][order] for k, v in raw.items()}
+        cols["t"] = cols["t"].astype(np.int64)
+        return cls.from_columns(cols)
+
+
+def merge_candles(old: Candles, new: Candles) -> Candles:
+    """
+    Union of two series by timestamp; `new` wins on overlap.
+    Fast path (the normal incremental fetch): `new` runs to or past the
+    stored end, so it replaces everything from its first bar on.
+    """
+    if not len(new):
+        return old
+    if not len(old):
+        return new
+
+    if new.t[-1] >= old.t[-1]:
+        cut = int(np.searchsorted(old.t, new.t[0], side="left"))
+        return Candles(*(np.concatenate((getattr(old, k)[:cut], getattr(new, k))) for k in COLUMNS))
+
+    # Backfill / out-of-order: new first so np.unique keeps its rows.
+    t_all = np.concatenate((new.t, old.t))
+    _, idx = np.unique(t_all, return_index=True)
+    return Candles(*(np.concatenate((getattr(new, k), getattr(old, k)))[idx] for k in COLUMNS))
+
+
+def _last_per_timestamp(candles: Candles) -> Candles:
+    """Sorted, one row per timestamp; the latest row wins (log replay)."""
+    rev = candles.t[::-1]
+    _, idx = np.unique(rev, return_index=True)
+    rows = len(candles) - 1 - idx
+    return Candles(*(getattr(candles, k)[rows] for k in COLUMNS))
+
+
+def _changed_rows(old: Candles, bars: Candles) -> Candles:
+    """Rows of `bars` that aren't already stored in `old` as-is."""
+    idx = np.minimum(np.searchsorted(old.t, bars.t), max(len(old) - 1, 0))
+    same = np.zeros(len(bars), dtype=bool)
+    if len(old):
+        same = old.t[idx] == bars.t
+        for k in COLUMNS[1:]:
+            a, b = getattr(old, k)[idx], getattr(bars, k)
+            same &= (a == b) | (np.isnan(a) & np.isnan(b))
+    keep = np.flatnonzero(~same)
+    return Candles(*(getattr(bars, k)[keep] for k in COLUMNS))
+
+
+def rollup(candles: Candles, seconds: int, anchor: int = 0) -> Candles:
+    """
+    Aggregate bars into `seconds`-wide buckets (e.g. 1m -> 5m / 15m / 1h):
+    first open, max high, min low, last close, summed volume.
+    Buckets start at `anchor` (mod `seconds`), e.g. 09:30 for hourly bars.
+    Input must be sorted (store series always are).
+    """
+    if not len(candles):
+        return candles
+
+    bucket = (candles.t - anchor) // seconds * seconds + anchor
+    # start index of each bucket; bucket ids are non-decreasing
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(candles)] - 1
+
+    return Candles(
+        t=bucket[starts],
+        o=candles.o[starts],
+        h=np.maximum.reduceat(candles.h, starts),
+        l=np.minimum.reduceat(candles.l, starts),
+        c=candles.c[ends],
+        v=np.add.reduceat(np.nan_to_num(candles.v), starts),
+    )
+
+
+def _same(a: Candles, b: Candles) -> bool:
+    return len(a) == len(b) and all(
+        np.array_equal(getattr(a, k), getattr(b, k), equal_nan=True) for k in COLUMNS
+    )
+
+
+_SAFE = re.compile(r"[^A-Za-z0-9.\-^=]")
+
+
+class CandleStore:
+    def __init__(self, directory: Path = CANDLE_DIR) -> None:
+        self.directory = Path(directory)
+        self._lock = threading.RLock()
+        self._series: Dict[Key, Candles] = {}
+        # Earliest timestamp we've asked upstream for; older gaps need a backfill.
+        self._covered_from: Dict[Key, Optional[int]] = {}
+        self._loaded: set = set()
+        # Records in each series' .bars log since the last compaction
+        self._log_rows: Dict[Key, int] = {}
+        # Bumped on every change to any series (memo key for analytics).
+        self.version = 0
+        self.bytes_written = 0
+        self.saves = 0
+        self.appends = 0
+
+    def _path(self, key: Key, suffix: str = ".npz") -> Path:
+        symbol, resolution = key
+        return self.directory / f"{_SAFE.sub('_', symbol)}_{_SAFE.sub('_', resolution)}{suffix}"
+
+    def _load(self, key: Key) -> None:
+        # caller holds self._lock
+        self._loaded.add(key)
+        path = self._path(key)
+        if path.exists():
+            try:
+                with np.load(path) as npz:
+                    self._series[key] = Candles.from_columns({k: npz[k] for k in COLUMNS})
+                    covered = int(npz["covered_from"]) if "covered_from" in npz.files else -1
+                    self._covered_from[key] = covered if covered >= 0 else None
+            except Exception as e:
+                print(f"[CANDLES] Could not load {path.name}, starting empty: {e}")
+        self._replay_log(key)
+
+    def _replay_log(self, key: Key) -> None:
+        # caller holds self._lock
+        log = self._path(key, ".bars")
+        try:
+            raw = log.read_bytes()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            print(f"[CANDLES] Could not read {log.name}: {e}")
+            return
+        n = len(raw) // LOG_RECORD.itemsize
+        if len(raw) % LOG_RECORD.itemsize:
+            # Torn last record (power cut mid-append): drop it so the next
+            # append starts on a record boundary.
+            print(f"[CANDLES] Dropping a partial record at the end of {log.name}")
+            try:
+                os.truncate(log, n * LOG_RECORD.itemsize)
+            except OSError as e:
+                print(f"[CANDLES] Could not truncate {log.name}: {e}")
+        self._log_rows[key] = n
+        if n:
+            records = np.frombuffer(raw, dtype=LOG_RECORD, count=n)
+            bars = _last_per_timestamp(Candles.from_columns({k: np.array(records[k]) for k in COLUMNS}))
+            base = self._series.get(key) or Candles.empty()
+            # Union by timestamp, log rows first so np.unique keeps them
+            t_all = np.concatenate((bars.t, base.t))
+            _, idx = np.unique(t_all, return_index=True)
+            self._series[key] = Candles(*(np.concatenate((getattr(bars, k), getattr(base, k)))[idx] for k in COLUMNS))
+
+    def get(self, symbol: str, resolution: str = "D") -> Candles:
+        key = (symbol.upper(), resolution)
+        with self._lock:
+            if key not in self._loaded:
+                self._load(key)
+            return self._series.get(key) or Candles.empty()
+
+    def covered_from(self, symbol: str, resolution: str = "D") -> Optional[int]:
+        key = (symbol.upper(), resolution)
+        with self._lock:
+            if key not in self._loaded:
+                self._load(key)
+            return self._covered_from.get(key)
+
+    def merge(
+        self,
+        symbol: str,
+        resolution: str,
+        bars: Candles,
+        covered_from: Optional[int] = None,
+        keep_from: Optional[int] = None,
+    ) -> Candles:
+        """
+        Merge freshly fetched bars into the series, persist if anything changed.
+        keep_from drops bars older than that timestamp (retention for 1m bars).
+        """
+        key = (symbol.upper(), resolution)
+        with self._lock:
+            if key not in self._loaded:
+                self._load(key)
+            old = self._series.get(key) or Candles.empty()
+            merged = merge_candles(old, bars)
+
+            prev_covered = self._covered_from.get(key)
+            # Only a backfill (covered_from moving earlier) is persisted;
+            # the retention bump below is redone by the next merge anyway.
+            backfilled = covered_from is not None and (prev_covered is None or covered_from < prev_covered)
+            if backfilled:
+                self._covered_from[key] = covered_from
+
+            if keep_from is not None:
+                cut = int(np.searchsorted(merged.t, keep_from, side="left"))
+                if cut:
+                    merged = merged.slice(cut, len(merged))
+                bars = bars.slice(int(np.searchsorted(bars.t, keep_from, side="left")), len(bars))
+                covered = self._covered_from.get(key)
+                if covered is not None and covered < keep_from:
+                    self._covered_from[key] = keep_from
+            changed = merged is not old and not _same(old, merged)
+
+            if not changed and not backfilled:
+                return old
+
+            if changed:
+                self._series[key] = merged
+                self.version += 1
+            new_rows = _changed_rows(old, bars)
+            if backfilled or self._log_rows.get(key, 0) + len(new_rows) > COMPACT_AFTER_BARS:
+                self._compact(key, merged)
+            elif len(new_rows):
+                self._append(key, new_rows)
+            return merged
+
+    def _append(self, key: Key, rows: Candles) -> None:
+        # caller holds self._lock
+        records = np.empty(len(rows), dtype=LOG_RECORD)
+        for k in COLUMNS:
+            records[k] = getattr(rows, k)
+        data = records.tobytes()
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self._path(key, ".bars"), "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            # Still correct in memory; we'll just re-fetch after a restart.
+            print(f"[CANDLES] Failed to persist {key}: {e}")
+            return
+        self._log_rows[key] = self._log_rows.get(key, 0) + len(rows)
+        self.bytes_written += len(data)
+        self.appends += 1
+
+    def _compact(self, key: Key, candles: Candles) -> None:
+        """Rewrite the .npz base from memory and empty the .bars log."""
+        # caller holds self._lock
+        buf = io.BytesIO()
+        covered = self._covered_from.get(key)
+        np.savez(buf, covered_from=np.int64(-1 if covered is None else covered), **candles.columns())
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.bytes_written += atomic_write_bytes(self._path(key), buf.getvalue())
+            # A crash before this truncate just replays bars the base already has
+            with open(self._path(key, ".bars"), "wb"):
+                pass
+        except OSError as e:
+            # Still correct in memory; we'll just re-fetch after a restart.
+            print(f"[CANDLES] Failed to persist {key}: {e}")
+            return
+        self._log_rows[key] = 0
+        self.saves += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "directory": str(self.directory),
+                "version": self.version,
+                "series": {f"{s}:{r}": len(c) for (s, r), c in self._series.items()},
+                "saves": self.saves,
+                "appends": self.appends,
+                "logRecords": sum(self._log_rows.values()),
+                "bytesWritten": self.bytes_written,
+            }
+
+
+# Shared store for the server process
+store = CandleStore()
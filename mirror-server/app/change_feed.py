@@ -0,0 +1,194 @@
+# mirror-server/app/change_feed.py
+
+"""
+In-process change feed for server-push (SSE) to the kiosk.
+
+Stores publish typed change events ("config", "zo_state", "widget_state",
+"agent_state", "home_graph"); the /events endpoint streams them to
+clients, and long-poll GETs (?since=&wait=) use wait_until(). Events are kept in a small
+ring buffer so a reconnecting EventSource can resume from Last-Event-ID.
+
+publish() may be called from any thread (sync routes run on the anyio
+thread pool); waiting SSE streams live on the event loop and are woken
+with call_soon_threadsafe.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+HEARTBEAT_SECONDS = 15.0
+BUFFER_SIZE = 256
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    id: int
+    topic: str
+    data: str  # JSON, serialized once at publish time
+
+    def to_sse(self) -> str:
+        return f"id: {self.id}\nevent: {self.topic}\ndata: {self.data}\n\n"
+
+
+def _snapshot_event(event_id: int, snapshot: Callable[[], Dict[str, Any]]) -> ChangeEvent:
+    data = json.dumps(snapshot(), ensure_ascii=False, default=str)
+    return ChangeEvent(id=event_id, topic="snapshot", data=data)
+
+
+class ChangeFeed:
+    def __init__(self, maxlen: int = BUFFER_SIZE) -> None:
+        self._lock = threading.Lock()
+        self._events: Deque[ChangeEvent] = deque(maxlen=maxlen)
+        # Ids start at boot time (ms) so ids from before a restart are always
+        # older than anything in the buffer -> client gets a full resync.
+        self._last_id = int(time.time() * 1000)
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    # ----- publishing ----- #
+
+    def publish(self, topic: str, data: Dict[str, Any]) -> int:
+        payload = json.dumps(data, ensure_ascii=False, default=str)
+        with self._lock:
+            self._last_id += 1
+            event = ChangeEvent(id=self._last_id, topic=topic, data=payload)
+            self._events.append(event)
+            waiters = list(self._waiters)
+
+        for loop, ev in waiters:
+            try:
+                loop.call_soon_threadsafe(ev.set)
+            except RuntimeError:
+                # loop already closed
+                pass
+        return event.id
+
+    # ----- reading ----- #
+
+    @property
+    def last_id(self) -> int:
+        with self._lock:
+            return self._last_id
+
+    def events_after(self, last_id: int) -> Optional[List[ChangeEvent]]:
+        """
+        Events newer than `last_id`, or None if the client is too far behind
+        (or from a previous server run) and needs a full resync.
+        """
+        with self._lock:
+            if last_id > self._last_id:
+                return None
+            if last_id == self._last_id:
+                return []
+            if not self._events or last_id < self._events[0].id - 1:
+                return None
+            return [e for e in self._events if e.id > last_id]
+
+    # ----- async waiting ----- #
+
+    def _subscribe(self) -> Tuple[asyncio.AbstractEventLoop, asyncio.Event]:
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.add(waiter)
+        return waiter
+
+    def _unsubscribe(self, waiter: Tuple[asyncio.AbstractEventLoop, asyncio.Event]) -> None:
+        with self._lock:
+            self._waiters.discard(waiter)
+
+    async def wait_until(
+        self,
+        predicate: Callable[[], bool],
+        timeout: float,
+        poll: Optional[float] = None,
+    ) -> bool:
+        """
+        Block (cheaply, on the event loop) until predicate() is true or
+        `timeout` seconds pass. Re-checked whenever anything is published,
+        and every `poll` seconds if given (for changes nobody publishes).
+        """
+        if predicate():
+            return True
+        if timeout <= 0:
+            return False
+
+        waiter = self._subscribe()
+        _, wake = waiter
+        deadline = asyncio.get_running_loop().time() + timeout
+        try:
+            while True:
+                wake.clear()
+                if predicate():
+                    return True
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=remaining if poll is None else min(poll, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._unsubscribe(waiter)
+
+    async def stream(
+        self,
+        last_event_id: Optional[int],
+        snapshot: Callable[[], Dict[str, Any]],
+        is_disconnected: Callable[[], Any],
+        heartbeat: float = HEARTBEAT_SECONDS,
+    ) -> AsyncIterator[str]:
+        """
+        SSE body: optional resync snapshot, buffered backlog, then live
+        events plus a heartbeat comment every `heartbeat` seconds.
+        """
+        waiter = self._subscribe()
+        _, wake = waiter
+        try:
+            yield "retry: 2000\n\n"
+
+            cursor = last_event_id if last_event_id is not None else -1
+            backlog = self.events_after(cursor) if cursor >= 0 else None
+            if backlog is None:
+                cursor = self.last_id
+                yield _snapshot_event(cursor, snapshot).to_sse()
+            else:
+                for e in backlog:
+                    cursor = e.id
+                    yield e.to_sse()
+
+            while True:
+                wake.clear()
+                # events may have landed between the backlog read and clear()
+                pending = self.events_after(cursor)
+                if pending is None:
+                    cursor = self.last_id
+                    yield _snapshot_event(cursor, snapshot).to_sse()
+                    continue
+                for e in pending:
+                    cursor = e.id
+                    yield e.to_sse()
+                if pending:
+                    continue
+
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        return
+                    yield ": ping\n\n"
+        finally:
+            self._unsubscribe(waiter)
+
+
+# Single shared feed for the server process
+feed = ChangeFeed()
+
+
+def publish(topic: str, data: Dict[str, Any]) -> int:
+    return feed.publish(topic, data)
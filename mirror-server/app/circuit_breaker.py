@@ -0,0 +1,119 @@
+# mirror-server/app/circuit_breaker.py
+
+"""
+Per-provider circuit breakers for upstream.py.
+
+  closed     calls go through; `failure_threshold` consecutive outage
+             failures (timeouts, connection errors, 5xx) open the circuit
+  open       calls fail immediately with CircuitOpen for `reset_timeout`
+             seconds (doubling on each failed probe, up to
+             `max_reset_timeout`), so a dead provider costs nothing
+             instead of a full timeout + retries per call
+  half-open  one probe call is let through; success closes the circuit,
+             failure re-opens it
+
+Callers (ttl_cache) answer CircuitOpen with last-known-good data.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    def __init__(self, provider: str, retry_after: float) -> None:
+        super().__init__(f"{provider}: circuit open (retry in {retry_after:.0f}s)")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        max_reset_timeout: float = 300.0,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0            # consecutive
+        self.opened_at = 0.0
+        self.open_for = reset_timeout
+        self._probing = False
+        self.last_error: Optional[str] = None
+        self.opens = 0
+        self.rejected = 0
+
+    def before_call(self) -> None:
+        """Raise CircuitOpen unless a call may go out now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.monotonic()
+            remaining = self.opened_at + self.open_for - now
+            if self.state == OPEN and remaining <= 0:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                print(f"[BREAKER] {self.name} half-open, probing")
+                return
+            self.rejected += 1
+            raise CircuitOpen(self.name, max(0.0, remaining))
+
+    def success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"[BREAKER] {self.name} closed")
+            self.state = CLOSED
+            self.failures = 0
+            self.open_for = self.reset_timeout
+            self._probing = False
+
+    def failure(self, error: str) -> None:
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            if self.state == HALF_OPEN:
+                # Failed probe: back off longer before the next one
+                self.open_for = min(self.max_reset_timeout, self.open_for * 2)
+                self._open()
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self.open_for = self.reset_timeout
+                self._open()
+
+    def cancel(self) -> None:
+        """The call never reached the provider (e.g. shed by the rate limiter)."""
+        with self._lock:
+            self._probing = False
+
+    def _open(self) -> None:
+        # caller holds self._lock
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self._probing = False
+        self.opens += 1
+        print(f"[BREAKER] {self.name} open for {self.open_for:.0f}s after {self.failures} failure(s): {self.last_error}")
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = self.opened_at + self.open_for - time.monotonic() if self.state == OPEN else 0.0
+            return {
+                "state": self.state,
+                "consecutiveFailures": self.failures,
+                "failureThreshold": self.failure_threshold,
+                "retryInSeconds": round(max(0.0, retry_in), 1),
+                "opens": self.opens,
+                "rejected": self.rejected,
+                "lastError": self.last_error,
+            }
@@ -0,0 +1,239 @@
+# mirror-server/app/config_patch.py
+
+"""
+Partial config updates.
+
+- RFC 7396 merge patches:  {"display": {"theme": "maisonAzure"}}
+- RFC 6902 JSON Patch ops: [{"op": "replace", "path": "/widgets/news", "value": false}]
+  (make_json_patch() also produces them, e.g. for snapshot diffs)
+
+Only the top-level MirrorConfig fields a patch actually changes are
+re-validated (Widgets, DisplaySettings, layouts -> WidgetPlacement, ...);
+everything else is carried over from the current frozen model as-is.
+"""
+
+from __future__ import annotations
+
+import copy
+from typing import Any, Dict, Iterable, List
+
+from pydantic import TypeAdapter
+
+from .models import MirrorConfig
+
+
+class ConfigPatchError(ValueError):
+    pass
+
+
+# ----------------- RFC 7396 merge patch -----------------
+
+def apply_merge_patch(target: Any, patch: Any) -> Any:
+    """
+    Return `target` with `patch` merged in (RFC 7396). `target` is not mutated.
+    """
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+
+# ----------------- RFC 6902 JSON Patch -----------------
+
+def _parse_pointer(path: str) -> List[str]:
+    if path == "":
+        return []
+    if not path.startswith("/"):
+        raise ConfigPatchError(f"Invalid JSON pointer: {path!r}")
+    return [p.replace("~1", "/").replace("~0", "~") for p in path[1:].split("/")]
+
+
+def _list_index(container: list, token: str, allow_end: bool) -> int:
+    if token == "-" and allow_end:
+        return len(container)
+    try:
+        idx = int(token)
+    except ValueError:
+        raise ConfigPatchError(f"Invalid list index: {token!r}")
+    upper = len(container) if allow_end else len(container) - 1
+    if idx < 0 or idx > upper:
+        raise ConfigPatchError(f"List index out of range: {idx}")
+    return idx
+
+
+def _resolve_parent(doc: Any, tokens: List[str]) -> Any:
+    node = doc
+    for token in tokens[:-1]:
+        if isinstance(node, dict):
+            if token not in node:
+                raise ConfigPatchError(f"Path not found: /{'/'.join(tokens)}")
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_list_index(node, token, allow_end=False)]
+        else:
+            raise ConfigPatchError(f"Path not found: /{'/'.join(tokens)}")
+    return node
+
+
+def _get(doc: Any, path: str) -> Any:
+    tokens = _parse_pointer(path)
+    if not tokens:
+        return doc
+    parent = _resolve_parent(doc, tokens)
+    last = tokens[-1]
+    if isinstance(parent, dict):
+        if last not in parent:
+            raise ConfigPatchError(f"Path not found: {path}")
+        return parent[last]
+    if isinstance(parent, list):
+        return parent[_list_index(parent, last, allow_end=False)]
+    raise ConfigPatchError(f"Path not found: {path}")
+
+
+def _add(doc: Any, path: str, value: Any) -> Any:
+    tokens = _parse_pointer(path)
+    if not tokens:
+        return value
+    parent = _resolve_parent(doc, tokens)
+    last = tokens[-1]
+    if isinstance(parent, dict):
+        parent[last] = value
+    elif isinstance(parent, list):
+        parent.insert(_list_index(parent, last, allow_end=True), value)
+    else:
+        raise ConfigPatchError(f"Cannot add at {path}")
+    return doc
+
+
+def _remove(doc: Any, path: str) -> Any:
+    tokens = _parse_pointer(path)
+    if not tokens:
+        raise ConfigPatchError("Cannot remove the whole document")
+    parent = _resolve_parent(doc, tokens)
+    last = tokens[-1]
+    if isinstance(parent, dict):
+        if last not in parent:
+            raise ConfigPatchError(f"Path not found: {path}")
+        del parent[last]
+    elif isinstance(parent, list):
+        del parent[_list_index(parent, last, allow_end=False)]
+    else:
+        raise ConfigPatchError(f"Path not found: {path}")
+    return doc
+
+
+def apply_json_patch(doc: Any, ops: Iterable[Dict[str, Any]]) -> Any:
+    """
+    Apply RFC 6902 operations to a deep copy of `doc` and return it.
+    Raises ConfigPatchError on a bad op or a failed "test".
+    """
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        if not isinstance(op, dict) or "op" not in op or "path" not in op:
+            raise ConfigPatchError(f"Invalid patch operation: {op!r}")
+
+        kind = op["op"]
+        path = op["path"]
+        if kind in ("move", "copy") and "from" not in op:
+            raise ConfigPatchError(f"{kind!r} operation needs a \"from\" path: {op!r}")
+
+        if kind == "add":
+            doc = _add(doc, path, copy.deepcopy(op.get("value")))
+        elif kind == "remove":
+            doc = _remove(doc, path)
+        elif kind == "replace":
+            _get(doc, path)  # must exist
+            doc = _remove(doc, path) if _parse_pointer(path) else doc
+            doc = _add(doc, path, copy.deepcopy(op.get("value")))
+        elif kind == "move":
+            value = _get(doc, op["from"])
+            doc = _remove(doc, op["from"])
+            doc = _add(doc, path, value)
+        elif kind == "copy":
+            doc = _add(doc, path, copy.deepcopy(_get(doc, op["from"])))
+        elif kind == "test":
+            if _get(doc, path) != op.get("value"):
+                raise ConfigPatchError(f"Test failed at {path}")
+        else:
+            raise ConfigPatchError(f"Unsupported op: {kind!r}")
+    return doc
+
+
+def _pointer_token(key: Any) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def make_json_patch(before: Any, after: Any, path: str = "") -> List[Dict[str, Any]]:
+    """
+    RFC 6902 ops turning `before` into `after` (apply_json_patch inverse).
+    Dicts and equal-length lists are diffed member by member; anything
+    else that differs (including resized lists) is replaced whole.
+    """
+    if before == after:
+        return []
+    if isinstance(before, dict) and isinstance(after, dict):
+        ops: List[Dict[str, Any]] = []
+        for key in before:
+            if key not in after:
+                ops.append({"op": "remove", "path": f"{path}/{_pointer_token(key)}"})
+        for key, value in after.items():
+            child = f"{path}/{_pointer_token(key)}"
+            if key not in before:
+                ops.append({"op": "add", "path": child, "value": value})
+            else:
+                ops.extend(make_json_patch(before[key], value, child))
+        return ops
+    if isinstance(before, list) and isinstance(after, list) and len(before) == len(after):
+        ops = []
+        for i, (old, new) in enumerate(zip(before, after)):
+            ops.extend(make_json_patch(old, new, f"{path}/{i}"))
+        return ops
+    return [{"op": "replace", "path": path, "value": after}]
+
+
+# ----------------- Incremental validation -----------------
+
+_adapters: Dict[str, TypeAdapter] = {}
+_MISSING = object()
+
+
+def _adapter_for(field: str) -> TypeAdapter:
+    adapter = _adapters.get(field)
+    if adapter is None:
+        adapter = TypeAdapter(MirrorConfig.model_fields[field].annotation)
+        _adapters[field] = adapter
+    return adapter
+
+
+def changed_fields(before: Dict[str, Any], after: Dict[str, Any]) -> List[str]:
+    """Top-level MirrorConfig fields whose value differs between two dumps."""
+    out: List[str] = []
+    for field in MirrorConfig.model_fields:
+        if before.get(field, _MISSING) != after.get(field, _MISSING):
+            out.append(field)
+    return out
+
+
+def rebuild_config(base: MirrorConfig, data: Dict[str, Any], fields: Iterable[str]) -> MirrorConfig:
+    """
+    Build a new MirrorConfig from `base`, validating only `fields` from `data`.
+    Unknown top-level keys are ignored, like MirrorConfig(**data) does.
+    """
+    update: Dict[str, Any] = {}
+    for field in fields:
+        info = MirrorConfig.model_fields.get(field)
+        if info is None:
+            continue
+        if field in data:
+            update[field] = _adapter_for(field).validate_python(data[field])
+        else:
+            update[field] = info.get_default(call_default_factory=True)
+    if not update:
+        return base
+    return base.model_copy(update=update)
@@ -1,15 +1,47 @@
+import copy
 import json
 import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
+from threading import RLock
+from typing import Any, Dict, Iterator, Optional, Tuple
+
 from .models import MirrorConfig
+from .persistence import writer
+from .config_patch import changed_fields, rebuild_config
+from . import change_feed
 
 CONFIG_PATH = Path(__file__).with_name("config.json")
-_config_cache = None
 
-def load_config() -> MirrorConfig:
-    if not CONFIG_PATH.exists():
-        raise FileNotFoundError(f"No config.json at {CONFIG_PATH}")
+# Process-wide config cache.
+# Every endpoint / action / voice turn calls load_config(), so we only re-read
+# config.json when the file on disk actually changed (mtime/size/inode), or
+# when save_config() hands us a fresh model. MirrorConfig is frozen, so the
+# same instance can be shared safely by every caller.
+_cache_lock = RLock()
+_cached_cfg: Optional[MirrorConfig] = None
+_cached_key: Optional[Tuple[int, int, int]] = None
+
+# save_config() is write-behind: the cache holds the newest config while the
+# coalesced disk write is still pending, so it wins over the (older) file.
+_dirty = False
+_save_gen = 0
+
+# Bumped on every save_config() and on external edits of config.json;
+# returned by PATCH /config and used for long-poll / ETags.
+_version = 0
+
+
+def _stat_key(path: Path) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
 
+
+def _read_config_file() -> MirrorConfig:
     raw = json.loads(CONFIG_PATH.read_text())
 
     # If old files don’t have os_mode, default to "default"
@@ -18,14 +50,182 @@ def load_config() -> MirrorConfig:
 
     return MirrorConfig(**raw)
 
+
+def load_config() -> MirrorConfig:
+    """
+    Return the current config as an immutable snapshot.
+
+    Cheap on the hot path: one os.stat() and a tuple compare. The file is
+    only parsed + validated again when it changed on disk.
+    """
+    global _cached_cfg, _cached_key
+
+    with _cache_lock:
+        if _dirty and _cached_cfg is not None:
+            return _cached_cfg
+
+    key = _stat_key(CONFIG_PATH)
+    if key is None:
+        raise FileNotFoundError(f"No config.json at {CONFIG_PATH}")
+
+    with _cache_lock:
+        if _cached_cfg is not None and (_dirty or _cached_key == key):
+            return _cached_cfg
+
+        external_edit = _cached_cfg is not None
+        cfg = _read_config_file()
+        _cached_cfg = cfg
+        _cached_key = key
+        if external_edit:
+            # config.json was changed behind our back -> new version
+            _bump_version(cfg.model_dump())
+        return cfg
+
+
+def invalidate_config_cache() -> None:
+    """Drop the cached config so the next load_config() re-reads the file."""
+    global _cached_cfg, _cached_key
+    flush_config()
+    with _cache_lock:
+        _cached_cfg = None
+        _cached_key = None
+
+
+def _on_config_written(gen: int):
+    def _restamp(st: os.stat_result) -> None:
+        global _cached_key, _dirty
+        with _cache_lock:
+            # A newer save is still in flight -> keep serving from memory.
+            if gen != _save_gen:
+                return
+            _cached_key = (st.st_mtime_ns, st.st_size, st.st_ino)
+            _dirty = False
+    return _restamp
+
+
+def _on_config_write_failed(gen: int):
+    def _rollback(err: Exception) -> None:
+        global _cached_key, _dirty
+        with _cache_lock:
+            if gen != _save_gen:
+                return
+            # The unsaved config is lost: stop serving it and let the next
+            # load_config() re-read config.json (which bumps the version, so
+            # long-poll / SSE clients see the revert).
+            _dirty = False
+            _cached_key = None
+        print(f"[CONFIG] Saving config.json failed, reverting to the copy on disk: {err}")
+    return _rollback
+
+
 def save_config(cfg: MirrorConfig) -> MirrorConfig:
-    global _config_cache
+    """
+    Persist config via the coalescing writer (atomic, debounced) and make it
+    visible to load_config() immediately.
+    """
+    global _cached_cfg, _dirty, _save_gen
     # Pydantic → dict → json
     data = cfg.model_dump()
-    CONFIG_PATH.write_text(json.dumps(data, indent=2))
-    _config_cache = cfg  # Update cache
+    text = json.dumps(data, indent=2)
+    with _cache_lock:
+        _cached_cfg = cfg
+        _dirty = True
+        _save_gen += 1
+        # submit under the lock so disk order always matches _save_gen order
+        writer.submit(
+            CONFIG_PATH,
+            text,
+            on_written=_on_config_written(_save_gen),
+            on_failed=_on_config_write_failed(_save_gen),
+        )
+        _bump_version(data)
     return cfg
 
+
+def _bump_version(data: Dict[str, Any]) -> None:
+    global _version
+    with _cache_lock:
+        _version += 1
+        change_feed.publish("config", {"version": _version, "config": data})
+
+
+def get_config_version() -> int:
+    """
+    Monotonic counter of config changes: saves in this process and edits
+    of config.json on disk (checked here, one os.stat()).
+    """
+    try:
+        load_config()
+    except (OSError, ValueError) as e:
+        # Missing / half-edited file: keep the last version until it's fixed
+        print(f"[CONFIG] Could not re-read config.json: {e}")
+    with _cache_lock:
+        return _version
+
+
+def flush_config() -> None:
+    """Force any debounced config write to disk now."""
+    writer.flush(CONFIG_PATH)
+
+
+# ----------------- Transactions -----------------
+
+# One read-modify-write at a time, and nested transactions on the same thread
+# join the outermost one (so a batch of actions costs one save).
+_tx_lock = RLock()
+_tx_local = threading.local()
+
+
+class ConfigTransaction:
+    """
+    Mutable working copy of the config for one batch of changes.
+
+    Edit `data` (a plain model_dump() dict). On commit only the top-level
+    fields that changed are validated, and the config is saved once — and
+    not at all if nothing changed.
+    """
+
+    def __init__(self, base: MirrorConfig) -> None:
+        self.base = base
+        self._original = base.model_dump()
+        self.data: Dict[str, Any] = copy.deepcopy(self._original)
+        self.config: Optional[MirrorConfig] = None  # set after commit
+
+    def commit(self) -> MirrorConfig:
+        fields = changed_fields(self._original, self.data)
+        if not fields:
+            self.config = self.base
+        else:
+            self.config = save_config(rebuild_config(self.base, self.data, fields))
+        return self.config
+
+
+@contextmanager
+def config_transaction() -> Iterator[ConfigTransaction]:
+    """
+    Usage:
+        with config_transaction() as tx:
+            tx.data["widgets"]["news"] = False
+
+    If the block raises, nothing is persisted (rollback = drop the copy).
+    Inside an enclosing transaction this yields the outer one, and
+    `tx.config` stays None until the outermost block commits.
+    """
+    outer = getattr(_tx_local, "tx", None)
+    if outer is not None:
+        yield outer
+        return
+
+    with _tx_lock:
+        tx = ConfigTransaction(load_config())
+        _tx_local.tx = tx
+        try:
+            yield tx
+        finally:
+            _tx_local.tx = None
+        tx.commit()
+
+
 def get_api_key(key_name: str) -> str:
     """
     Get API key from config first, then fall back to environment variable.
@@ -36,17 +236,14 @@ def get_api_key(key_name: str) -> str:
     Returns:
         The API key value or empty string if not found
     """
-    global _config_cache
-
-    # Try to get from config first
-    if _config_cache is None:
-        try:
-            _config_cache = load_config()
-        except:
-            pass
+    # Try to get from config first (shared, mtime-validated cache)
+    try:
+        cfg = load_config()
+    except Exception:
+        cfg = None
 
-    if _config_cache and _config_cache.apiKeys and key_name in _config_cache.apiKeys:
-        key = _config_cache.apiKeys[key_name]
+    if cfg and cfg.apiKeys and key_name in cfg.apiKeys:
+        key = cfg.apiKeys[key_name]
         if key:  # Not empty string
             return key
 
@@ -0,0 +1,76 @@
+# mirror-server/app/http_cache.py
+
+"""
+HTTP caching helpers for GET routes: strong ETags, 304s, Cache-Control.
+
+Chromium in kiosk mode keeps a normal HTTP cache, so:
+  - state endpoints (/config, /os/mode, ...) get an ETag + "no-cache"
+    -> the browser revalidates and gets an empty 304 when nothing changed;
+  - upstream data endpoints (/weather, /api/news/top, ...) get
+    "max-age" matching the upstream refresh TTL -> repeats never leave
+    the browser.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# Version counters restart with the process, so version-based ETags are
+# scoped to this boot to stay strong across restarts.
+BOOT_ID = format(int(time.time() * 1000), "x")
+
+REVALIDATE = "no-cache"
+
+
+def etag_for_version(name: str, version: int) -> str:
+    return f'"{name}-{BOOT_ID}-{version}"'
+
+
+def etag_for_content(content: Any) -> str:
+    body = json.dumps(jsonable_encoder(content), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return '"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"'
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [c.strip() for c in header.split(",")]
+    # tolerate weak comparison (W/"...") from intermediaries
+    return any(c == etag or c == f"W/{etag}" for c in candidates)
+
+
+def cached_json(
+    request: Request,
+    content: Any,
+    etag: Optional[str] = None,
+    cache_control: str = REVALIDATE,
+    headers: Optional[dict] = None,
+) -> Response:
+    """
+    JSON response with an ETag (content hash unless given) that honors
+    If-None-Match with a 304.
+    """
+    if etag is None:
+        etag = etag_for_content(content)
+
+    out_headers = {"ETag": etag, "Cache-Control": cache_control}
+    if headers:
+        out_headers.update(headers)
+
+    if _matches(request, etag):
+        return Response(status_code=304, headers=out_headers)
+    return JSONResponse(content=jsonable_encoder(content), headers=out_headers)
+
+
+def max_age(seconds: int) -> str:
+    return f"max-age={int(seconds)}"
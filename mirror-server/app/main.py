@@ -8,36 +8,50 @@ import os
 env_path = os.path.join(os.path.dirname(__file__), '.env')
 load_dotenv(env_path)
 
+import math
 import traceback
-from typing import List, Dict, Any, Literal
+from typing import List, Dict, Any, Literal, Optional, Union
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Body, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from .actions import execute_action
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from .actions import execute_action, execute_actions
 
 from .models import MirrorConfig, Weather, SurfConditions
-from .config_store import load_config, save_config
-from .weather_service import get_weather_for_city
+from .config_store import load_config, save_config, config_transaction, get_config_version
+from .config_patch import apply_merge_patch, apply_json_patch, ConfigPatchError
+from .weather_service import get_weather_for_city_async
 from .surf_service import get_surf_for_location
-from .zo_state import get_state, set_state
-from .widget_store import widget_state
-from .services_news import fetch_multi_category_news
-from .services_stocks import fetch_stock_quotes, fetch_stock_history
-from .services_quotes import fetch_random_quote
+from .zo_state import get_state, set_state, get_version as get_zo_version
+from .widget_store import widget_state, get_widget_state_version
+from .services_news import fetch_multi_category_news_async
+from .services_stocks import fetch_stock_quotes_batch_async, fetch_stock_history_batch_async
+from .services_quotes import fetch_random_quote_async
 
 from .maison_os.agent import MaisonAgent
 from .maison_os.events import Event
 from .maison_os.agent_state import get_mode, set_mode  # ✅ keep agent brain aligned
-from .maison_os.mirror_snapshot import get_mirror_snapshot
+from .maison_os.mirror_snapshot import get_mirror_snapshot, snapshot_since
 from .actions import execute_action
 
 from .os_modes import apply_mode
 from .context_manager import build_context
+from .persistence import writer as persistence_writer
+from . import upstream, ttl_cache, refresh_scheduler, bulkhead, snapshot_engine
+from .change_feed import feed as change_feed
+from .candle_store import store as candle_store
+from .http_cache import REVALIDATE, cached_json, etag_for_version, max_age
+from . import weather_service, services_news, services_stocks, services_quotes, market_calendar, sparkline, stock_analytics
 
 
 
 OSMode = Literal["default", "focus", "market"]
+StockResolution = Literal["D", "1m", "5m", "15m", "1h"]
+SparklineFormat = Literal["points", "columnar"]
+SparklinePrecision = Literal["f64", "f32"]
+StockPeriod = Literal["1d", "1w", "1m", "3m", "6m", "1y", "mtd", "ytd"]
+SnapshotDiffFormat = Literal["sections", "patch"]
 
 # ----------------- FastAPI app -----------------
 
@@ -49,8 +63,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-State-Version", "ETag"],
 )
 
+@app.on_event("startup")
+async def _start_refresh_scheduler() -> None:
+    if refresh_scheduler.ENABLED:
+        refresh_scheduler.scheduler.start()
+
+@app.on_event("shutdown")
+async def _close_upstream_clients() -> None:
+    await refresh_scheduler.scheduler.stop()
+    await upstream.aclose()
+    bulkhead.shutdown()
+
+@app.exception_handler(bulkhead.BulkheadFull)
+async def _bulkhead_full(request: Request, exc: bulkhead.BulkheadFull) -> JSONResponse:
+    # Shed load fast instead of queueing behind a saturated subsystem
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
 # ----------------- Agent setup -----------------
 
 agent = MaisonAgent()
@@ -68,6 +103,9 @@ agent.register_action_handler("set_many_widgets", lambda p: execute_action("set_
 agent.register_action_handler("set_quote_categories", lambda p: execute_action("set_quote_categories", p))
 agent.register_action_handler("refresh_quote", lambda p: execute_action("refresh_quote", p))
 
+# Multi-action plans ("hide everything", replace A with B) -> one config write.
+agent.register_batch_handler(execute_actions)
+
 # ----------------- Pydantic event models -----------------
 
 class WakeEventIn(BaseModel):
@@ -79,19 +117,119 @@ class UserSpokeIn(BaseModel):
 
 # ----------------- Config endpoints -----------------
 
+# Long-poll: ?since=<version>&wait=<seconds> returns as soon as the store's
+# version differs from `since` (or when `wait` runs out). Cheap: no thread is
+# parked, the handler just awaits the change feed on the event loop.
+MAX_LONG_POLL_SECONDS = 60.0
+VERSION_HEADER = "X-State-Version"
+
+# Hand edits of config.json publish nothing, so config long-polls also
+# re-check the file this often.
+CONFIG_POLL_SECONDS = 1.0
+
+async def _wait_for_change(get_version, since: Optional[int], wait: float, poll: Optional[float] = None) -> int:
+    if since is not None and wait > 0:
+        await change_feed.wait_until(lambda: get_version() != since, wait, poll=poll)
+    return get_version()
+
 @app.get("/config", response_model=MirrorConfig)
-def read_config() -> MirrorConfig:
-    return load_config()
+async def read_config(
+    request: Request,
+    since: Optional[int] = Query(None, description="Config version the client already has"),
+    wait: float = Query(0, ge=0, le=MAX_LONG_POLL_SECONDS),
+):
+    version = await _wait_for_change(get_config_version, since, wait, poll=CONFIG_POLL_SECONDS)
+    return cached_json(
+        request,
+        load_config(),
+        etag=etag_for_version("config", version),
+        headers={VERSION_HEADER: str(version)},
+    )
 
 @app.post("/config", response_model=MirrorConfig)
-def write_config(cfg: MirrorConfig) -> MirrorConfig:
-    return save_config(cfg)
+async def write_config(cfg: MirrorConfig) -> MirrorConfig:
+    return await bulkhead.persistence.run(save_config, cfg)
+
+@app.patch("/config")
+async def patch_config(
+    patch: Union[Dict[str, Any], List[Dict[str, Any]]] = Body(...),
+):
+    """
+    Partial config update.
+
+    Body:
+      - object -> RFC 7396 merge patch, e.g. {"widgets": {"news": false}}
+      - array  -> RFC 6902 JSON Patch, e.g.
+                  [{"op": "replace", "path": "/display/theme", "value": "maisonAzure"}]
+
+    Only the sections the patch touches are re-validated.
+    Returns {"version": int, "config": MirrorConfig}.
+    """
+    return await bulkhead.persistence.run(_apply_config_patch, patch)
+
+def _apply_config_patch(patch: Union[Dict[str, Any], List[Dict[str, Any]]]) -> Dict[str, Any]:
+    try:
+        with config_transaction() as tx:
+            if isinstance(patch, list):
+                patched = apply_json_patch(tx.data, patch)
+            else:
+                patched = apply_merge_patch(tx.data, patch)
+            # e.g. {"op": "replace", "path": "", "value": []}
+            if not isinstance(patched, dict):
+                raise ConfigPatchError("Patched config must still be a JSON object")
+            tx.data = patched
+    except ConfigPatchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+
+    return {"version": get_config_version(), "config": tx.config}
+
+# ----------------- Server-push events -----------------
+
+def _state_snapshot() -> Dict[str, Any]:
+    """Full state sent on first connect or when a client can't resume."""
+    return {
+        "config": {"version": get_config_version(), "config": load_config().model_dump()},
+        "zo_state": get_state(),
+        "widget_state": {"widget": None, "state": dict(widget_state)},
+    }
+
+@app.get("/events")
+async def events(
+    request: Request,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    since: Optional[str] = Query(None, alias="lastEventId"),
+):
+    """
+    Server-Sent Events stream of state changes for the kiosk.
+
+    Events: "snapshot" (full state), "config", "zo_state", "widget_state".
+    Resumes from the Last-Event-ID header (or ?lastEventId=) when the
+    event is still buffered; otherwise starts with a fresh snapshot.
+    Sends a ": ping" heartbeat comment while idle.
+    """
+    raw_id = last_event_id or since
+    try:
+        resume_id = int(raw_id) if raw_id else None
+    except ValueError:
+        resume_id = None
+
+    return StreamingResponse(
+        change_feed.stream(resume_id, _state_snapshot, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # ----------------- Weather + Surf -----------------
 
 @app.get("/weather", response_model=Weather)
-def read_weather(city: str = "San Diego") -> Weather:
-    data = get_weather_for_city(city)
+async def read_weather(response: Response, city: str = "San Diego") -> Weather:
+    data = await get_weather_for_city_async(city)
+    # Don't let browsers hold on to the placeholder for the full TTL
+    response.headers["Cache-Control"] = (
+        REVALIDATE if weather_service.is_fallback(data) else max_age(weather_service.CACHE_TTL_SECONDS)
+    )
     return Weather(**data)
 
 @app.get("/surf", response_model=SurfConditions)
@@ -102,11 +240,21 @@ def read_surf(location: str = "San Diego") -> SurfConditions:
 # ----------------- Zo state + voice -----------------
 
 @app.get("/zo/state")
-def zo_state():
-    return get_state()
+async def zo_state(
+    request: Request,
+    since: Optional[int] = Query(None),
+    wait: float = Query(0, ge=0, le=MAX_LONG_POLL_SECONDS),
+):
+    version = await _wait_for_change(get_zo_version, since, wait)
+    return cached_json(
+        request,
+        get_state(),
+        etag=etag_for_version("zo", version),
+        headers={VERSION_HEADER: str(version)},
+    )
 
 @app.post("/zo/talk")
-def zo_talk():
+async def zo_talk():
     """
     Trigger one Zo interaction:
       - record
@@ -114,7 +262,13 @@ def zo_talk():
       - chat
       - TTS
       - play audio on the server machine.
+
+    Runs on the voice bulkhead: one turn at a time, a second tap while
+    one is queued gets 503.
     """
+    return await bulkhead.voice.run(_zo_talk)
+
+def _zo_talk() -> Dict[str, Any]:
     try:
         from voice_zo import run_zo_once  # lazy import
 
@@ -137,21 +291,33 @@ def agent_wake(event_in: WakeEventIn):
     return {"status": "ok"}
 
 @app.post("/agent/user-spoke")
-def agent_user_spoke(event_in: UserSpokeIn):
+async def agent_user_spoke(event_in: UserSpokeIn):
     event = Event.user_spoke(text=event_in.text, source=event_in.source)
-    agent.handle_event(event)
+    # Answers may build a snapshot (provider calls)
+    await bulkhead.upstream.run(agent.handle_event, event)
     return {"status": "ok"}
 
 # ----------------- Widget state -----------------
 
 @app.get("/api/widgets/state")
-def get_widget_state():
-    return widget_state
+async def get_widget_state(
+    request: Request,
+    since: Optional[int] = Query(None),
+    wait: float = Query(0, ge=0, le=MAX_LONG_POLL_SECONDS),
+):
+    version = await _wait_for_change(get_widget_state_version, since, wait)
+    return cached_json(
+        request,
+        widget_state,
+        etag=etag_for_version("widgets", version),
+        headers={VERSION_HEADER: str(version)},
+    )
 
 # ----------------- News API -----------------
 
 @app.get("/api/news/top")
-def api_top_news(
+async def api_top_news(
+    response: Response,
     categories: str = Query("", description="Comma-separated categories"),
     country: str = Query("us"),
 ):
@@ -166,7 +332,7 @@ def api_top_news(
     cat_list = [c.strip() for c in categories.split(",") if c.strip()] if categories else []
 
     # Fetch from multiple categories
-    articles = fetch_multi_category_news(cat_list, country=country)
+    articles = await fetch_multi_category_news_async(cat_list, country=country)
 
     # Clean and format response
     cleaned = [
@@ -178,66 +344,112 @@ def api_top_news(
         for a in (articles or [])
         if a.get("title")
     ]
+    response.headers["Cache-Control"] = max_age(services_news.CACHE_TTL_SECONDS)
     return {"articles": cleaned}
 
 # ----------------- Stocks API -----------------
 
 @app.get("/api/stocks/quotes")
 async def api_get_stock_quotes(
+    response: Response,
     symbols: str = Query(..., description="Comma-separated symbols, e.g. AAPL,NVDA,SPY"),
 ):
     symbols_list: List[str] = [s.strip().upper() for s in symbols.split(",") if s.strip()]
-    items = fetch_stock_quotes(symbols_list)
-    return {"items": items}
+    batch = await fetch_stock_quotes_batch_async(symbols_list)
+    refresh_at = services_stocks.batch_refresh_at(batch, services_stocks.quotes_refresh_at())
+    response.headers["Cache-Control"] = max_age(max(services_stocks.QUOTES_TTL_SECONDS, market_calendar.seconds_until(refresh_at)))
+    return {**batch, **services_stocks.market_info(refresh_at)}
 
 @app.get("/api/stocks/history")
-def api_get_stock_history(
+async def api_get_stock_history(
+    response: Response,
+    symbols: str = Query(..., description="Comma-separated symbols"),
+    points: int = Query(40, ge=5, le=1000),
+    resolution: StockResolution = Query("D", description="D (daily) or intraday 1m / 5m / 15m / 1h"),
+    width: Optional[int] = Query(None, ge=sparkline.MIN_WIDTH, le=1000, description="Downsample (LTTB) to this many points"),
+    fmt: SparklineFormat = Query("points", alias="format", description="points: [{t, price}]; columnar: {t0, dt[], p[]}"),
+    precision: SparklinePrecision = Query("f64", description="f32 rounds prices to float32 precision"),
+):
+    """
+    Close-price history per symbol for sparklines.
+
+    `points` bars are read from the candle store; `width` then keeps the
+    most shape-relevant ones (Largest-Triangle-Three-Buckets), e.g.
+    ?resolution=1m&points=390&width=120 for a full session at 120 px.
+    """
+    sym_list: List[str] = [s.strip().upper() for s in symbols.split(",") if s.strip()]
+
+    def encode(candles):
+        if candles is None:
+            return None
+        return sparkline.encode(candles.t, candles.c, width=width, fmt=fmt, precision=precision)
+
+    batch = await fetch_stock_history_batch_async(sym_list, points=points, resolution=resolution, encode=encode)
+    refresh_at = services_stocks.batch_refresh_at(batch, services_stocks.history_refresh_for(resolution))
+    response.headers["Cache-Control"] = max_age(market_calendar.seconds_until(refresh_at))
+    return {**batch, "resolution": resolution, "format": fmt, **services_stocks.market_info(refresh_at)}
+
+@app.get("/api/stocks/analytics")
+def api_get_stock_analytics(
     symbols: str = Query(..., description="Comma-separated symbols"),
-    points: int = Query(40, ge=5, le=200),
+    period: StockPeriod = Query("1d", description="Period the movers are ranked by"),
 ):
+    """
+    Returns, moving averages, volatility, drawdown and 52-week range per
+    symbol, computed from the local daily candle store (no upstream calls;
+    symbols without stored history are omitted).
+    """
     sym_list: List[str] = [s.strip().upper() for s in symbols.split(",") if s.strip()]
-    items: Dict[str, List[Dict[str, Any]]] = {}
-    for sym in sym_list:
-        items[sym] = fetch_stock_history(sym, points=points)
-    return {"items": items}
+    return {
+        "items": stock_analytics.watchlist_analytics(sym_list),
+        "movers": stock_analytics.movers(sym_list, period),
+        "period": period,
+    }
 
 # ----------------- Quotes API -----------------
 
 @app.get("/api/quotes/random")
-def api_random_quote(
+async def api_random_quote(
+    response: Response,
     categories: str = Query("", description="Comma-separated categories"),
+    fresh: bool = Query(False, description="Bypass the server-side cache"),
 ):
     """
     Fetch a random quote from API Ninjas.
 
     Query params:
       categories: comma-separated list like "inspirational,wisdom,success"
+      fresh: skip the cached quote and fetch a new one
 
     Returns:
       {"quote": {...}} or {"quote": None} on error
     """
     cat_list = [c.strip() for c in categories.split(",") if c.strip()] if categories else []
 
-    quote_data = fetch_random_quote(cat_list)
+    quote_data = await fetch_random_quote_async(cat_list, fresh=fresh)
 
+    response.headers["Cache-Control"] = max_age(0 if fresh else services_quotes.CACHE_TTL_SECONDS)
     return {"quote": quote_data if quote_data else None}
 
 # ----------------- OS mode API -----------------
 
 @app.get("/os/mode")
-def read_os_mode():
+def read_os_mode(request: Request):
     """
     Return the current MaisonOS mode, e.g. {"mode": "focus"}.
     """
     # Prefer agent_state (real runtime), fallback to config if needed
     mode = get_mode() or getattr(load_config(), "os_mode", "default")
-    return {"mode": mode}
+    return cached_json(request, {"mode": mode})
 
 @app.post("/os/mode")
-def write_os_mode(mode: str = Query(...)):
+async def write_os_mode(mode: str = Query(...)):
     """
     Set MaisonOS mode and persist to config.json + sync agent_state.
     """
+    return await bulkhead.persistence.run(_write_os_mode, mode)
+
+def _write_os_mode(mode: str):
     try:
         mode_norm = (mode or "default").strip().lower()
         cfg = apply_mode(mode_norm)           # ✅ persist config + layout changes
@@ -249,14 +461,35 @@ def write_os_mode(mode: str = Query(...)):
 # ----------------- Context API -----------------
 
 @app.get("/api/context/full")
-def api_full_context():
-    return build_context()
+async def api_full_context():
+    return await bulkhead.upstream.run(build_context)
 
 # ----------------- Mirror Snapshot API -----------------
 
 @app.get("/api/mirror/snapshot")
-def api_mirror_snapshot():
-    return get_mirror_snapshot()
+async def api_mirror_snapshot(
+    request: Request,
+    sections: Optional[str] = Query(None, description="Comma-separated sections to compute (default: all)"),
+    since: Optional[str] = Query(None, description="Snapshot version the client already has"),
+    fmt: SnapshotDiffFormat = Query("sections", alias="format", description="sections: changed widgets; patch: RFC 6902 ops"),
+):
+    """
+    Sections: weather, stock_quotes, stock_history, news, today, quotes.
+    Only the requested ones are computed; their widgets are returned.
+
+    Every snapshot carries a "version" and per-widget content "hashes".
+    With ?since=<version> only what changed is returned (see
+    snapshot_since); an unknown version gets the full snapshot.
+    """
+    include = [s.strip() for s in sections.split(",") if s.strip()] if sections else None
+    try:
+        snapshot = await bulkhead.upstream.run(get_mirror_snapshot, include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    body = snapshot_since(snapshot, since, fmt)
+    # "timestamp" changes on every call; the version covers the actual data
+    tag = snapshot["version"] if since is None else f"{snapshot['version']}-{since}-{fmt}"
+    return cached_json(request, body, etag=f'"snapshot-{tag}"')
 
 # ----------------- Alarms API -----------------
 
@@ -286,6 +519,66 @@ def api_check_alarms():
 
 # ----------------- System Control API -----------------
 
+@app.get("/api/system/persistence")
+def api_system_persistence():
+    """
+    Counters from the coalescing config writer (SD card wear / latency).
+    """
+    return persistence_writer.stats()
+
+@app.get("/api/system/upstream")
+def api_system_upstream():
+    """
+    Per-provider request / error / retry / latency counters for the
+    pooled upstream HTTP client, plus single-flight dedup counters.
+    """
+    return {**upstream.stats(), "singleflight": upstream.flight_stats()}
+
+@app.get("/api/system/breakers")
+def api_system_breakers():
+    """
+    Circuit breaker per upstream provider: closed / open / half_open,
+    consecutive failures, seconds until the next probe, rejected calls.
+    """
+    return upstream.breaker_stats()
+
+@app.get("/api/system/ratelimit")
+def api_system_ratelimit():
+    """
+    Current upstream budget per provider: token bucket level, calls used
+    and remaining today (persisted across restarts), queued and shed counts.
+    """
+    return upstream.rate_limit_stats()
+
+@app.get("/api/system/cache")
+def api_system_cache():
+    """
+    Hit / miss / stale / eviction counters for the upstream data caches
+    (weather, news, stocks, quotes), plus the on-disk candle store and
+    snapshot section deadline misses.
+    """
+    return {
+        **ttl_cache.stats(),
+        "candles": candle_store.stats(),
+        "analytics": stock_analytics.stats(),
+        "snapshot": snapshot_engine.stats(),
+    }
+
+@app.get("/api/system/bulkheads")
+def api_system_bulkheads():
+    """
+    Running / queued / rejected calls per bulkhead executor
+    (upstream, voice, persistence).
+    """
+    return bulkhead.stats()
+
+@app.get("/api/system/scheduler")
+def api_system_scheduler():
+    """
+    Background refresh jobs: cadence, last run, duration and errors.
+    """
+    return refresh_scheduler.scheduler.stats()
+
 @app.post("/api/system/shutdown")
 def api_system_shutdown():
     """
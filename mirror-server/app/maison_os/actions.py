@@ -1,11 +1,11 @@
 # mirror-server/app/actions.py
 from __future__ import annotations
 
-from typing import Dict, Any
+from typing import Dict, Any, List
 
-from ..config_store import load_config, save_config
-from ..models import MirrorConfig
-from ..widget_store import widget_state
+from ..config_store import config_transaction
+from ..config_patch import apply_merge_patch
+from ..widget_store import widget_state, set_widget_state, replace_widget_state
 from ..os_modes import apply_mode
 
 ALLOWED_WIDGETS = {"clock", "weather", "today", "surf", "news", "stocks"}
@@ -13,36 +13,24 @@ ALLOWED_FONTS = {"serif", "sans"}          # must match client config.ts
 ALLOWED_ACCENTS = {"white", "gold", "silver"}  # must match client config.ts
 
 def _save_cfg_dict_patch(patch: Dict[str, Any]) -> None:
-    cfg = load_config()
-    data = cfg.model_dump()
-
-    for k, v in patch.items():
-        if isinstance(v, dict) and isinstance(data.get(k), dict):
-            data[k] = {**data.get(k, {}), **v}
-        else:
-            data[k] = v
-
-    save_config(MirrorConfig(**data))
+    with config_transaction() as tx:
+        tx.data = apply_merge_patch(tx.data, patch)
 
 def _set_widget_enabled(widget: str, enabled: bool) -> None:
     if widget not in ALLOWED_WIDGETS:
         return
-    cfg = load_config()
-    data = cfg.model_dump()
-    widgets = dict(data.get("widgets") or {})
-    widgets[widget] = bool(enabled)
-    data["widgets"] = widgets
-    save_config(MirrorConfig(**data))
+    with config_transaction() as tx:
+        widgets = dict(tx.data.get("widgets") or {})
+        widgets[widget] = bool(enabled)
+        tx.data["widgets"] = widgets
 
 def _bulk_widgets(patch: Dict[str, Any]) -> None:
-    cfg = load_config()
-    data = cfg.model_dump()
-    widgets = dict(data.get("widgets") or {})
-    for k, v in patch.items():
-        if k in ALLOWED_WIDGETS and isinstance(v, bool):
-            widgets[k] = v
-    data["widgets"] = widgets
-    save_config(MirrorConfig(**data))
+    with config_transaction() as tx:
+        widgets = dict(tx.data.get("widgets") or {})
+        for k, v in patch.items():
+            if k in ALLOWED_WIDGETS and isinstance(v, bool):
+                widgets[k] = v
+        tx.data["widgets"] = widgets
 
 def _patch_display(patch: Dict[str, Any]) -> None:
     allowed_keys = {
@@ -78,13 +66,27 @@ def _patch_layout(widget: str, layout_patch: Dict[str, Any]) -> None:
     if not cleaned:
         return
 
-    cfg = load_config()
-    data = cfg.model_dump()
-    layouts = dict(data.get("layouts") or {})
-    current = dict(layouts.get(widget) or {})
-    layouts[widget] = {**current, **cleaned}
-    data["layouts"] = layouts
-    save_config(MirrorConfig(**data))
+    with config_transaction() as tx:
+        layouts = dict(tx.data.get("layouts") or {})
+        current = dict(layouts.get(widget) or {})
+        layouts[widget] = {**current, **cleaned}
+        tx.data["layouts"] = layouts
+
+def execute_actions(actions: List[Dict[str, Any]]) -> None:
+    """
+    Run a batch of actions as one config transaction (one load, one
+    validation, one save). On failure nothing is persisted and
+    widget_state is restored.
+    """
+    widget_backup = dict(widget_state)
+    try:
+        with config_transaction():
+            for action in actions:
+                execute_action(action["type"], action.get("payload", {}) or {})
+    except Exception:
+        if widget_state != widget_backup:
+            replace_widget_state(widget_backup)
+        raise
 
 def execute_action(action_type: str, payload: Dict[str, Any]) -> None:
     # ---------------- SPEAK ----------------
@@ -97,7 +99,7 @@ def execute_action(action_type: str, payload: Dict[str, Any]) -> None:
         widget = payload.get("widget")
         data = payload.get("data", {})
         if widget:
-            widget_state[widget] = data
+            set_widget_state(widget, data)
             print(f"[AGENT UPDATE_WIDGET] {widget} -> {data}")
         return
 
@@ -162,23 +164,22 @@ def execute_action(action_type: str, payload: Dict[str, Any]) -> None:
         frm = (payload.get("from") or "").strip()
         to = (payload.get("to") or "").strip()
         if frm in ALLOWED_WIDGETS and to in ALLOWED_WIDGETS and frm != to:
-            cfg = load_config()
-            data = cfg.model_dump()
-
-            widgets = dict(data.get("widgets") or {})
-            widgets[frm] = False
-            widgets[to] = True
-            data["widgets"] = widgets
-
-            # optional: swap layouts so the new widget takes the old spot
-            layouts = dict(data.get("layouts") or {})
-            if frm in layouts:
-                old = dict(layouts.get(frm) or {})
-                new = dict(layouts.get(to) or {})
-                layouts[to] = old or new
-                data["layouts"] = layouts
-
-            save_config(MirrorConfig(**data))
+            with config_transaction() as tx:
+                data = tx.data
+
+                widgets = dict(data.get("widgets") or {})
+                widgets[frm] = False
+                widgets[to] = True
+                data["widgets"] = widgets
+
+                # optional: swap layouts so the new widget takes the old spot
+                layouts = dict(data.get("layouts") or {})
+                if frm in layouts:
+                    old = dict(layouts.get(frm) or {})
+                    new = dict(layouts.get(to) or {})
+                    layouts[to] = old or new
+                    data["layouts"] = layouts
+
             print(f"[AGENT REPLACE] {frm} -> {to}")
         return
 
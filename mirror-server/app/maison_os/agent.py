@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import os
+import re
 from typing import Dict, Any, List, Callable, Optional, Tuple
 
 from .events import Event, EventType
@@ -15,6 +17,8 @@ from .agent_state import (
 )
 
 from .mirror_snapshot import get_mirror_snapshot
+from ..config_store import load_config
+from .. import stock_analytics
 
 
 # ----------------------------
@@ -225,12 +229,199 @@ def plan_ui_actions(text: str) -> Tuple[Optional[str], List[Dict[str, Any]]]:
 
 
 
+# ----------------------------
+# Stock analytics questions (local, no LLM)
+# ----------------------------
+
+_COMPANY_SYMBOLS: Dict[str, str] = {
+    "tesla": "TSLA",
+    "nvidia": "NVDA",
+    "apple": "AAPL",
+    "microsoft": "MSFT",
+    "amazon": "AMZN",
+    "google": "GOOGL",
+    "alphabet": "GOOGL",
+    "meta": "META",
+    "netflix": "NFLX",
+    "s&p": "SPY",
+}
+
+# Longest phrases first so "this month" wins over "month"
+_PERIOD_PHRASES: List[Tuple[str, str]] = [
+    ("year to date", "ytd"),
+    ("this year", "ytd"),
+    ("ytd", "ytd"),
+    ("this month", "mtd"),
+    ("six months", "6m"),
+    ("6 months", "6m"),
+    ("three months", "3m"),
+    ("3 months", "3m"),
+    ("quarter", "3m"),
+    ("this week", "1w"),
+    ("week", "1w"),
+    ("month", "1m"),
+    ("year", "1y"),
+    ("today", "1d"),
+]
+
+_METRIC_PHRASES: Dict[str, List[str]] = {
+    "volatility": ["volatil", "choppy", "swing"],
+    "sma": ["moving average", "sma", "200 day", "50 day"],
+    "range": ["52 week", "52-week", "all time high", "yearly high", "year high", "year low"],
+    "drawdown": ["drawdown", "drop from", "off its high", "off the high"],
+    "movers": ["mover", "best", "worst", "biggest"],
+}
+
+
+def _watchlist() -> List[str]:
+    try:
+        cfg = load_config()
+    except Exception:
+        return []
+    return [s.symbol.strip().upper() for s in cfg.stocksItems if s.symbol.strip()]
+
+
+# Words that make a neighbouring bare ticker count ("NOW stock", "price of it")
+_STOCK_KEYWORDS = {"stock", "stocks", "share", "shares", "ticker", "price"}
+# Tickers that aren't English words, safe to match in lowercase transcripts
+_UNAMBIGUOUS_TICKERS = {"tsla", "nvda", "aapl", "msft", "amzn", "googl", "nflx"}
+# Company names that are also everyday words ("I had an apple")
+_COMMON_WORD_NAMES = {"apple", "meta", "amazon", "google", "alphabet"}
+
+
+def _has_word(lower: str, phrase: str) -> bool:
+    return re.search(rf"(?<![A-Za-z0-9]){re.escape(phrase)}(?![A-Za-z0-9])", lower) is not None
+
+
+def _mentioned_symbols(text: str, watchlist: List[str]) -> List[str]:
+    """
+    Symbols named in `text` (original case). Company names must be whole
+    words ("meta", not "metaphors"); those that are also everyday words
+    ("apple") need a capital letter or a stock keyword in the sentence.
+    Tickers double as English words ("now", "it"), so a bare ticker only
+    counts when it's written in caps, prefixed with $, next to a stock
+    keyword, or unambiguous.
+    """
+    lower = text.lower()
+    tokens = re.findall(r"\$?[A-Za-z0-9.&^-]+", text)
+    plain = [t.lstrip("$").lower() for t in tokens]
+    any_keyword = any(p in _STOCK_KEYWORDS for p in plain)
+
+    found: List[str] = []
+    for name, sym in _COMPANY_SYMBOLS.items():
+        if not _has_word(lower, name) or sym in found:
+            continue
+        if name in _COMMON_WORD_NAMES and not any_keyword and not _has_word(text, name.capitalize()):
+            continue
+        found.append(sym)
+
+    symbols = {sym.lower(): sym for sym in [*watchlist, *_COMPANY_SYMBOLS.values()] if len(sym) > 1}
+    for i, token in enumerate(tokens):
+        sym = symbols.get(plain[i])
+        if sym is None or sym in found:
+            continue
+        near_keyword = any(p in _STOCK_KEYWORDS for p in plain[max(0, i - 1):i + 2])
+        if token.startswith("$") or token.isupper() or near_keyword or plain[i] in _UNAMBIGUOUS_TICKERS:
+            found.append(sym)
+    return found
+
+
+def _parse_period(lower: str) -> Optional[str]:
+    # "52-week high" names a metric, not a period
+    lower = re.sub(r"52[- ]week", "", lower)
+    for phrase, period in _PERIOD_PHRASES:
+        if phrase in lower:
+            return period
+    return None
+
+
+def _parse_metrics(lower: str) -> List[str]:
+    return [m for m, phrases in _METRIC_PHRASES.items() if any(p in lower for p in phrases)]
+
+
+def _move(change: float) -> str:
+    direction = "up" if change > 0 else "down" if change < 0 else "flat"
+    return direction if change == 0 else f"{direction} {abs(change):.1f}%"
+
+
+def answer_stock_analytics(text: str) -> str:
+    """Answer 'how's NVDA done this month'-style questions from stored candles."""
+    lower = (text or "").lower()
+    watchlist = _watchlist()
+    symbols = _mentioned_symbols(text or "", watchlist)
+    metrics = _parse_metrics(lower)
+    asked_period = _parse_period(lower)
+    period = asked_period or "1d"
+    label = stock_analytics.PERIOD_LABELS[period]
+
+    if not symbols or "movers" in metrics:
+        top = stock_analytics.movers(symbols or watchlist, period, n=3)
+        if not top:
+            return "I don’t have enough price history for the watchlist yet."
+        moves = ", ".join(f"{m['symbol']} {_move(m['change'])}" for m in top)
+        return f"Biggest movers {label}: {moves}."
+
+    data = stock_analytics.watchlist_analytics(symbols)
+    parts: List[str] = []
+    for sym in symbols:
+        m = data.get(sym)
+        if not m:
+            parts.append(f"I don’t have price history for {sym} yet.")
+            continue
+
+        change = m["returns"][period]
+        # "is NVDA above its 200-day average" doesn't need the daily move
+        if asked_period or not metrics:
+            if change is None:
+                parts.append(f"I don’t have enough {sym} history for {label}.")
+            else:
+                parts.append(f"{sym} is {_move(change)} {label}, at ${m['price']:.2f}.")
+
+        if "volatility" in metrics and m["volatility"] is not None:
+            parts.append(f"{sym}’s annualized volatility is about {m['volatility']:.0f}%.")
+        if "sma" in metrics:
+            for window in ("50", "200"):
+                avg = m["sma"][window]
+                if avg is not None:
+                    side = "above" if m["price"] >= avg else "below"
+                    parts.append(f"{sym} is {side} its {window}-day average of ${avg:.2f}.")
+        if "range" in metrics and m["high52w"] is not None:
+            parts.append(
+                f"{sym} is {abs(m['fromHigh52w']):.1f}% below its 52-week high of ${m['high52w']:.2f} "
+                f"and {m['fromLow52w']:.1f}% above the low of ${m['low52w']:.2f}."
+            )
+        if "drawdown" in metrics and m["maxDrawdown"] is not None:
+            parts.append(
+                f"{sym} is {abs(m['fromHigh52w']):.1f}% off its high; "
+                f"its worst drawdown over the past year was {abs(m['maxDrawdown']):.1f}%."
+            )
+    return " ".join(parts)
+
+
+# Snapshot sections each data intent reads; nothing else is computed
+# (weather questions never touch Finnhub, quotes skip history).
+# stocks_analytics is answered from the candle store, without a snapshot.
+# The user asked for this data, so wait for it well past the kiosk's
+# SNAPSHOT_DEADLINE_SECONDS instead of answering from cold placeholders;
+# still capped so a hung provider can't stall the voice turn.
+VOICE_SNAPSHOT_DEADLINE_SECONDS = float(os.getenv("MAISON_VOICE_SNAPSHOT_DEADLINE", "8"))
+
+_INTENT_SECTIONS: Dict[str, Tuple[str, ...]] = {
+    "weather_summary": ("weather",),
+    "news_summary": ("news",),
+    "stocks_summary": ("stock_quotes",),
+    "mirror_overview": ("weather", "today"),
+    "quote_reading": ("quotes",),
+}
+
+
 class MaisonAgent:
     """Event-driven agent with access to HomeGraph + UI actions."""
 
     def __init__(self) -> None:
         self.home = HomeGraphManager()
         self.action_handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self.batch_handler: Optional[Callable[[List[Dict[str, Any]]], None]] = None
 
     def register_action_handler(
         self,
@@ -239,6 +430,22 @@ class MaisonAgent:
     ) -> None:
         self.action_handlers[action_type] = handler
 
+    def register_batch_handler(
+        self,
+        handler: Callable[[List[Dict[str, Any]]], None],
+    ) -> None:
+        """Run planned action lists as one transaction instead of one by one."""
+        self.batch_handler = handler
+
+    def emit_actions(self, actions: List[Dict[str, Any]]) -> None:
+        if not actions:
+            return
+        if self.batch_handler:
+            self.batch_handler(actions)
+            return
+        for action in actions:
+            self.emit_action(action["type"], action.get("payload", {}))
+
     def emit_action(self, action_type: str, payload: Dict[str, Any]) -> None:
         handler = self.action_handlers.get(action_type)
         if handler:
@@ -275,8 +482,7 @@ class MaisonAgent:
 
         self.emit_action("speak", {"text": response})
 
-        for action in actions:
-            self.emit_action(action["type"], action.get("payload", {}))
+        self.emit_actions(actions)
 
     def _on_tick(self, event: Event) -> None:
         pass
@@ -296,14 +502,18 @@ class MaisonAgent:
             return ui_response, ui_actions
 
         # 2) Snapshot-based answers (keeps Zo grounded in what’s on-screen)
-        data_intent = self._detect_data_intent(lower)
+        data_intent = self._detect_data_intent(lower, text)
         if data_intent != "none":
             return self._answer_with_snapshot(text, data_intent), []
 
         return "I’m here. What would you like to change?", []
 
-    def _detect_data_intent(self, lower: str) -> str:
-        if any(k in lower for k in ["tesla", "tsla", "nvidia", "nvda", "stock", "stocks", "portfolio", "watchlist"]):
+    def _detect_data_intent(self, lower: str, text: Optional[str] = None) -> str:
+        stock_words = any(_has_word(lower, k) for k in ["stock", "stocks", "portfolio", "watchlist", "movers"])
+        if stock_words or _mentioned_symbols(text if text is not None else lower, _watchlist()):
+            # Periods / metrics need history -> local analytics; otherwise today's quotes
+            if _parse_period(lower) not in (None, "1d") or _parse_metrics(lower):
+                return "stocks_analytics"
             return "stocks_summary"
         if any(k in lower for k in ["headline", "headlines", "news"]):
             return "news_summary"
@@ -316,7 +526,11 @@ class MaisonAgent:
         return "none"
 
     def _answer_with_snapshot(self, user_text: str, intent: str) -> str:
-        snapshot = get_mirror_snapshot()
+        if intent == "stocks_analytics":
+            # Served from the candle store; no need to build a snapshot
+            return answer_stock_analytics(user_text)
+
+        snapshot = get_mirror_snapshot(include=_INTENT_SECTIONS[intent], deadline=VOICE_SNAPSHOT_DEADLINE_SECONDS)
         widgets = snapshot.get("widgets", {})
 
         if intent == "weather_summary":
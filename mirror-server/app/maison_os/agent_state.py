@@ -1,7 +1,9 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, asdict
 from typing import Optional, Dict, Any
 import time
 
+from .. import change_feed
+
 
 @dataclass
 class AgentState:
@@ -10,17 +12,28 @@ class AgentState:
     last_response: Optional[str] = None
     context: Dict[str, Any] = field(default_factory=dict)
     os_mode: str = "default"  # "default" | "focus" | "market" | ...
+    version: int = 0  # bumped on every change (long-poll ?since=)
 
 
 # Single shared instance
 state = AgentState()
 
 
+def _changed() -> None:
+    state.version += 1
+    change_feed.publish("agent_state", asdict(state))
+
+
+def get_version() -> int:
+    return state.version
+
+
 # ---- OS mode helpers ----
 
 def set_mode(mode: str) -> None:
     """Set the current MaisonOS mode."""
     state.os_mode = mode
+    _changed()
 
 
 def get_mode() -> str:
@@ -33,13 +46,16 @@ def get_mode() -> str:
 def mark_wake() -> None:
     """Record the last time Zo was woken up."""
     state.last_wake_time = time.time()
+    _changed()
 
 
 def update_user_utterance(text: str) -> None:
     """Store the last thing the user said."""
     state.last_user_utterance = text
+    _changed()
 
 
 def update_response(text: str) -> None:
     """Store the last response Zo generated."""
     state.last_response = text
+    _changed()
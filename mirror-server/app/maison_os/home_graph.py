@@ -5,6 +5,9 @@ from typing import Dict, Any, List, Optional
 import json
 from pathlib import Path
 
+from ..persistence import writer
+from .. import change_feed
+
 
 # -------- Data models -------- #
 
@@ -58,6 +61,7 @@ class HomeGraphManager:
     def __init__(self, config_path: Optional[Path] = None):
         self.config_path = config_path or (Path(__file__).parent / "home_graph.json")
         self.graph = HomeGraphModel()
+        self.version = 0  # bumped on every save (long-poll ?since=)
         self._load_or_init()
 
     # ----- persistence ----- #
@@ -136,7 +140,9 @@ class HomeGraphManager:
     def save(self) -> None:
         try:
             data = self._to_dict()
-            self.config_path.write_text(json.dumps(data, indent=2))
+            writer.submit(self.config_path, json.dumps(data, indent=2))
+            self.version += 1
+            change_feed.publish("home_graph", {"version": self.version, "graph": data})
         except Exception as e:
             print(f"[HomeGraph] Failed to save {self.config_path}: {e}")
 
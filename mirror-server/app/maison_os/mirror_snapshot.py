@@ -2,138 +2,216 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
+import threading
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, Optional
 
+from ..config_patch import make_json_patch
 from ..config_store import load_config
-from ..weather_service import get_weather_for_city
-from ..services_news import fetch_top_news
-from ..services_stocks import fetch_stock_quotes, fetch_stock_history
+from ..snapshot_engine import SNAPSHOT_DEADLINE_SECONDS, digest, sections
 from .agent_state import get_mode
 
+# Engine sections each widget is built from; the first one is required,
+# the rest are optional extras (stocks without history skips Finnhub
+# candles).
+WIDGET_SECTIONS: Dict[str, tuple] = {
+    "weather": ("weather",),
+    "stocks": ("stock_quotes", "stock_history"),
+    "news": ("news",),
+    "today": ("today",),
+    "quotes": ("quotes",),
+}
+SNAPSHOT_SECTIONS = tuple(name for names in WIDGET_SECTIONS.values() for name in names)
+
+# Recent snapshots by version, for ?since= diffs
+SNAPSHOT_VERSIONS_KEPT = 32
+_versions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_versions_lock = threading.Lock()
+
 
 def _iso_now_utc() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def _as_dict(cfg: Any) -> Dict[str, Any]:
-    """
-    Normalize MirrorConfig (or dict) into a plain dict so we can use .get() safely.
+def _stale(widget: Dict[str, Any], *parts: Dict[str, Any]) -> Dict[str, Any]:
+    if any(part.get("stale") for part in parts):
+        widget["stale"] = True
+    return widget
+
+
+def _hash(value: Any) -> str:
+    body = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()[:16]
+
+
+def _widget_hash(widget: Dict[str, Any], parts: tuple) -> str:
+    # A widget is a pure function of its sections plus these flags, so
+    # hashing the (memoized) section digests is enough
+    flags = {k: widget.get(k) for k in ("enabled", "stale", "error")}
+    return _hash([flags, *(digest(part) for part in parts)])
+
+
+def get_mirror_snapshot(
+    include: Optional[Iterable[str]] = None,
+    deadline: Optional[float] = SNAPSHOT_DEADLINE_SECONDS,
+) -> Dict[str, Any]:
     """
-    if isinstance(cfg, dict):
-        return cfg
-    if hasattr(cfg, "model_dump"):
-        return cfg.model_dump()
-    if hasattr(cfg, "dict"):
-        return cfg.dict()  # type: ignore[call-arg]
-    return dict(cfg)
+    What's on the mirror right now, per widget. Sections come from the
+    shared snapshot engine (memoized, built concurrently), so building
+    this right after build_context() costs no extra upstream calls.
+
+    include: engine section names to compute (default: all of
+    SNAPSHOT_SECTIONS); only those are built and only their widgets are
+    returned. "stock_history" implies "stock_quotes"; the stocks widget
+    has history None without it.
 
+    Widgets whose section isn't ready within `deadline` seconds show
+    their last cached data with "stale": true; deadline=None waits.
+    """
+    include = set(SNAPSHOT_SECTIONS if include is None else include)
+    unknown = include - set(SNAPSHOT_SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown snapshot section(s): {', '.join(sorted(unknown))}")
+    if "stock_history" in include:
+        include.add("stock_quotes")
 
-def get_mirror_snapshot() -> Dict[str, Any]:
-    raw_cfg = load_config()
-    config = _as_dict(raw_cfg)
+    cfg = load_config()
 
     # In your config/models, widgets are booleans, not {enabled: true}
-    widgets_cfg: Dict[str, Any] = config.get("widgets", {}) or {}
+    widgets_cfg = cfg.widgets
+    wanted = [widget for widget, names in WIDGET_SECTIONS.items() if names[0] in include]
+    s = sections(
+        [name for widget in wanted if getattr(widgets_cfg, widget) for name in WIDGET_SECTIONS[widget] if name in include],
+        cfg,
+        deadline=deadline,
+    )
 
     snapshot: Dict[str, Any] = {
         "timestamp": _iso_now_utc(),
-        "os_mode": get_mode() or config.get("os_mode", "default"),
-        "widgets": {},
+        "os_mode": get_mode() or cfg.os_mode or "default",
+        "widgets": {widget: {"enabled": False} for widget in wanted},
     }
+    # widget -> section values it was built from
+    parts: Dict[str, tuple] = {}
 
     # ---------------- Weather ----------------
-    weather_enabled = bool(widgets_cfg.get("weather", True))
-    if weather_enabled:
-        try:
-            city = config.get("location") or "San Diego"
-            weather = get_weather_for_city(city)
-            snapshot["widgets"]["weather"] = {
+    if "weather" in s:
+        weather = s["weather"]
+        parts["weather"] = (weather,)
+        if weather.get("error"):
+            snapshot["widgets"]["weather"] = {"enabled": False, "error": weather["error"]}
+        else:
+            data = weather["data"]
+            snapshot["widgets"]["weather"] = _stale({
                 "enabled": True,
-                "city": city,
-                "temperatureF": weather.get("temperatureF"),
-                "description": weather.get("weatherDescription"),
-                "symbol": weather.get("symbol"),
-                "raw": weather,
-            }
-        except Exception as e:
-            snapshot["widgets"]["weather"] = {"enabled": False, "error": str(e)}
-    else:
-        snapshot["widgets"]["weather"] = {"enabled": False}
+                "city": weather["city"],
+                "temperatureF": data.get("temperatureF"),
+                "description": data.get("weatherDescription"),
+                "symbol": data.get("symbol"),
+                "raw": data,
+            }, weather)
 
     # ---------------- Stocks ----------------
-    stocks_enabled = bool(widgets_cfg.get("stocks", True))
-    if stocks_enabled:
-        stocks_items = config.get("stocksItems", []) or []
-        symbols: List[str] = []
-
-        for item in stocks_items:
-            # items should be dicts like {"symbol":"NVDA"} (from your config.json)
-            if isinstance(item, dict):
-                sym = (item.get("symbol") or "").strip().upper()
-            else:
-                # allow raw strings too, just in case
-                sym = str(item).strip().upper()
-
-            if sym:
-                symbols.append(sym)
-
-        quotes = fetch_stock_quotes(symbols) if symbols else []
-
-        history_data: Dict[str, List[Dict[str, Any]]] = {}
-        for sym in symbols:
-            hist = fetch_stock_history(sym, points=40)
-            if hist:
-                history_data[sym] = hist
-
-        snapshot["widgets"]["stocks"] = {
+    if "stock_quotes" in s:
+        quotes = s["stock_quotes"]
+        history = s.get("stock_history") or {}
+        parts["stocks"] = (quotes, history)
+        errors = {**(history.get("errors") or {}), **(quotes["errors"] or {})}
+        snapshot["widgets"]["stocks"] = _stale({
             "enabled": True,
-            "symbols": symbols,
+            "symbols": quotes["symbols"],
             # canonical field for Zo (agent expects this)
-            "watchlist": quotes,
+            "watchlist": quotes["quotes"],
             # keep for backwards compatibility
-            "quotes": quotes,
-            "history": history_data if history_data else None,
-        }
-    else:
-        snapshot["widgets"]["stocks"] = {"enabled": False}
+            "quotes": quotes["quotes"],
+            "history": history.get("history"),
+            "errors": errors or None,
+            "marketOpen": quotes["marketOpen"],
+            "session": quotes["session"],
+            "nextRefreshAt": quotes["nextRefreshAt"],
+        }, quotes, history)
 
     # ---------------- News ----------------
-    news_enabled = bool(widgets_cfg.get("news", True))
-    if news_enabled:
-        try:
-            headlines = fetch_top_news(category="technology", country="us")
-            snapshot["widgets"]["news"] = {
-                "enabled": True,
-                "headlines": headlines if isinstance(headlines, list) else [],
-            }
-        except Exception as e:
-            snapshot["widgets"]["news"] = {"enabled": False, "error": str(e)}
-    else:
-        snapshot["widgets"]["news"] = {"enabled": False}
+    if "news" in s:
+        news = s["news"]
+        parts["news"] = (news,)
+        if news.get("error"):
+            snapshot["widgets"]["news"] = {"enabled": False, "error": news["error"]}
+        else:
+            snapshot["widgets"]["news"] = _stale({"enabled": True, "headlines": news["articles"]}, news)
 
     # ---------------- Today ----------------
-    today_enabled = bool(widgets_cfg.get("today", True))
-    if today_enabled:
-        today_items = config.get("todayItems", []) or []
-        snapshot["widgets"]["today"] = {
-            "enabled": True,
-            "items": today_items if isinstance(today_items, list) else [],
-        }
-    else:
-        snapshot["widgets"]["today"] = {"enabled": False}
+    if "today" in s:
+        parts["today"] = (s["today"],)
+        snapshot["widgets"]["today"] = {"enabled": True, "items": s["today"]}
 
     # ---------------- Quotes ----------------
-    quotes_enabled = bool(widgets_cfg.get("quotes", True))
-    if quotes_enabled:
-        current_quote = config.get("currentQuote")
-        categories = config.get("quotesCategories", ["inspirational", "wisdom"])
-        snapshot["widgets"]["quotes"] = {
-            "enabled": True,
-            "current_quote": current_quote,
-            "categories": categories if isinstance(categories, list) else [],
-        }
-    else:
-        snapshot["widgets"]["quotes"] = {"enabled": False}
-
+    if "quotes" in s:
+        parts["quotes"] = (s["quotes"],)
+        snapshot["widgets"]["quotes"] = {"enabled": True, **s["quotes"]}
+
+    # ---------------- Versioning ----------------
+    hashes = {widget: _widget_hash(w, parts.get(widget, ())) for widget, w in snapshot["widgets"].items()}
+    snapshot["hashes"] = hashes
+    snapshot["version"] = _hash([snapshot["os_mode"], sorted(hashes.items())])
     return snapshot
+
+
+def _remember(snapshot: Dict[str, Any]) -> None:
+    with _versions_lock:
+        _versions[snapshot["version"]] = snapshot
+        _versions.move_to_end(snapshot["version"])
+        while len(_versions) > SNAPSHOT_VERSIONS_KEPT:
+            _versions.popitem(last=False)
+
+
+def snapshot_since(snapshot: Dict[str, Any], since: Optional[str], fmt: str = "sections") -> Dict[str, Any]:
+    """
+    What a client holding snapshot version `since` needs to catch up
+    with `snapshot`. Remembers `snapshot` so later calls can diff
+    against it.
+
+      fmt="sections"  changed widgets only, plus "removed" widget names
+      fmt="patch"     RFC 6902 ops turning the old snapshot into this one
+
+    Unknown / expired versions (or since=None) get the full snapshot,
+    marked "full": true when a diff was asked for.
+    """
+    _remember(snapshot)
+    if since is None:
+        return snapshot
+    with _versions_lock:
+        old = _versions.get(since)
+    if old is None:
+        return {**snapshot, "full": True}
+
+    new_hashes = snapshot["hashes"]
+    old_hashes = old["hashes"]
+    changed = [w for w, h in new_hashes.items() if old_hashes.get(w) != h]
+
+    if fmt == "patch":
+        # Only widgets whose hash moved are walked
+        ops = make_json_patch(
+            {k: v for k, v in old.items() if k != "widgets"},
+            {k: v for k, v in snapshot.items() if k != "widgets"},
+        )
+        ops += [{"op": "remove", "path": f"/widgets/{w}"} for w in old_hashes if w not in new_hashes]
+        for w in changed:
+            if w in old_hashes:
+                ops += make_json_patch(old["widgets"][w], snapshot["widgets"][w], f"/widgets/{w}")
+            else:
+                ops.append({"op": "add", "path": f"/widgets/{w}", "value": snapshot["widgets"][w]})
+        return {"version": snapshot["version"], "since": since, "patch": ops}
+
+    return {
+        "timestamp": snapshot["timestamp"],
+        "os_mode": snapshot["os_mode"],
+        "version": snapshot["version"],
+        "since": since,
+        "hashes": new_hashes,
+        "widgets": {w: snapshot["widgets"][w] for w in changed},
+        "removed": [w for w in old_hashes if w not in new_hashes],
+    }
@@ -0,0 +1,146 @@
+# mirror-server/app/market_calendar.py
+
+"""
+NYSE / NASDAQ session calendar (New York time).
+
+  pre-market   04:00 - 09:30
+  regular      09:30 - 16:00   (13:00 on early-close days)
+  post-market  16:00 - 20:00   (13:00 - 17:00 on early-close days)
+
+Holidays and early closes come from the local tables below (published
+by NYSE a few years ahead). Add the next year when it's announced;
+years missing from the table only skip weekends.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Optional
+from zoneinfo import ZoneInfo
+
+MARKET_TZ = ZoneInfo("America/New_York")
+
+PRE_OPEN = time(4, 0)
+REGULAR_OPEN = time(9, 30)
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+POST_CLOSE = time(20, 0)
+EARLY_POST_CLOSE = time(17, 0)
+
+HOLIDAYS = {
+    # 2025
+    date(2025, 1, 1), date(2025, 1, 9), date(2025, 1, 20), date(2025, 2, 17),
+    date(2025, 4, 18), date(2025, 5, 26), date(2025, 6, 19), date(2025, 7, 4),
+    date(2025, 9, 1), date(2025, 11, 27), date(2025, 12, 25),
+    # 2026
+    date(2026, 1, 1), date(2026, 1, 19), date(2026, 2, 16), date(2026, 4, 3),
+    date(2026, 5, 25), date(2026, 6, 19), date(2026, 7, 3), date(2026, 9, 7),
+    date(2026, 11, 26), date(2026, 12, 25),
+    # 2027
+    date(2027, 1, 1), date(2027, 1, 18), date(2027, 2, 15), date(2027, 3, 26),
+    date(2027, 5, 31), date(2027, 6, 18), date(2027, 7, 5), date(2027, 9, 6),
+    date(2027, 11, 25), date(2027, 12, 24),
+}
+
+EARLY_CLOSES = {
+    date(2025, 7, 3), date(2025, 11, 28), date(2025, 12, 24),
+    date(2026, 11, 27), date(2026, 12, 24),
+    date(2027, 11, 26),
+}
+
+PRE = "pre"
+REGULAR = "regular"
+POST = "post"
+CLOSED = "closed"
+
+
+def _local(now: Optional[datetime]) -> datetime:
+    return (now or datetime.now(timezone.utc)).astimezone(MARKET_TZ)
+
+
+def is_trading_day(day: date) -> bool:
+    return day.weekday() < 5 and day not in HOLIDAYS
+
+
+def _at(day: date, t: time) -> datetime:
+    return datetime.combine(day, t, tzinfo=MARKET_TZ)
+
+
+def regular_close_time(day: date) -> time:
+    return EARLY_CLOSE if day in EARLY_CLOSES else REGULAR_CLOSE
+
+
+def post_close_time(day: date) -> time:
+    return EARLY_POST_CLOSE if day in EARLY_CLOSES else POST_CLOSE
+
+
+def session_at(now: Optional[datetime] = None) -> str:
+    """PRE, REGULAR, POST or CLOSED at `now` (default: current time)."""
+    local = _local(now)
+    day = local.date()
+    if not is_trading_day(day):
+        return CLOSED
+
+    t = local.time()
+    if PRE_OPEN <= t < REGULAR_OPEN:
+        return PRE
+    if REGULAR_OPEN <= t < regular_close_time(day):
+        return REGULAR
+    if regular_close_time(day) <= t < post_close_time(day):
+        return POST
+    return CLOSED
+
+
+def is_open(now: Optional[datetime] = None, extended: bool = False) -> bool:
+    """Regular session (or any session incl. pre/post with extended=True)."""
+    session = session_at(now)
+    return session == REGULAR or (extended and session in (PRE, POST))
+
+
+def _next_trading_day(day: date) -> date:
+    day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return day
+
+
+def next_session_start(now: Optional[datetime] = None) -> datetime:
+    """Start of the next pre-market window strictly after `now`."""
+    local = _local(now)
+    day = local.date()
+    if is_trading_day(day) and local < _at(day, PRE_OPEN):
+        return _at(day, PRE_OPEN)
+    return _at(_next_trading_day(day), PRE_OPEN)
+
+
+def next_open(now: Optional[datetime] = None) -> datetime:
+    """Next regular-session open strictly after `now`."""
+    local = _local(now)
+    day = local.date()
+    if is_trading_day(day) and local < _at(day, REGULAR_OPEN):
+        return _at(day, REGULAR_OPEN)
+    return _at(_next_trading_day(day), REGULAR_OPEN)
+
+
+def next_close(now: Optional[datetime] = None) -> datetime:
+    """Next regular-session close at or after `now` (today's if not yet closed)."""
+    local = _local(now)
+    day = local.date()
+    if is_trading_day(day) and local < _at(day, regular_close_time(day)):
+        return _at(day, regular_close_time(day))
+    nxt = _next_trading_day(day)
+    return _at(nxt, regular_close_time(nxt))
+
+
+def seconds_until(when: datetime, now: Optional[datetime] = None) -> float:
+    return max(0.0, (when - _local(now)).total_seconds())
+
+
+def market_status(now: Optional[datetime] = None) -> Dict[str, Any]:
+    session = session_at(now)
+    return {
+        "marketOpen": session == REGULAR,
+        "session": session,
+        "nextOpen": next_open(now).isoformat(),
+        "nextClose": next_close(now).isoformat(),
+    }
@@ -1,29 +1,41 @@
 # mirror-server/app/models.py
 
 from typing import List, Optional, Dict, Literal
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 # ---- Shared literal types ----
 
+# Config models are frozen: load_config() hands the same cached instance to
+# every caller, so nobody may mutate it in place (dump -> edit -> rebuild).
+FROZEN = ConfigDict(frozen=True)
+
 BackgroundMode = Literal["off", "edgesStatic", "timeOfDay"]
 VoicePreset = Literal["verse", "alloy", "echo", "sage"]
 
 
 class TodayItem(BaseModel):
+    model_config = FROZEN
+
     time: Optional[str] = None
     label: str
 
 class NewsItem(BaseModel):        # NEW
+    model_config = FROZEN
+
     title: str
     source: Optional[str] = None
     time: Optional[str] = None
 
 class QuoteItem(BaseModel):
+    model_config = FROZEN
+
     quote: str
     author: Optional[str] = None
     category: Optional[str] = None
 
 class AlarmItem(BaseModel):
+    model_config = FROZEN
+
     id: str
     time: str  # Format: "HH:MM" (24-hour)
     enabled: bool = True
@@ -32,6 +44,8 @@ class AlarmItem(BaseModel):
     soundEnabled: bool = True
 
 class Widgets(BaseModel):
+    model_config = FROZEN
+
     clock: bool = True
     weather: bool = True
     today: bool = True
@@ -42,6 +56,8 @@ class Widgets(BaseModel):
     alarms: bool = True
 
 class StockItem(BaseModel):
+    model_config = FROZEN
+
     symbol: str
 
 class MirrorConfig(BaseModel):
@@ -65,6 +81,8 @@ class DisplaySettings(BaseModel):
       layoutPreset: LayoutPresetName;
     """
 
+    model_config = FROZEN
+
     # theme name: "maisonNoir" | "maisonAzure" | "maisonChrome" | "maisonEarth" | "custom"
     theme: str = "maisonNoir"
 
@@ -95,6 +113,8 @@ class DisplaySettings(BaseModel):
 
 
 class WidgetPlacement(BaseModel):
+    model_config = FROZEN
+
     # e.g. "topLeft", "middleCenter", "bottomRight", or shorthand "top"/"center"/"bottom"
     position: str
     # "small", "medium", "large" or None
@@ -117,6 +137,8 @@ class MirrorConfig(BaseModel):
       layouts?: LayoutSettings;
     """
 
+    model_config = FROZEN
+
     os_mode: str = "default"
     location: str = "San Diego"
     widgets: Widgets = Widgets()
@@ -1,16 +1,19 @@
 # mirror-server/app/os_modes.py
 
-from typing import Literal
-from .config_store import load_config, save_config
+from typing import Literal, Optional
+from .config_store import load_config, config_transaction
 from .models import MirrorConfig
 
 OSMode = Literal["default", "focus", "market"]
 
 
-def apply_mode(mode: OSMode) -> MirrorConfig:
+def apply_mode(mode: OSMode) -> Optional[MirrorConfig]:
     """
     Change the mirror config to match a MaisonOS mode and persist it.
 
+    Returns the saved config, or None when joined into an enclosing
+    config_transaction() (it is committed with the rest of the batch).
+
     - default: leave widgets as they are (just update os_mode)
     - focus:   only Clock + Today
     - market:  Clock + Today + Stocks + News
@@ -18,9 +21,12 @@ def apply_mode(mode: OSMode) -> MirrorConfig:
     if mode not in ("default", "focus", "market"):
         raise ValueError(f"Unsupported os_mode: {mode}")
 
-    cfg = load_config()
-    data = cfg.model_dump()
+    with config_transaction() as tx:
+        _apply_mode_to_data(tx.data, mode)
+    return tx.config
 
+
+def _apply_mode_to_data(data: dict, mode: OSMode) -> None:
     widgets = data.get("widgets", {}).copy()
 
     if mode == "focus":
@@ -52,9 +58,6 @@ def apply_mode(mode: OSMode) -> MirrorConfig:
     data["widgets"] = widgets
     data["os_mode"] = mode
 
-    new_cfg = MirrorConfig(**data)
-    return save_config(new_cfg)
-
 
 def get_mode() -> OSMode:
     cfg = load_config()
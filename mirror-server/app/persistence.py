@@ -0,0 +1,225 @@
+# mirror-server/app/persistence.py
+
+"""
+Crash-safe, write-coalescing persistence for small JSON files on the Pi.
+
+- atomic_write_text() / atomic_write_bytes(): temp file + fsync + rename,
+  so a power cut leaves either the old file or the new one, never a
+  half-written config.json.
+- CoalescingWriter: debounces bursts of saves for the same path into a
+  single atomic write (e.g. "hide everything" or replace_widget).
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+# Debounce window for coalesced writes (ms). 0 = write synchronously.
+DEFAULT_DEBOUNCE_MS = int(os.getenv("MAISON_SAVE_DEBOUNCE_MS", "250"))
+
+# A steady stream of saves must still hit disk eventually.
+MAX_DELAY_FACTOR = 4
+
+OnWritten = Callable[[os.stat_result], None]
+OnFailed = Callable[[Exception], None]
+
+
+def _fsync_dir(directory: Path) -> None:
+    # Make the rename itself durable. Not supported everywhere (e.g. Windows).
+    try:
+        fd = os.open(str(directory), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_text(path: Path, text: str) -> int:
+    """
+    Atomically replace `path` with `text`. Returns bytes written.
+    """
+    return atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> int:
+    """
+    Atomically replace `path` with `data`. Returns bytes written.
+    """
+    path = Path(path)
+
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+    _fsync_dir(path.parent)
+    return len(data)
+
+
+class _Pending:
+    __slots__ = ("text", "first_at", "timer", "callbacks", "failbacks")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.first_at = time.monotonic()
+        self.timer: Optional[threading.Timer] = None
+        self.callbacks: list[OnWritten] = []
+        self.failbacks: list[OnFailed] = []
+
+
+class CoalescingWriter:
+    """
+    Debounced atomic writer. The last submitted text for a path wins.
+    """
+
+    def __init__(self, debounce_ms: int = DEFAULT_DEBOUNCE_MS) -> None:
+        self.debounce_ms = max(0, int(debounce_ms))
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()  # keeps writes to disk in submit order
+        self._pending: Dict[Path, _Pending] = {}
+
+        self.writes = 0
+        self.writes_avoided = 0
+        self.bytes_written = 0
+        self.bytes_avoided = 0
+        self.errors = 0
+
+    # ----- public API ----- #
+
+    def submit(
+        self,
+        path: Path,
+        text: str,
+        on_written: Optional[OnWritten] = None,
+        on_failed: Optional[OnFailed] = None,
+    ) -> None:
+        """
+        Schedule `text` to be written to `path`. Any pending, not-yet-written
+        text for the same path is replaced (and counted as an avoided write).
+        on_failed gets the exception if the write doesn't make it to disk.
+        """
+        path = Path(path)
+
+        if self.debounce_ms == 0:
+            self._write(path, text, [on_written] if on_written else [], [on_failed] if on_failed else [])
+            return
+
+        with self._lock:
+            pending = self._pending.get(path)
+            if pending is None:
+                pending = _Pending(text)
+                self._pending[path] = pending
+            else:
+                self.writes_avoided += 1
+                self.bytes_avoided += len(pending.text.encode("utf-8"))
+                pending.text = text
+                if pending.timer is not None:
+                    pending.timer.cancel()
+
+            if on_written is not None:
+                pending.callbacks.append(on_written)
+            if on_failed is not None:
+                pending.failbacks.append(on_failed)
+
+            window = self.debounce_ms / 1000.0
+            max_delay = window * MAX_DELAY_FACTOR
+            waited = time.monotonic() - pending.first_at
+            delay = max(0.0, min(window, max_delay - waited))
+
+            timer = threading.Timer(delay, self._flush_path, args=(path,))
+            timer.daemon = True
+            pending.timer = timer
+            timer.start()
+
+    def flush(self, path: Optional[Path] = None) -> None:
+        """Write pending data now (one path, or everything)."""
+        with self._lock:
+            paths = [Path(path)] if path is not None else list(self._pending.keys())
+        for p in paths:
+            self._flush_path(p)
+
+    def is_pending(self, path: Path) -> bool:
+        with self._lock:
+            return Path(path) in self._pending
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "debounceMs": self.debounce_ms,
+                "writes": self.writes,
+                "writesAvoided": self.writes_avoided,
+                "bytesWritten": self.bytes_written,
+                "bytesAvoided": self.bytes_avoided,
+                "errors": self.errors,
+                "pending": [str(p) for p in self._pending.keys()],
+            }
+
+    # ----- internals ----- #
+
+    def _flush_path(self, path: Path) -> None:
+        with self._io_lock:
+            with self._lock:
+                pending = self._pending.pop(path, None)
+                if pending is None:
+                    return
+                if pending.timer is not None:
+                    pending.timer.cancel()
+            self._write_locked(path, pending.text, pending.callbacks, pending.failbacks)
+
+    def _write(self, path: Path, text: str, callbacks: list[OnWritten], failbacks: list[OnFailed]) -> None:
+        with self._io_lock:
+            self._write_locked(path, text, callbacks, failbacks)
+
+    def _write_locked(self, path: Path, text: str, callbacks: list[OnWritten], failbacks: list[OnFailed]) -> None:
+        try:
+            n = atomic_write_text(path, text)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print(f"[PERSIST] Failed to write {path}: {e}")
+            for fb in failbacks:
+                try:
+                    fb(e)
+                except Exception as cb_err:
+                    print(f"[PERSIST] on_failed callback failed for {path}: {cb_err}")
+            return
+
+        with self._lock:
+            self.writes += 1
+            self.bytes_written += n
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        for cb in callbacks:
+            try:
+                cb(st)
+            except Exception as e:
+                print(f"[PERSIST] on_written callback failed for {path}: {e}")
+
+
+# Single shared writer for the server process
+writer = CoalescingWriter()
+
+# Never lose a debounced save on a clean shutdown.
+atexit.register(writer.flush)
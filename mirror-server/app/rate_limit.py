@@ -0,0 +1,266 @@
+# mirror-server/app/rate_limit.py
+
+"""
+Per-provider rate limiting and daily quota accounting for upstream.py.
+
+- Token bucket per provider (rate_per_minute, burst from ProviderSettings).
+  Sized so burst + one minute of refill stays under the provider's
+  per-minute cap, e.g. Finnhub 10 + 50 <= 60/min.
+- Priorities: foreground (request handlers, Zo) vs background (refresh
+  scheduler, stale-while-revalidate refreshes; set with `background()`).
+  Background calls leave part of the burst for foreground ones, give up
+  a share of the daily quota early, and may queue longer.
+- Requests queue while a token is a short wait away and are shed with
+  RateLimited otherwise, so callers fail fast (and serve stale data)
+  instead of tripping a 429.
+- A 429 from the provider blocks the bucket for its Retry-After.
+- Calls per provider per UTC day are persisted to quota.json (coalesced
+  writes), so a restart doesn't reset the NewsAPI 100/day budget.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from .persistence import writer
+
+QUOTA_PATH = Path(os.getenv("MAISON_QUOTA_PATH", str(Path(__file__).with_name("quota.json"))))
+
+FOREGROUND = "foreground"
+BACKGROUND = "background"
+
+# Longest a caller queues for a token before the request is shed
+FOREGROUND_MAX_WAIT = 2.0
+BACKGROUND_MAX_WAIT = 30.0
+
+# Share of the burst background calls must leave for foreground ones
+BACKGROUND_RESERVE = 0.5
+# Background calls stop once this share of the daily quota is used
+BACKGROUND_QUOTA_FRACTION = 0.8
+
+# Fallback block when a 429 has no usable Retry-After
+DEFAULT_RETRY_AFTER = 30.0
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar("upstream_priority", default=FOREGROUND)
+
+
+class RateLimited(Exception):
+    def __init__(self, provider: str, reason: str, retry_after: float) -> None:
+        super().__init__(f"{provider}: {reason} (retry in {retry_after:.0f}s)")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+@contextmanager
+def background() -> Iterator[None]:
+    """Mark upstream calls made inside this block as background work."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def priority() -> str:
+    return _priority.get()
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, burst: int) -> None:
+        self.rate_per_minute = rate_per_minute
+        self.burst = max(1, burst)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, reserve: float = 0.0) -> float:
+        """
+        Take a token if one is available above `reserve`; returns 0.0 when
+        taken, else seconds until one will be.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1 + reserve:
+            self.tokens -= 1
+            return 0.0
+        return (1 + reserve - self.tokens) / self.rate
+
+    def block(self, seconds: float) -> None:
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _seconds_to_midnight() -> float:
+    now = datetime.now(timezone.utc)
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+    return (midnight - now).total_seconds()
+
+
+class RateLimiter:
+    def __init__(self, quota_path: Path = QUOTA_PATH) -> None:
+        self.quota_path = Path(quota_path)
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._day = _today()
+        self._used: Dict[str, int] = {}
+        self._shed: Dict[str, Dict[str, int]] = {}
+        self._queued: Dict[str, int] = {}
+        self._wait_ms: Dict[str, float] = {}
+        self._load()
+
+    # ---------- quota persistence ----------
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.quota_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"[RATELIMIT] Could not read {self.quota_path.name}, starting from zero: {e}")
+            return
+        if data.get("date") == self._day:
+            self._used = {k: int(v) for k, v in (data.get("used") or {}).items()}
+
+    def _save(self) -> None:
+        # caller holds self._lock
+        text = json.dumps({"date": self._day, "used": self._used}, indent=2)
+        writer.submit(self.quota_path, text)
+
+    def _roll_day(self) -> None:
+        # caller holds self._lock
+        today = _today()
+        if today != self._day:
+            self._day = today
+            self._used = {}
+
+    # ---------- acquire ----------
+
+    def _bucket(self, provider: str, settings: Any) -> Optional[TokenBucket]:
+        # caller holds self._lock
+        if settings.rate_per_minute <= 0:
+            return None
+        bucket = self._buckets.get(provider)
+        if bucket is None or (bucket.rate_per_minute, bucket.burst) != (settings.rate_per_minute, max(1, settings.burst)):
+            bucket = self._buckets[provider] = TokenBucket(settings.rate_per_minute, settings.burst)
+        return bucket
+
+    def _shed_request(self, provider: str, prio: str, reason: str, retry_after: float) -> RateLimited:
+        # caller holds self._lock
+        counts = self._shed.setdefault(provider, {FOREGROUND: 0, BACKGROUND: 0})
+        counts[prio] += 1
+        return RateLimited(provider, reason, retry_after)
+
+    def _try(self, provider: str, settings: Any, prio: str, waited: float) -> float:
+        """0.0 = go (token + quota taken); > 0 = sleep and try again. Raises RateLimited."""
+        with self._lock:
+            self._roll_day()
+            used = self._used.get(provider, 0)
+            quota = settings.daily_quota
+            if quota > 0:
+                allowed = quota if prio == FOREGROUND else int(quota * BACKGROUND_QUOTA_FRACTION)
+                if used >= allowed:
+                    raise self._shed_request(provider, prio, f"daily quota used ({used}/{quota})", _seconds_to_midnight())
+
+            bucket = self._bucket(provider, settings)
+            if bucket is not None:
+                reserve = bucket.burst * BACKGROUND_RESERVE if prio == BACKGROUND else 0.0
+                wait = bucket.take(reserve)
+                if wait > 0:
+                    max_wait = FOREGROUND_MAX_WAIT if prio == FOREGROUND else BACKGROUND_MAX_WAIT
+                    if waited + wait > max_wait:
+                        raise self._shed_request(provider, prio, "rate limit", wait)
+                    return wait
+
+            self._used[provider] = used + 1
+            self._save()
+            if waited:
+                self._queued[provider] = self._queued.get(provider, 0) + 1
+                self._wait_ms[provider] = self._wait_ms.get(provider, 0.0) + waited * 1000
+            return 0.0
+
+    def acquire(self, provider: str, settings: Any) -> None:
+        """Block until `provider` may be called (or raise RateLimited)."""
+        prio, waited = priority(), 0.0
+        while True:
+            wait = self._try(provider, settings, prio, waited)
+            if not wait:
+                return
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, provider: str, settings: Any) -> None:
+        prio, waited = priority(), 0.0
+        while True:
+            wait = self._try(provider, settings, prio, waited)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def throttled(self, provider: str, settings: Any, retry_after: Optional[str]) -> None:
+        """The provider answered 429: hold its bucket for Retry-After seconds."""
+        try:
+            seconds = float(retry_after) if retry_after else DEFAULT_RETRY_AFTER
+        except ValueError:
+            seconds = DEFAULT_RETRY_AFTER
+        with self._lock:
+            bucket = self._bucket(provider, settings)
+            if bucket is not None:
+                bucket.block(seconds)
+        print(f"[RATELIMIT] {provider} returned 429, holding requests for {seconds:.0f}s")
+
+    # ---------- stats ----------
+
+    def stats(self, providers: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._roll_day()
+            out: Dict[str, Any] = {}
+            for name, settings in providers.items():
+                bucket = self._bucket(name, settings)
+                if bucket is not None:
+                    bucket._refill(time.monotonic())
+                used = self._used.get(name, 0)
+                quota = settings.daily_quota or None
+                out[name] = {
+                    "ratePerMinute": settings.rate_per_minute or None,
+                    "burst": bucket.burst if bucket else None,
+                    "tokens": round(bucket.tokens, 2) if bucket else None,
+                    "blockedForSeconds": round(max(0.0, bucket.blocked_until - time.monotonic()), 1) if bucket else 0.0,
+                    "dailyQuota": quota,
+                    "usedToday": used,
+                    "remainingToday": max(0, quota - used) if quota else None,
+                    "queued": self._queued.get(name, 0),
+                    "queuedMs": round(self._wait_ms.get(name, 0.0), 1),
+                    "shed": dict(self._shed.get(name, {FOREGROUND: 0, BACKGROUND: 0})),
+                }
+            return {
+                "day": self._day,
+                "resetsInSeconds": round(_seconds_to_midnight()),
+                "providers": out,
+            }
+
+
+# Shared limiter for the server process
+limiter = RateLimiter()
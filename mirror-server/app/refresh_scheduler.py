@@ -0,0 +1,260 @@
+# mirror-server/app/refresh_scheduler.py
+
+"""
+Background refresh scheduler: keeps the upstream data caches warm so
+request handlers (/weather, /api/stocks/*, /api/mirror/snapshot, Zo's
+context) are served from memory instead of paying upstream latency.
+
+One asyncio task per job, each on its own cadence (a bit under the
+cache TTL). Jobs only run while their widget is enabled in
+MirrorConfig.widgets. A config change that affects a job's inputs (new
+location, watchlist, categories, widget toggled on) wakes it right away.
+
+Started / stopped from FastAPI startup / shutdown in main.py.
+Set MAISON_REFRESH_SCHEDULER=0 to disable (benchmarks, scripts).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .config_store import load_config, get_api_key
+from .change_feed import feed as change_feed
+from .models import MirrorConfig
+from .rate_limit import background
+from . import weather_service, services_news, services_stocks, services_quotes, upstream
+
+ENABLED = os.getenv("MAISON_REFRESH_SCHEDULER", "1") != "0"
+
+# Refresh a little before the cache entry expires so readers never see a miss.
+REFRESH_FRACTION = 0.9
+
+# Longer TTLs are calendar-driven (market closed, daily candles): refreshing
+# early would just re-fetch unchanged data, so wake exactly at expiry.
+CALENDAR_TTL_SECONDS = 60 * 60
+
+# After a failed run, retry sooner than the normal cadence (but not hot-loop).
+RETRY_SECONDS = 60.0
+
+# StocksWidget asks for ?points=40
+HISTORY_POINTS = 40
+
+
+@dataclass
+class Job:
+    name: str
+    widget: str                                   # MirrorConfig.widgets field
+    interval: Callable[[], float]                 # seconds, re-evaluated each run
+    inputs: Callable[[MirrorConfig], Any]         # what the job fetches for
+    run: Callable[[Any], Awaitable[Optional[str]]]  # returns an error string or None
+    api_key: Optional[str] = None                 # skip quietly while this key is unset
+
+    # runtime state
+    wake: asyncio.Event = field(default_factory=asyncio.Event)
+    last_inputs: Any = None
+    last_run_at: Optional[float] = None
+    last_duration_ms: Optional[float] = None
+    last_error: Optional[str] = None
+    runs: int = 0
+    errors: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "widget": self.widget,
+            "intervalSeconds": round(self.interval(), 1),
+            "runs": self.runs,
+            "errors": self.errors,
+            "lastRunAt": self.last_run_at,
+            "lastDurationMs": self.last_duration_ms,
+            "lastError": self.last_error,
+        }
+
+
+def _interval(ttl: float) -> float:
+    return ttl if ttl >= CALENDAR_TTL_SECONDS else ttl * REFRESH_FRACTION
+
+
+def _symbols(cfg: MirrorConfig) -> List[str]:
+    return sorted({s.symbol.strip().upper() for s in cfg.stocksItems if s.symbol.strip()})
+
+
+# ----------------- job bodies ----------------- #
+
+async def _refresh_weather(city: str) -> Optional[str]:
+    # strict: a failed fetch raises (-> lastError + retry) instead of
+    # quietly returning the fallback payload
+    await weather_service.get_weather_for_city_async(city, fresh=True, strict=True)
+    return None
+
+
+async def _refresh_news(categories: List[str]) -> Optional[str]:
+    articles = await services_news.fetch_multi_category_news_async(categories, fresh=True)
+    return None if articles else "no articles"
+
+
+async def _refresh_stock_quotes(symbols: List[str]) -> Optional[str]:
+    if not symbols:
+        return None
+    batch = await services_stocks.fetch_stock_quotes_batch_async(symbols, fresh=True)
+    return "; ".join(f"{s}: {e}" for s, e in batch["errors"].items()) or None
+
+
+async def _refresh_stock_history(symbols: List[str]) -> Optional[str]:
+    if not symbols:
+        return None
+    batch = await services_stocks.fetch_stock_history_batch_async(symbols, points=HISTORY_POINTS, fresh=True)
+    return "; ".join(f"{s}: {e}" for s, e in batch["errors"].items()) or None
+
+
+async def _refresh_quote(categories: List[str]) -> Optional[str]:
+    quote = await services_quotes.fetch_random_quote_async(categories, fresh=True)
+    return None if quote else "no quote"
+
+
+def _default_jobs() -> List[Job]:
+    return [
+        Job(
+            name="weather",
+            widget="weather",
+            interval=lambda: weather_service.CACHE_TTL_SECONDS * REFRESH_FRACTION,
+            inputs=lambda cfg: cfg.location,
+            run=_refresh_weather,
+            api_key="OPENWEATHER_API_KEY",
+        ),
+        Job(
+            name="news",
+            widget="news",
+            interval=lambda: services_news.CACHE_TTL_SECONDS * REFRESH_FRACTION,
+            inputs=lambda cfg: list(cfg.newsCategories) or services_news.DEFAULT_CATEGORIES,
+            run=_refresh_news,
+            api_key="NEWS_API_KEY",
+        ),
+        Job(
+            name="stocks.quotes",
+            widget="stocks",
+            interval=lambda: _interval(services_stocks.quotes_ttl()),
+            inputs=_symbols,
+            run=_refresh_stock_quotes,
+            api_key="FINNHUB_API_KEY",
+        ),
+        Job(
+            name="stocks.history",
+            widget="stocks",
+            interval=lambda: _interval(services_stocks.history_ttl()),
+            inputs=_symbols,
+            run=_refresh_stock_history,
+            api_key="FINNHUB_API_KEY",
+        ),
+        Job(
+            name="quote",
+            widget="quotes",
+            interval=lambda: services_quotes.REFRESH_SECONDS * REFRESH_FRACTION,
+            inputs=lambda cfg: list(cfg.quotesCategories),
+            run=_refresh_quote,
+            api_key="API_NINJAS_KEY",
+        ),
+    ]
+
+
+# ----------------- scheduler ----------------- #
+
+class RefreshScheduler:
+    def __init__(self, jobs: Optional[List[Job]] = None) -> None:
+        self._jobs_factory = (lambda: jobs) if jobs is not None else _default_jobs
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        """Start one task per job plus the config watcher (call on the event loop)."""
+        if self._tasks:
+            return
+        # asyncio.Events bind to the running loop, so jobs are built here.
+        self.jobs = {job.name: job for job in self._jobs_factory()}
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._run_job(job), name=f"refresh:{job.name}") for job in self.jobs.values()]
+        self._tasks.append(loop.create_task(self._watch_config(), name="refresh:config"))
+        print(f"[SCHEDULER] started: {', '.join(self.jobs)}")
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def kick(self, name: Optional[str] = None) -> None:
+        """Run one job (or all of them) now instead of waiting for its next slot."""
+        for job in self.jobs.values():
+            if name is None or job.name == name:
+                job.wake.set()
+
+    async def _run_job(self, job: Job) -> None:
+        while True:
+            delay = job.interval()
+            cfg = load_config()
+
+            if job.api_key and not get_api_key(job.api_key):
+                # Nothing to refresh without a key; check again next slot.
+                job.last_inputs = None
+            elif getattr(cfg.widgets, job.widget, True):
+                job.last_inputs = job.inputs(cfg)
+                start = time.perf_counter()
+                try:
+                    # Yields to foreground requests in the upstream rate limiter
+                    with background():
+                        error = await job.run(job.last_inputs)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    error = f"{type(e).__name__}: {upstream.describe_error(e)}"
+                job.runs += 1
+                job.last_run_at = time.time()
+                job.last_duration_ms = round((time.perf_counter() - start) * 1000, 1)
+                job.last_error = error
+                if error:
+                    job.errors += 1
+                    print(f"[SCHEDULER] {job.name} failed: {error}")
+                    delay = min(delay, RETRY_SECONDS)
+            else:
+                # Disabled: sleep until the config watcher wakes us.
+                job.last_inputs = None
+                delay = None
+
+            job.wake.clear()
+            try:
+                await asyncio.wait_for(job.wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _watch_config(self) -> None:
+        cursor = change_feed.last_id
+        while True:
+            await change_feed.wait_until(lambda: change_feed.last_id > cursor, timeout=60)
+            events = change_feed.events_after(cursor)
+            cursor = change_feed.last_id
+            if events is not None and not any(e.topic == "config" for e in events):
+                continue
+
+            cfg = load_config()
+            for job in self.jobs.values():
+                enabled = getattr(cfg.widgets, job.widget, True)
+                if enabled and job.inputs(cfg) != job.last_inputs:
+                    print(f"[SCHEDULER] config changed -> refreshing {job.name}")
+                    job.wake.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": ENABLED,
+            "running": self.running,
+            "jobs": {name: job.as_dict() for name, job in self.jobs.items()},
+        }
+
+
+scheduler = RefreshScheduler()
@@ -1,35 +1,89 @@
 # mirror-server/app/services_news.py
+import asyncio
 from typing import List, Dict, Any
-import requests
 from .config_store import get_api_key
+from . import upstream
+from .ttl_cache import TTLCache
 
 NEWS_API_URL = "https://newsapi.org/v2/top-headlines"
 
+# Headlines barely move faster than this, and NewsAPI's free tier is 100 req/day
+CACHE_TTL_SECONDS = 15 * 60
+
+_cache = TTLCache("news", ttl=CACHE_TTL_SECONDS, stale_ttl=60 * 60, maxsize=32)
+
+DEFAULT_CATEGORIES = ["technology", "business"]
+
+
+def _request_params(api_key: str, category: str, country: str) -> Dict[str, Any]:
+    return {
+        "apiKey": api_key,
+        "category": category,
+        "country": country,
+        "pageSize": 10,
+    }
+
+
 def fetch_top_news(category: str = "technology", country: str = "us") -> List[Dict[str, Any]]:
     api_key = get_api_key("NEWS_API_KEY")
     if not api_key:
         print("[NEWS] No NEWS_API_KEY set, returning empty list")
         return []
 
+    def load() -> List[Dict[str, Any]]:
+        data = upstream.get_json("newsapi", NEWS_API_URL, params=_request_params(api_key, category, country))
+        return data.get("articles", []) or []
+
     try:
-        resp = requests.get(
-            NEWS_API_URL,
-            params={
-                "apiKey": api_key,
-                "category": category,
-                "country": country,
-                "pageSize": 10,
-            },
-            timeout=10,
-        )
-        resp.raise_for_status()
-        data = resp.json()
+        return _cache.get_or_load((category, country), load)
+    except Exception as e:
+        print(f"[NEWS] Error fetching top news: {upstream.describe_error(e)}")
+        return []
+
+
+async def fetch_top_news_async(category: str = "technology", country: str = "us", fresh: bool = False) -> List[Dict[str, Any]]:
+    """
+    Non-blocking fetch_top_news() for async route handlers.
+    fresh=True skips the cache (used by the refresh scheduler).
+    """
+    api_key = get_api_key("NEWS_API_KEY")
+    if not api_key:
+        print("[NEWS] No NEWS_API_KEY set, returning empty list")
+        return []
+
+    async def load() -> List[Dict[str, Any]]:
+        data = await upstream.get_json_async("newsapi", NEWS_API_URL, params=_request_params(api_key, category, country))
         return data.get("articles", []) or []
+
+    try:
+        return await _cache.aget_or_load((category, country), load, fresh=fresh)
     except Exception as e:
-        print(f"[NEWS] Error fetching top news: {e}")
+        print(f"[NEWS] Error fetching top news: {upstream.describe_error(e)}")
         return []
 
 
+def _combine_categories(per_category: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    all_articles = []
+    seen_titles = set()
+
+    for articles in per_category:
+        # Take up to 5 articles per category
+        for article in articles[:5]:
+            title = (article.get("title") or "").lower().strip()
+            if title and title not in seen_titles:
+                seen_titles.add(title)
+                all_articles.append(article)
+
+    # Sort by publishedAt (most recent first)
+    all_articles.sort(
+        key=lambda a: a.get("publishedAt", ""),
+        reverse=True
+    )
+
+    # Return top 15 most recent
+    return all_articles[:15]
+
+
 def fetch_multi_category_news(categories: List[str], country: str = "us") -> List[Dict[str, Any]]:
     """
     Fetch news from multiple categories and combine results.
@@ -42,32 +96,38 @@ def fetch_multi_category_news(categories: List[str], country: str = "us") -> Lis
         Combined list of articles, deduplicated and sorted by publishedAt
     """
     if not categories or len(categories) == 0:
-        categories = ["technology", "business"]
+        categories = DEFAULT_CATEGORIES
 
-    all_articles = []
-    seen_titles = set()
+    per_category: List[List[Dict[str, Any]]] = []
 
     # Fetch from each category sequentially
     for category in categories:
         try:
-            articles = fetch_top_news(category=category, country=country)
-
-            # Take up to 5 articles per category
-            for article in articles[:5]:
-                title = article.get("title", "").lower().strip()
-                if title and title not in seen_titles:
-                    seen_titles.add(title)
-                    all_articles.append(article)
-
+            per_category.append(fetch_top_news(category=category, country=country))
         except Exception as e:
-            print(f"[NEWS] Failed to fetch category {category}: {e}")
+            print(f"[NEWS] Failed to fetch category {category}: {upstream.describe_error(e)}")
             # Continue with other categories
 
-    # Sort by publishedAt (most recent first)
-    all_articles.sort(
-        key=lambda a: a.get("publishedAt", ""),
-        reverse=True
+    return _combine_categories(per_category)
+
+
+async def fetch_multi_category_news_async(categories: List[str], country: str = "us", fresh: bool = False) -> List[Dict[str, Any]]:
+    """
+    Async fetch_multi_category_news(): categories are fetched concurrently.
+    """
+    if not categories or len(categories) == 0:
+        categories = DEFAULT_CATEGORIES
+
+    results = await asyncio.gather(
+        *(fetch_top_news_async(category=c, country=country, fresh=fresh) for c in categories),
+        return_exceptions=True,
     )
 
-    # Return top 15 most recent
-    return all_articles[:15]
+    per_category: List[List[Dict[str, Any]]] = []
+    for category, result in zip(categories, results):
+        if isinstance(result, BaseException):
+            print(f"[NEWS] Failed to fetch category {category}: {upstream.describe_error(result)}")
+            continue
+        per_category.append(result)
+
+    return _combine_categories(per_category)
@@ -1,21 +1,58 @@
 # mirror-server/app/services_quotes.py
 
-from typing import List, Dict, Any
-import requests
+from typing import List, Dict, Any, Optional, Tuple
 from .config_store import get_api_key
+from . import upstream
+from .ttl_cache import TTLCache
 
 QUOTES_API_URL = "https://api.api-ninjas.com/v2/randomquotes"
 
+# Random by design: keep this short so "new quote" still feels new
+CACHE_TTL_SECONDS = 60
 
-def fetch_random_quote(categories: List[str] = None) -> Dict[str, Any]:
+# QuotesWidget rotates every 30 min; an older quote is still a fine quote.
+REFRESH_SECONDS = 30 * 60
+
+_cache = TTLCache("quotes", ttl=CACHE_TTL_SECONDS, stale_ttl=REFRESH_SECONDS, maxsize=16)
+
+
+def _build_request(api_key: str, categories: Optional[List[str]]) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    headers = {"X-Api-Key": api_key}
+    params = {}
+
+    # API Ninjas accepts comma-separated categories
+    if categories and len(categories) > 0:
+        params["category"] = ",".join(categories)
+
+    return headers, params
+
+
+def _parse_quote(data: Any) -> Dict[str, Any]:
+    # API returns array, take first quote
+    if isinstance(data, list) and len(data) > 0:
+        quote_data = data[0]
+        return {
+            "quote": quote_data.get("quote", ""),
+            "author": quote_data.get("author", ""),
+        }
+
+    return {}
+
+
+def _cache_key(categories: Optional[List[str]]) -> Tuple[str, ...]:
+    return tuple(sorted(categories or []))
+
+
+def fetch_random_quote(categories: List[str] = None, fresh: bool = False) -> Dict[str, Any]:
     """
     Fetch a random quote from API Ninjas.
 
     Args:
         categories: List of category strings (e.g., ["inspirational", "wisdom"])
+        fresh: skip the cache and always fetch a new quote
 
     Returns:
-        Dict with keys: quote, author, category
+        Dict with keys: quote, author
         Returns empty dict on error
     """
     api_key = get_api_key("API_NINJAS_KEY")
@@ -23,38 +60,40 @@ def fetch_random_quote(categories: List[str] = None) -> Dict[str, Any]:
         print("[QUOTES] No API_NINJAS_KEY set, returning empty dict")
         return {}
 
+    headers, params = _build_request(api_key, categories)
+
+    def load() -> Dict[str, Any]:
+        quote = _parse_quote(upstream.get_json("apininjas", QUOTES_API_URL, headers=headers, params=params))
+        if not quote:
+            raise ValueError("empty quote response")
+        return quote
+
     try:
-        headers = {"X-Api-Key": api_key}
-        params = {}
-
-        # API Ninjas accepts comma-separated categories
-        if categories and len(categories) > 0:
-            params["category"] = ",".join(categories)
-
-        resp = requests.get(
-            QUOTES_API_URL,
-            headers=headers,
-            params=params,
-            timeout=10,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-
-        # API returns array, take first quote
-        if isinstance(data, list) and len(data) > 0:
-            quote_data = data[0]
-            # Extract categories array and join if present
-            categories_raw = quote_data.get("categories", [])
-            category_str = categories_raw[0] if isinstance(categories_raw, list) and len(categories_raw) > 0 else ""
-
-            return {
-                "quote": quote_data.get("quote", ""),
-                "author": quote_data.get("author", ""),
-            
-            }
+        return _cache.get_or_load(_cache_key(categories), load, fresh=fresh)
+
+    except Exception as e:
+        print(f"[QUOTES] Error fetching quote: {upstream.describe_error(e)}")
+        return {}
+
 
+async def fetch_random_quote_async(categories: List[str] = None, fresh: bool = False) -> Dict[str, Any]:
+    """Non-blocking fetch_random_quote() for async route handlers."""
+    api_key = get_api_key("API_NINJAS_KEY")
+    if not api_key:
+        print("[QUOTES] No API_NINJAS_KEY set, returning empty dict")
         return {}
 
+    headers, params = _build_request(api_key, categories)
+
+    async def load() -> Dict[str, Any]:
+        quote = _parse_quote(await upstream.get_json_async("apininjas", QUOTES_API_URL, headers=headers, params=params))
+        if not quote:
+            raise ValueError("empty quote response")
+        return quote
+
+    try:
+        return await _cache.aget_or_load(_cache_key(categories), load, fresh=fresh)
+
     except Exception as e:
-        print(f"[QUOTES] Error fetching quote: {e}")
+        print(f"[QUOTES] Error fetching quote: {upstream.describe_error(e)}")
         return {}
@@ -1,14 +1,39 @@
 # mirror-server/app/services_stocks.py
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime, timedelta, timezone
 
-import requests
 from .config_store import get_api_key
+from . import upstream, market_calendar
+from .candle_store import Candles, rollup, store as candle_store
+from .ttl_cache import TTLCache
 
 BASE = "https://finnhub.io/api/v1"
 
+# Quotes move constantly during the regular session, slowly in pre/post,
+# and not at all while the market is closed (then they're cached until the
+# next session starts). Daily candles only change at the close.
+QUOTES_TTL_SECONDS = 30
+EXTENDED_QUOTES_TTL_SECONDS = 2 * 60
+# Finnhub publishes the day's candle shortly after the close
+HISTORY_SETTLE_SECONDS = 5 * 60
+# A batch with failed / placeholder symbols is retried soon, not cached
+# (by browsers, the widget, snapshot sections) until the next session
+RETRY_SECONDS = 30
+
+_quote_cache = TTLCache("stocks.quotes", ttl=QUOTES_TTL_SECONDS, stale_ttl=5 * 60, maxsize=128)
+_history_cache = TTLCache("stocks.history", ttl=60 * 60, stale_ttl=6 * 60 * 60, maxsize=64)
+
+# Per-symbol fan-out is bounded: Finnhub's free tier allows 30 calls/s and
+# 60/min, and a Pi shouldn't open a socket per watchlist entry anyway.
+# upstream enforces the same cap per provider (ProviderSettings.max_concurrency).
+MAX_CONCURRENCY = 4
+
+_pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="stocks")
+
 
 class StocksError(Exception):
     pass
@@ -22,19 +47,209 @@ def _get_api_key() -> str:
     return api_key
 
 
-def _get(path: str, params: dict | None = None) -> dict:
+# ----------------- Refresh policy -----------------
+
+def _next_slot(now: datetime, seconds: int) -> datetime:
+    # Aligned to wall-clock slots so the hint (and snapshot ETags) stay
+    # stable within a slot instead of moving on every request.
+    ts = now.timestamp()
+    return datetime.fromtimestamp(ts - ts % seconds + seconds, tz=timezone.utc)
+
+
+def quotes_refresh_at(now: Optional[datetime] = None) -> datetime:
+    now = now or datetime.now(timezone.utc)
+    session = market_calendar.session_at(now)
+    if session == market_calendar.REGULAR:
+        return _next_slot(now, QUOTES_TTL_SECONDS)
+    if session in (market_calendar.PRE, market_calendar.POST):
+        return _next_slot(now, EXTENDED_QUOTES_TTL_SECONDS)
+    return market_calendar.next_session_start(now)
+
+
+def history_refresh_at(now: Optional[datetime] = None) -> datetime:
+    now = now or datetime.now(timezone.utc)
+    settled = market_calendar.next_close(now - timedelta(seconds=HISTORY_SETTLE_SECONDS))
+    return settled + timedelta(seconds=HISTORY_SETTLE_SECONDS)
+
+
+def quotes_ttl() -> float:
+    """Seconds a quote stays fresh: 30 s in session, until the next session when closed."""
+    return max(QUOTES_TTL_SECONDS, market_calendar.seconds_until(quotes_refresh_at()))
+
+
+def history_ttl() -> float:
+    """Daily candles are cached until just after the next session close."""
+    return max(QUOTES_TTL_SECONDS, market_calendar.seconds_until(history_refresh_at()))
+
+
+def is_degraded(batch: Dict[str, Any]) -> bool:
+    """
+    True if any symbol in a quotes / history batch errored or got a
+    placeholder (None, or a quote with "price": None). Encoded history
+    (points lists, columnar dicts) only counts when it's None.
+    """
+    if batch.get("errors"):
+        return True
+    items = batch.get("items") or {}
+    values = items.values() if isinstance(items, dict) else items
+    return any(v is None or (isinstance(v, dict) and "price" in v and v["price"] is None) for v in values)
+
+
+def batch_refresh_at(batch: Dict[str, Any], refresh_at: datetime) -> datetime:
+    """`refresh_at`, or RETRY_SECONDS from now for a degraded batch."""
+    if is_degraded(batch):
+        return datetime.now(timezone.utc) + timedelta(seconds=RETRY_SECONDS)
+    return refresh_at
+
+
+def market_info(refresh_at: datetime) -> Dict[str, Any]:
+    """Fields added to stock responses: {"marketOpen", "session", "nextRefreshAt"}."""
+    return {
+        "marketOpen": market_calendar.is_open(),
+        "session": market_calendar.session_at(),
+        "nextRefreshAt": refresh_at.astimezone(timezone.utc).isoformat(),
+    }
+
+
+def _request(path: str, params: dict | None) -> Tuple[str, dict]:
     api_key = _get_api_key()
     params = dict(params or {})
     params["token"] = api_key
-    url = f"{BASE}{path}"
-    resp = requests.get(url, params=params, timeout=10)
-    resp.raise_for_status()
-    data = resp.json()
+    return f"{BASE}{path}", params
+
+
+def _check(data: Any) -> dict:
     if not isinstance(data, dict):
         raise StocksError(f"Unexpected Finnhub response: {data}")
     return data
 
 
+def _get(path: str, params: dict | None = None) -> dict:
+    url, params = _request(path, params)
+    return _check(upstream.get_json("finnhub", url, params=params))
+
+
+async def _get_async(path: str, params: dict | None = None) -> dict:
+    url, params = _request(path, params)
+    return _check(await upstream.get_json_async("finnhub", url, params=params))
+
+
+def _clean_symbols(symbols: List[str]) -> List[str]:
+    return [str(s).strip().upper() for s in (symbols or []) if str(s).strip()]
+
+
+def _empty_quote(sym: str) -> Dict[str, Any]:
+    return {"symbol": sym, "price": None, "changePercent": None}
+
+
+def _parse_quote(sym: str, q: dict) -> Dict[str, Any]:
+    """
+    Finnhub /quote: c=current, pc=prev close, dp=percent change
+    """
+    price = q.get("c")  # current
+    dp = q.get("dp")    # percent change
+    pc = q.get("pc")    # prev close (fallback calc)
+
+    if price is None:
+        return _empty_quote(sym)
+
+    # Prefer Finnhub's dp; compute if missing
+    change_pct: Optional[float]
+    if dp is not None:
+        change_pct = float(dp)
+    elif pc is not None and float(pc) != 0.0:
+        change_pct = (float(price) - float(pc)) / float(pc) * 100.0
+    else:
+        change_pct = None
+
+    return {
+        "symbol": sym,
+        "price": float(price),
+        "changePercent": change_pct,
+    }
+
+
+def _fetch_quote(sym: str) -> Dict[str, Any]:
+    return _quote_cache.get_or_load(
+        sym,
+        lambda: _parse_quote(sym, _get("/quote", params={"symbol": sym})),
+        ttl=quotes_ttl,
+    )
+
+
+async def _fetch_quote_async(sym: str, fresh: bool = False) -> Dict[str, Any]:
+    async def load() -> Dict[str, Any]:
+        return _parse_quote(sym, await _get_async("/quote", params={"symbol": sym}))
+
+    return await _quote_cache.aget_or_load(sym, load, ttl=quotes_ttl, fresh=fresh)
+
+
+# ----------------- Batched quotes -----------------
+#
+# Batch results keep per-symbol failures apart from the data:
+#   {"items": [...one entry per symbol, in order...], "errors": {"XYZ": "..."}}
+# Failed symbols still get a {"price": None, ...} placeholder in items.
+
+def iter_stock_quotes(symbols: List[str]) -> Iterator[Tuple[str, Dict[str, Any], Optional[str]]]:
+    """
+    Fan out /quote calls on the bounded pool; yield (symbol, quote, error)
+    as each one completes.
+    """
+    futures = {_pool.submit(_fetch_quote, sym): sym for sym in _clean_symbols(symbols)}
+    for fut in as_completed(futures):
+        sym = futures[fut]
+        try:
+            yield sym, fut.result(), None
+        except Exception as e:
+            error = upstream.describe_error(e)
+            print(f"[STOCKS] Quote fetch failed for {sym}: {error}")
+            yield sym, _empty_quote(sym), error
+
+
+async def aiter_stock_quotes(
+    symbols: List[str],
+    fresh: bool = False,
+) -> AsyncIterator[Tuple[str, Dict[str, Any], Optional[str]]]:
+    """Async iter_stock_quotes(): yields (symbol, quote, error) as each completes."""
+
+    async def one(sym: str) -> Tuple[str, Dict[str, Any], Optional[str]]:
+        try:
+            return sym, await _fetch_quote_async(sym, fresh=fresh), None
+        except Exception as e:
+            error = upstream.describe_error(e)
+            print(f"[STOCKS] Quote fetch failed for {sym}: {error}")
+            return sym, _empty_quote(sym), error
+
+    for coro in asyncio.as_completed([one(sym) for sym in _clean_symbols(symbols)]):
+        yield await coro
+
+
+def _ordered(symbols: List[str], results: Dict[str, Any], default) -> List[Any]:
+    return [results.get(sym) or default(sym) for sym in symbols]
+
+
+def fetch_stock_quotes_batch(symbols: List[str]) -> Dict[str, Any]:
+    clean = _clean_symbols(symbols)
+    results: Dict[str, Dict[str, Any]] = {}
+    errors: Dict[str, str] = {}
+    for sym, quote, err in iter_stock_quotes(clean):
+        results[sym] = quote
+        if err:
+            errors[sym] = err
+    return {"items": _ordered(clean, results, _empty_quote), "errors": errors}
+
+
+async def fetch_stock_quotes_batch_async(symbols: List[str], fresh: bool = False) -> Dict[str, Any]:
+    clean = _clean_symbols(symbols)
+    results: Dict[str, Dict[str, Any]] = {}
+    errors: Dict[str, str] = {}
+    async for sym, quote, err in aiter_stock_quotes(clean, fresh=fresh):
+        results[sym] = quote
+        if err:
+            errors[sym] = err
+    return {"items": _ordered(clean, results, _empty_quote), "errors": errors}
+
+
 def fetch_stock_quotes(symbols: List[str]) -> List[Dict[str, Any]]:
     """
     Returns:
@@ -42,97 +257,265 @@ def fetch_stock_quotes(symbols: List[str]) -> List[Dict[str, Any]]:
     Uses Finnhub /quote:
       c=current, pc=prev close, dp=percent change
     """
-    clean = [str(s).strip().upper() for s in (symbols or []) if str(s).strip()]
-    out: List[Dict[str, Any]] = []
+    return fetch_stock_quotes_batch(symbols)["items"]
 
-    for sym in clean:
-        try:
-            q = _get("/quote", params={"symbol": sym})
-            price = q.get("c")  # current
-            dp = q.get("dp")    # percent change
-            pc = q.get("pc")    # prev close (fallback calc)
-
-            if price is None:
-                out.append({"symbol": sym, "price": None, "changePercent": None})
-                continue
-
-            # Prefer Finnhub's dp; compute if missing
-            change_pct: Optional[float]
-            if dp is not None:
-                change_pct = float(dp)
-            elif pc is not None and float(pc) != 0.0:
-                change_pct = (float(price) - float(pc)) / float(pc) * 100.0
-            else:
-                change_pct = None
-
-            out.append(
-                {
-                    "symbol": sym,
-                    "price": float(price),
-                    "changePercent": change_pct,
-                }
-            )
 
-        except Exception as e:
-            print(f"[STOCKS] Quote fetch failed for {sym}: {e}")
-            out.append({"symbol": sym, "price": None, "changePercent": None})
+async def fetch_stock_quotes_async(symbols: List[str]) -> List[Dict[str, Any]]:
+    """Non-blocking fetch_stock_quotes() for async route handlers."""
+    return (await fetch_stock_quotes_batch_async(symbols))["items"]
+
+
+# ----------------- History (via the local candle store) -----------------
+#
+# Daily ("D") bars are fetched and stored as-is. Intraday sparklines store
+# only the finest resolution we fetch (1m) and roll 5m / 15m / 1h up
+# locally, so switching resolution never costs an API call.
+
+DAILY = "D"
+INTRADAY_BASE = "1m"
+INTRADAY_SECONDS: Dict[str, int] = {"1m": 60, "5m": 5 * 60, "15m": 15 * 60, "1h": 60 * 60}
+RESOLUTIONS = (DAILY, *INTRADAY_SECONDS)
+
+# Finnhub's name for each stored resolution
+_FINNHUB_RESOLUTION = {DAILY: "D", INTRADAY_BASE: "1"}
+
+# Daily bars: always reach back a year (+ holidays) so stock_analytics has
+# 52-week / 200-day windows; after the first backfill it's incremental.
+DAILY_BACKFILL_DAYS = 380
+# 1m bars: keep a month (~8k bars/symbol), enough for 200 hourly points
+INTRADAY_KEEP_DAYS = 30
+SESSION_SECONDS = int(6.5 * 60 * 60)
+# Hourly buckets start on the half hour, like the 09:30 open
+_SESSION_ANCHOR = 9 * 60 * 60 + 30 * 60
+
+
+def _store_resolution(resolution: str) -> str:
+    return DAILY if resolution == DAILY else INTRADAY_BASE
+
+
+def _history_range(sym: str, points: int, resolution: str) -> Tuple[int, int, bool, Optional[int]]:
+    """
+    (from_ts, to_ts, is_backfill, keep_from) for the next /stock/candle request.
+    Normally just the last stored bar onwards; a full window when the store
+    doesn't reach back far enough for `points` bars yet.
+    """
+    now = datetime.now(timezone.utc)
+    to_ts = int(now.timestamp())
+    keep_from: Optional[int] = None
+
+    if resolution == DAILY:
+        # Add a few buffer days for weekends/holidays so we still get `points` bars.
+        days = max(points + 14, DAILY_BACKFILL_DAYS)
+        want_from = int((now - timedelta(days=days)).timestamp())
+    else:
+        trading_days = -(-points * INTRADAY_SECONDS[resolution] // SESSION_SECONDS)
+        days = min(INTRADAY_KEEP_DAYS, trading_days + 4)
+        want_from = int((now - timedelta(days=days)).timestamp())
+        keep_from = int((now - timedelta(days=INTRADAY_KEEP_DAYS)).timestamp())
+
+    store_res = _store_resolution(resolution)
+    stored = candle_store.get(sym, store_res)
+    covered = candle_store.covered_from(sym, store_res)
+    if not len(stored) or covered is None or want_from < covered:
+        return want_from, to_ts, True, keep_from
+    return int(stored.t[-1]), to_ts, False, keep_from
+
+
+def _candle_params(sym: str, resolution: str, from_ts: int, to_ts: int) -> dict:
+    return {
+        "symbol": sym,
+        "resolution": _FINNHUB_RESOLUTION[_store_resolution(resolution)],
+        "from": from_ts,
+        "to": to_ts,
+    }
+
+
+def _store_candles(
+    sym: str,
+    resolution: str,
+    data: dict,
+    from_ts: int,
+    backfill: bool,
+    keep_from: Optional[int],
+) -> Candles:
+    status = (data.get("s") or "").lower()
+    if status not in ("ok", "no_data"):
+        raise StocksError(f"Unexpected candle status for {sym}: {data.get('s')}")
+    # "no_data" on an incremental fetch just means no new bars (weekend).
+    return candle_store.merge(
+        sym,
+        _store_resolution(resolution),
+        Candles.from_finnhub(data),
+        covered_from=from_ts if backfill else None,
+        keep_from=keep_from,
+    )
+
+
+def candles_at(candles: Candles, resolution: str) -> Candles:
+    """Stored bars -> bars at `resolution` (vectorized OHLC rollup for 5m/15m/1h)."""
+    if resolution in (DAILY, INTRADAY_BASE):
+        return candles
+    return rollup(candles, INTRADAY_SECONDS[resolution], anchor=_SESSION_ANCHOR)
+
+
+def _history_window(sym: str, candles: Candles, points: int, resolution: str) -> Optional[Candles]:
+    if not len(candles):
+        print(f"[STOCKS] No history data for {sym} ({resolution})")
+        return None
+    return candles_at(candles, resolution).tail(points)
+
+
+def to_points(candles: Optional[Candles]) -> Optional[List[Dict[str, Any]]]:
+    """Candles -> [{"t": ..., "price": close}, ...] (the classic sparkline shape)."""
+    if candles is None or not len(candles):
+        return None
+    return [{"t": t, "price": p} for t, p in zip(candles.t.tolist(), candles.c.tolist())]
+
 
-    return out
+def _load_history(sym: str, points: int, resolution: str) -> Optional[Candles]:
+    from_ts, to_ts, backfill, keep_from = _history_range(sym, points, resolution)
+    data = _get("/stock/candle", params=_candle_params(sym, resolution, from_ts, to_ts))
+    candles = _store_candles(sym, resolution, data, from_ts, backfill, keep_from)
+    return _history_window(sym, candles, points, resolution)
 
 
-def fetch_stock_history(symbol: str, points: int = 40) -> Optional[List[Dict[str, Any]]]:
+async def _load_history_async(sym: str, points: int, resolution: str) -> Optional[Candles]:
+    from_ts, to_ts, backfill, keep_from = _history_range(sym, points, resolution)
+    data = await _get_async("/stock/candle", params=_candle_params(sym, resolution, from_ts, to_ts))
+    # Merging persists to disk (fsync) -> keep it off the event loop.
+    candles = await asyncio.to_thread(_store_candles, sym, resolution, data, from_ts, backfill, keep_from)
+    return _history_window(sym, candles, points, resolution)
+
+
+def history_refresh_for(resolution: str) -> datetime:
+    """Daily bars settle at the close; intraday bars move with the quotes."""
+    return history_refresh_at() if resolution == DAILY else quotes_refresh_at()
+
+
+def _history_ttl_for(resolution: str):
+    return history_ttl if resolution == DAILY else quotes_ttl
+
+
+def fetch_stock_history(symbol: str, points: int = 40, resolution: str = DAILY) -> Optional[List[Dict[str, Any]]]:
     """
-    Returns simple daily close history for sparklines:
+    Returns simple close history for sparklines:
 
       [{"t": 1717000000, "price": 193.42}, ...]
 
+    resolution: "D" (daily, default) or intraday "1m" / "5m" / "15m" / "1h".
+
     Finnhub candles:
       /stock/candle?symbol=AAPL&resolution=D&from=...&to=...
       returns { "c": [..], "t": [..], "s": "ok" }
+
+    Bars are kept in the local candle store, so after the first load only
+    the newest bar(s) are requested.
     """
-    
+
     sym = str(symbol).strip().upper()
     if not sym:
         return None
 
-    # Add a few buffer days for weekends/holidays so we still get `points` bars.
-    now = datetime.now(timezone.utc)
-    to_ts = int(now.timestamp())
-    from_ts = int((now - timedelta(days=points + 14)).timestamp())
-
     try:
-        data = _get(
-            "/stock/candle",
-            params={
-                "symbol": sym,
-                "resolution": "D",
-                "from": from_ts,
-                "to": to_ts,
-            },
-        )
+        return to_points(_fetch_history(sym, points, resolution))
     except Exception as e:
-        print(f"[STOCKS] History fetch failed for {sym}: {e}")
+        print(f"[STOCKS] History fetch failed for {sym}: {upstream.describe_error(e)}")
         return None
 
-    status = (data.get("s") or "").lower()
-    if status != "ok":
-        # Common Finnhub statuses: "no_data"
-        print(f"[STOCKS] No history data for {sym}: status={data.get('s')}")
-        return None
 
-    closes = data.get("c") or []
-    times = data.get("t") or []
+async def fetch_stock_history_async(
+    symbol: str,
+    points: int = 40,
+    resolution: str = DAILY,
+) -> Optional[List[Dict[str, Any]]]:
+    """Non-blocking fetch_stock_history() for async route handlers."""
+    sym = str(symbol).strip().upper()
+    if not sym:
+        return None
 
-    if not closes or not times or len(closes) != len(times):
-        print(f"[STOCKS] Invalid history payload for {sym}")
+    try:
+        return to_points(await _fetch_history_async(sym, points, resolution))
+    except Exception as e:
+        print(f"[STOCKS] History fetch failed for {sym}: {upstream.describe_error(e)}")
         return None
 
-    # Take last `points`
-    start = max(0, len(closes) - points)
-    out: List[Dict[str, Any]] = []
-    for t, c in zip(times[start:], closes[start:]):
-        if t is None or c is None:
-            continue
-        out.append({"t": int(t), "price": float(c)})
 
-    return out if out else None
+def _check_resolution(resolution: str) -> None:
+    if resolution not in RESOLUTIONS:
+        raise StocksError(f"Unsupported resolution {resolution!r}, expected one of {RESOLUTIONS}")
+
+
+def _fetch_history(sym: str, points: int, resolution: str = DAILY) -> Optional[Candles]:
+    _check_resolution(resolution)
+    return _history_cache.get_or_load(
+        (sym, points, resolution),
+        lambda: _load_history(sym, points, resolution),
+        ttl=_history_ttl_for(resolution),
+    )
+
+
+async def _fetch_history_async(
+    sym: str,
+    points: int,
+    resolution: str = DAILY,
+    fresh: bool = False,
+) -> Optional[Candles]:
+    _check_resolution(resolution)
+    return await _history_cache.aget_or_load(
+        (sym, points, resolution),
+        lambda: _load_history_async(sym, points, resolution),
+        ttl=_history_ttl_for(resolution),
+        fresh=fresh,
+    )
+
+
+# ----------------- Batched history -----------------
+#   {"items": {"AAPL": [...] | None, ...}, "errors": {"XYZ": "..."}}
+# `encode` shapes each symbol's Candles window (default: to_points).
+
+Encoder = Callable[[Optional[Candles]], Any]
+
+
+def fetch_stock_history_batch(
+    symbols: List[str],
+    points: int = 40,
+    resolution: str = DAILY,
+    encode: Encoder = to_points,
+) -> Dict[str, Any]:
+    clean = _clean_symbols(symbols)
+    futures = {_pool.submit(_fetch_history, sym, points, resolution): sym for sym in clean}
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    for fut in as_completed(futures):
+        sym = futures[fut]
+        try:
+            results[sym] = encode(fut.result())
+        except Exception as e:
+            errors[sym] = upstream.describe_error(e)
+            print(f"[STOCKS] History fetch failed for {sym}: {errors[sym]}")
+            results[sym] = None
+    return {"items": {sym: results.get(sym) for sym in clean}, "errors": errors}
+
+
+async def fetch_stock_history_batch_async(
+    symbols: List[str],
+    points: int = 40,
+    resolution: str = DAILY,
+    fresh: bool = False,
+    encode: Encoder = to_points,
+) -> Dict[str, Any]:
+    clean = _clean_symbols(symbols)
+    results = await asyncio.gather(
+        *(_fetch_history_async(sym, points, resolution, fresh=fresh) for sym in clean),
+        return_exceptions=True,
+    )
+    items: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    for sym, result in zip(clean, results):
+        if isinstance(result, BaseException):
+            errors[sym] = upstream.describe_error(result)
+            print(f"[STOCKS] History fetch failed for {sym}: {errors[sym]}")
+            items[sym] = None
+        else:
+            items[sym] = encode(result)
+    return {"items": items, "errors": errors}
@@ -0,0 +1,148 @@
+# mirror-server/app/singleflight.py
+
+"""
+Single-flight call coalescing.
+
+When several callers ask for the same thing at the same time (the kiosk's
+stocks widget, build_context() and get_mirror_snapshot() during a voice
+turn), only the first one actually runs; the others wait for it and get
+the same result (or the same exception).
+
+Keys are tuples whose first element is the stats group, e.g.
+("finnhub", url, params). Nothing is cached: once a call finishes, the
+next caller starts a fresh one.
+
+Followers get a deep copy of the result, so nobody can mutate someone
+else's data.
+
+Async calls run as a detached task that every caller (leader included)
+awaits through asyncio.shield, so a cancelled caller (e.g. its client
+disconnected) never takes the call down for the others.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Call:
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    error: Optional[BaseException] = None
+    followers: int = 0
+
+
+@dataclass
+class _AsyncCall:
+    task: "asyncio.Task[Any]"
+    followers: int = 0
+
+
+@dataclass
+class FlightStats:
+    calls: int = 0
+    executed: int = 0
+    deduplicated: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "executed": self.executed,
+            "deduplicated": self.deduplicated,
+        }
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        # Async calls only ever run on the event loop thread.
+        self._async_calls: Dict[Tuple[int, Hashable], _AsyncCall] = {}
+        self._stats: Dict[str, FlightStats] = {}
+
+    def _count(self, key: Hashable, shared: bool) -> None:
+        # caller holds self._lock
+        group = str(key[0]) if isinstance(key, tuple) and key else "default"
+        st = self._stats.setdefault(group, FlightStats())
+        st.calls += 1
+        if shared:
+            st.deduplicated += 1
+        else:
+            st.executed += 1
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Run fn() unless an identical call is already in flight; then share its result."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+            self._count(key, shared=not leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        else:
+            call.result = result
+        finally:
+            # Unpublish first so no new follower joins after done is set.
+            with self._lock:
+                self._calls.pop(key, None)
+                followers = call.followers
+            call.done.set()
+
+        # The leader keeps its own copy; call.result stays pristine for followers.
+        return copy.deepcopy(result) if followers else result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Async do(): coalesces coroutines on the current event loop."""
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+
+        call = self._async_calls.get(loop_key)
+        with self._lock:
+            self._count(key, shared=call is not None)
+
+        if call is not None:
+            call.followers += 1
+            # shield: a cancelled follower must not cancel the shared call
+            result = await asyncio.shield(call.task)
+            return copy.deepcopy(result)
+
+        call = self._async_calls[loop_key] = _AsyncCall(task=loop.create_task(fn()))
+
+        def _finished(task: "asyncio.Task[Any]") -> None:
+            # Unpublished once done, so no new follower joins a finished call
+            if self._async_calls.get(loop_key) is call:
+                del self._async_calls[loop_key]
+            # Mark retrieved so an unawaited failure doesn't log "never retrieved"
+            if not task.cancelled():
+                task.exception()
+
+        call.task.add_done_callback(_finished)
+        # shield: if the leader is cancelled, followers still get the result
+        result = await asyncio.shield(call.task)
+        return copy.deepcopy(result) if call.followers else result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            inflight = len(self._calls) + len(self._async_calls)
+            groups = {name: st.as_dict() for name, st in self._stats.items()}
+        return {"inflight": inflight, "groups": groups}
@@ -0,0 +1,364 @@
+# mirror-server/app/snapshot_engine.py
+
+"""
+One snapshot engine for every view of the mirror's live state.
+
+The mirror snapshot (/api/mirror/snapshot, agent answers), Zo's context
+(build_context) and voice_zo all read the same sections:
+
+  weather        current conditions for cfg.location
+  stock_quotes   watchlist quotes + market session
+  stock_history  40-point history per watchlist symbol
+  news           top headlines for the active news category
+  today          cfg.todayItems
+  quotes         cfg.currentQuote + categories
+  display        cfg.display
+  widget_state   backend widget state
+
+Callers ask only for the sections they need (the agent maps each data
+intent to a set, so a weather question never touches Finnhub). Each
+section is built once per (inputs, TTL) and memoized in the
+"snapshot.sections" TTLCache, so a voice turn that builds the snapshot
+and then the context does no duplicate upstream (or parsing) work.
+Inputs are part of the key: a new location, watchlist or news category
+(or any config / widget-state change for the config-derived sections)
+rebuilds right away instead of waiting out the TTL.
+
+Sections that aren't cached are built concurrently on a small pool,
+and a build already running for the same inputs is joined rather than
+repeated. With a deadline (the snapshot uses SNAPSHOT_DEADLINE_SECONDS),
+a section that isn't ready in time is returned as its last cached value
+(dict sections marked {"stale": true}) or an empty placeholder on a
+cold start, while the build finishes in the background for the next
+caller. The caller's thread never builds a section itself.
+
+Provider failures are captured as {"error": "..."} in the section
+rather than raised. Section values are shared between callers; treat
+them as read-only. Hit / miss counters show up in /api/system/cache.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+from .config_store import load_config, get_config_version
+from .models import MirrorConfig
+from .ttl_cache import KEEP_TTL_SECONDS, TTL, TTLCache
+from .widget_store import widget_state, get_widget_state_version
+from .weather_service import get_weather_for_city
+from .services_news import fetch_top_news
+from . import services_stocks, upstream
+
+# Upstream-derived sections: short, so a refreshed service cache shows up
+# quickly; long enough to cover one voice turn (snapshot + context).
+WEATHER_TTL_SECONDS = 60
+NEWS_TTL_SECONDS = 60
+# Config / widget-state sections are keyed by version, so the TTL only
+# bounds memory.
+STATIC_TTL_SECONDS = 60 * 60
+
+# How long /api/mirror/snapshot waits on upstream sections before
+# serving stale ones
+SNAPSHOT_DEADLINE_SECONDS = float(os.getenv("MAISON_SNAPSHOT_DEADLINE", "1.5"))
+
+HISTORY_POINTS = 40
+DEFAULT_NEWS_CATEGORY = "technology"
+
+# keep_ttl: past its TTL a section is still kept as the deadline fallback
+_cache = TTLCache("snapshot.sections", ttl=WEATHER_TTL_SECONDS, stale_ttl=0, maxsize=64, keep_ttl=KEEP_TTL_SECONDS)
+
+# One slot per section, so cheap config sections never queue behind a
+# stalled upstream; the per-symbol stock fan-out runs on services_stocks'
+# own pool.
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="snapshot-section")
+_inflight: Dict[tuple, Future] = {}
+_inflight_lock = threading.Lock()
+
+# id(value) -> (value, digest); holding the value keeps its id unique
+_digests: "OrderedDict[int, tuple]" = OrderedDict()
+_digests_lock = threading.Lock()
+DIGESTS_KEPT = 256
+
+_NOT_CACHED = object()
+
+_stats_lock = threading.Lock()
+_stats = {"builds": 0, "joined": 0, "deadlineMisses": 0, "staleServed": 0, "placeholders": 0}
+
+
+@dataclass(frozen=True)
+class Section:
+    name: str
+    ttl: TTL
+    key: Callable[[MirrorConfig], Hashable]
+    build: Callable[[MirrorConfig], Any]
+    # What a section that missed the deadline returns with nothing cached
+    placeholder: Callable[[MirrorConfig], Any] = lambda cfg: None
+    # degraded(value): a partial result, kept only for retry_ttl seconds
+    degraded: Optional[Callable[[Any], bool]] = None
+    retry_ttl: float = services_stocks.RETRY_SECONDS
+
+
+# ----------------- section inputs ----------------- #
+
+def watchlist(cfg: MirrorConfig) -> List[str]:
+    """Watchlist symbols in config order, upper-cased, de-duplicated."""
+    symbols = (str(getattr(item, "symbol", "") or "").strip().upper() for item in cfg.stocksItems or [])
+    return list(dict.fromkeys(s for s in symbols if s))
+
+
+def news_category() -> str:
+    # widget_state can override the category (set by actions)
+    return (widget_state.get("news") or {}).get("category") or DEFAULT_NEWS_CATEGORY
+
+
+def _dump(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, list):
+        return [_dump(v) for v in value]
+    return value
+
+
+# ----------------- section builders ----------------- #
+
+def _build_weather(cfg: MirrorConfig) -> Dict[str, Any]:
+    city = cfg.location or "San Diego"
+    try:
+        return {"city": city, "data": get_weather_for_city(city)}
+    except Exception as e:
+        error = upstream.describe_error(e)
+        print(f"[SNAPSHOT] weather error: {error}")
+        return {"city": city, "data": {}, "error": error}
+
+
+def _build_stock_quotes(cfg: MirrorConfig) -> Dict[str, Any]:
+    symbols = watchlist(cfg)
+    quotes = services_stocks.fetch_stock_quotes_batch(symbols)
+    refresh_at = services_stocks.batch_refresh_at(quotes, services_stocks.quotes_refresh_at())
+    return {
+        "symbols": symbols,
+        "quotes": quotes["items"],
+        "errors": quotes["errors"] or None,
+        **services_stocks.market_info(refresh_at),
+    }
+
+
+def _build_stock_history(cfg: MirrorConfig) -> Dict[str, Any]:
+    history = services_stocks.fetch_stock_history_batch(watchlist(cfg), points=HISTORY_POINTS)
+    return {
+        "history": {sym: hist for sym, hist in history["items"].items() if hist} or None,
+        "errors": history["errors"] or None,
+    }
+
+
+def _build_news(cfg: MirrorConfig) -> Dict[str, Any]:
+    category = news_category()
+    try:
+        articles = fetch_top_news(category=category, country="us")
+        return {"category": category, "articles": articles if isinstance(articles, list) else []}
+    except Exception as e:
+        error = upstream.describe_error(e)
+        print(f"[SNAPSHOT] news error: {error}")
+        return {"category": category, "articles": [], "error": error}
+
+
+def _empty_weather(cfg: MirrorConfig) -> Dict[str, Any]:
+    return {"city": cfg.location or "San Diego", "data": {}}
+
+
+def _empty_stock_quotes(cfg: MirrorConfig) -> Dict[str, Any]:
+    symbols = watchlist(cfg)
+    return {
+        "symbols": symbols,
+        "quotes": [{"symbol": sym, "price": None, "changePercent": None} for sym in symbols],
+        "errors": None,
+        **services_stocks.market_info(services_stocks.quotes_refresh_at()),
+    }
+
+
+def _empty_stock_history(cfg: MirrorConfig) -> Dict[str, Any]:
+    return {"history": None, "errors": None}
+
+
+def _empty_news(cfg: MirrorConfig) -> Dict[str, Any]:
+    return {"category": news_category(), "articles": []}
+
+
+def _empty_quotes(cfg: MirrorConfig) -> Dict[str, Any]:
+    return {"current_quote": None, "categories": []}
+
+
+def _stocks_degraded(value: Dict[str, Any]) -> bool:
+    return services_stocks.is_degraded({"items": value.get("quotes", value.get("history")), "errors": value["errors"]})
+
+
+def _build_today(cfg: MirrorConfig) -> List[Dict[str, Any]]:
+    return _dump(list(cfg.todayItems or []))
+
+
+def _build_quotes(cfg: MirrorConfig) -> Dict[str, Any]:
+    return {
+        "current_quote": _dump(cfg.currentQuote),
+        "categories": list(cfg.quotesCategories or []),
+    }
+
+
+def _build_display(cfg: MirrorConfig) -> Dict[str, Any]:
+    return _dump(cfg.display) if cfg.display is not None else {}
+
+
+def _build_widget_state(cfg: MirrorConfig) -> Dict[str, Any]:
+    return dict(widget_state)
+
+
+SECTIONS: Dict[str, Section] = {
+    s.name: s
+    for s in (
+        Section("weather", WEATHER_TTL_SECONDS, lambda cfg: cfg.location, _build_weather, _empty_weather),
+        Section("stock_quotes", services_stocks.quotes_ttl, lambda cfg: tuple(watchlist(cfg)), _build_stock_quotes, _empty_stock_quotes, _stocks_degraded),
+        Section("stock_history", services_stocks.quotes_ttl, lambda cfg: tuple(watchlist(cfg)), _build_stock_history, _empty_stock_history, _stocks_degraded),
+        Section("news", NEWS_TTL_SECONDS, lambda cfg: news_category(), _build_news, _empty_news),
+        Section("today", STATIC_TTL_SECONDS, lambda cfg: get_config_version(), _build_today, lambda cfg: []),
+        Section("quotes", STATIC_TTL_SECONDS, lambda cfg: get_config_version(), _build_quotes, _empty_quotes),
+        Section("display", STATIC_TTL_SECONDS, lambda cfg: get_config_version(), _build_display, lambda cfg: {}),
+        Section("widget_state", STATIC_TTL_SECONDS, lambda cfg: get_widget_state_version(), _build_widget_state, lambda cfg: {}),
+    )
+}
+
+
+# ----------------- concurrent assembly ----------------- #
+
+def _loader(spec: Section, cfg: MirrorConfig) -> tuple:
+    """(loader, ttl) for _cache.get_or_load; degraded values get retry_ttl."""
+    built: Dict[str, Any] = {}
+
+    def load() -> Any:
+        built["value"] = spec.build(cfg)
+        return built["value"]
+
+    def ttl() -> float:
+        # resolved right after load(), on the same thread
+        if spec.degraded is not None and "value" in built and spec.degraded(built["value"]):
+            return spec.retry_ttl
+        return spec.ttl() if callable(spec.ttl) else spec.ttl
+
+    return load, ttl
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _submit(spec: Section, key: tuple, cfg: MirrorConfig) -> Future:
+    """Build `spec` on the pool, or join the build already running for `key`."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            _count("joined")
+            return future
+        # Carry contextvars (rate-limit priority) into the worker
+        ctx = contextvars.copy_context()
+        future = _pool.submit(ctx.run, _cache.get_or_load, key, *_loader(spec, cfg))
+        _inflight[key] = future
+    _count("builds")
+
+    def _finished(_future: Future) -> None:
+        with _inflight_lock:
+            if _inflight.get(key) is _future:
+                del _inflight[key]
+
+    future.add_done_callback(_finished)
+    return future
+
+
+def _late(spec: Section, key: tuple, cfg: MirrorConfig) -> Any:
+    """Stand-in for a section that missed the deadline."""
+    _count("deadlineMisses")
+    value = _cache.peek_last(key)
+    if value is None:
+        _count("placeholders")
+        print(f"[SNAPSHOT] {spec.name} missed the deadline, nothing cached yet")
+        value = spec.placeholder(cfg)
+    else:
+        _count("staleServed")
+        print(f"[SNAPSHOT] {spec.name} missed the deadline, serving the last cached value")
+    # Lists (today) can't carry the flag and go out as-is
+    return {**value, "stale": True} if isinstance(value, dict) else value
+
+
+# ----------------- public API ----------------- #
+
+def section(name: str, cfg: Optional[MirrorConfig] = None) -> Any:
+    """One section's value, built at most once per inputs + TTL."""
+    spec = SECTIONS[name]
+    cfg = cfg or load_config()
+    return _cache.get_or_load((name, spec.key(cfg)), *_loader(spec, cfg))
+
+
+def sections(
+    names: Iterable[str],
+    cfg: Optional[MirrorConfig] = None,
+    deadline: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Several sections at once, built concurrently on the pool. With
+    `deadline` (seconds), sections still building by then come back
+    stale (see module docstring) instead of being waited for.
+    """
+    cfg = cfg or load_config()
+    names = list(names)
+    started = time.monotonic()
+
+    out: Dict[str, Any] = {}
+    pending: Dict[str, tuple] = {}
+    for name in names:
+        spec = SECTIONS[name]
+        key = (name, spec.key(cfg))
+        # Cached values are used as-is; every build goes to the pool
+        value = _cache.peek(key, _NOT_CACHED)
+        if value is _NOT_CACHED:
+            pending[name] = (spec, key, _submit(spec, key, cfg))
+        else:
+            out[name] = value
+
+    remaining = None if deadline is None else max(0.0, deadline - (time.monotonic() - started))
+    wait([future for _, _, future in pending.values()], timeout=remaining)
+    for name, (spec, key, future) in pending.items():
+        out[name] = future.result() if future.done() else _late(spec, key, cfg)
+
+    return {name: out[name] for name in names}
+
+
+def digest(value: Any) -> str:
+    """
+    Content hash of a section value. Memoized per object, so a section
+    served from the cache is hashed once, not on every snapshot.
+    """
+    with _digests_lock:
+        hit = _digests.get(id(value))
+        if hit is not None and hit[0] is value:
+            _digests.move_to_end(id(value))
+            return hit[1]
+
+    body = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    result = hashlib.sha1(body.encode("utf-8")).hexdigest()
+    with _digests_lock:
+        _digests[id(value)] = (value, result)
+        while len(_digests) > DIGESTS_KEPT:
+            _digests.popitem(last=False)
+    return result
+
+
+def stats() -> Dict[str, Any]:
+    with _stats_lock:
+        return {"deadlineSeconds": SNAPSHOT_DEADLINE_SECONDS, **_stats}
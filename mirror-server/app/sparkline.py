@@ -0,0 +1,124 @@
+# mirror-server/app/sparkline.py
+
+"""
+Sparkline payload shaping for /api/stocks/history.
+
+- lttb_indices(): Largest-Triangle-Three-Buckets downsampling to a target
+  pixel width; keeps peaks, dips and the first/last point, unlike taking
+  every n-th bar. Bucket averages are vectorized (cumsum); the per-bucket
+  pick is inherently sequential, so that loop runs `width` times over
+  NumPy slices.
+- encode(): "points" (the original [{"t", "price"}, ...]) or "columnar"
+  ({"t0", "dt": [...], "p": [...]}: delta-encoded timestamps, parallel
+  prices), optionally rounded to float32 precision (shorter JSON numbers).
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+FORMATS = ("points", "columnar")
+PRECISIONS = ("f64", "f32")
+
+MIN_WIDTH = 3
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, width: int) -> np.ndarray:
+    """Indices of the `width` points LTTB keeps (all of them if len <= width)."""
+    n = len(x)
+    if width >= n or width < MIN_WIDTH:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # width-2 buckets over the interior points [1, n-1)
+    edges = np.linspace(1, n - 1, width - 1).astype(np.int64)
+    counts = edges[1:] - edges[:-1]
+
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    avg_x = (cx[edges[1:]] - cx[edges[:-1]]) / counts
+    avg_y = (cy[edges[1:]] - cy[edges[:-1]]) / counts
+    # The "third point" for bucket i is the average of bucket i+1 (last: the final point)
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    out = np.empty(width, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+
+    # Twice the triangle area for candidate (px, py) with fixed corners
+    # (ax, ay) and (nx, ny) is |A*py + B*px + C|; only A, B, C depend on
+    # the previous pick, so each step is two NumPy ops on the bucket slice.
+    xl, yl = x.tolist(), y.tolist()
+    nxl, nyl = next_x.tolist(), next_y.tolist()
+    el = edges.tolist()
+
+    a = 0
+    for i in range(width - 2):
+        lo, hi = el[i], el[i + 1]
+        ax, ay, nx, ny = xl[a], yl[a], nxl[i], nyl[i]
+        A = ax - nx
+        B = ny - ay
+        C = -A * ay - B * ax
+        area = np.abs(A * y[lo:hi] + (B * x[lo:hi] + C))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+
+    return out
+
+
+# float32 carries ~7 significant decimal digits
+F32_DIGITS = 7
+
+
+def _f32(p: np.ndarray) -> np.ndarray:
+    """
+    Round to float32-equivalent precision (7 significant digits), keeping
+    float64 values so JSON gets "193.42" rather than "193.4199981689453".
+    Dividing an exact integer by an exact power of ten lands on the double
+    nearest the short decimal, so repr() stays short.
+    """
+    p = np.asarray(p, dtype=np.float64)
+    mag = np.floor(np.log10(np.abs(p), out=np.zeros_like(p), where=p != 0))
+    k = (F32_DIGITS - 1 - mag).astype(np.int64)
+    pos = np.power(10.0, np.clip(k, 0, None))
+    neg = np.power(10.0, np.clip(-k, 0, None))
+    return np.where(k >= 0, np.round(p * pos) / pos, np.round(p / neg) * neg)
+
+
+def encode(
+    t: np.ndarray,
+    p: np.ndarray,
+    width: Optional[int] = None,
+    fmt: str = "points",
+    precision: str = "f64",
+) -> Union[List[Dict[str, Any]], Dict[str, Any], None]:
+    """Shape one series for the wire (see module docstring)."""
+    if not len(t):
+        return None
+
+    if width is not None:
+        idx = lttb_indices(t, p, width)
+        t, p = t[idx], p[idx]
+
+    if precision == "f32":
+        p = _f32(p)
+
+    if fmt == "columnar":
+        return {
+            "t0": int(t[0]),
+            "dt": np.diff(t).tolist(),
+            "p": p.tolist(),
+        }
+
+    return [{"t": ts, "price": price} for ts, price in zip(t.tolist(), p.tolist())]
+
+
+def decode_columnar(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Inverse of the columnar format (reference for clients / tests)."""
+    t = np.cumsum(np.r_[payload["t0"], payload["dt"]]).tolist()
+    return [{"t": ts, "price": price} for ts, price in zip(t, payload["p"])]
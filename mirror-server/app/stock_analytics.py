@@ -0,0 +1,230 @@
+# mirror-server/app/stock_analytics.py
+
+"""
+Watchlist analytics over the local daily candle store (no upstream calls).
+
+Per symbol: trailing returns (1d / 1w / 1m / 3m / 6m / 1y, month- and
+year-to-date), simple moving averages, realized volatility, max drawdown
+and 52-week high / low proximity. movers() ranks the watchlist by return.
+
+The watchlist's closes are stacked into one (symbols x bars) matrix,
+right-aligned on the latest bar and NaN-padded, so every metric is a
+single NumPy op across all symbols. Missing history propagates as NaN
+and comes out as None.
+
+Results are memoized per candle_store.version (bumped whenever any series
+changes) and trading date, so repeat questions are a dict lookup.
+"""
+
+from __future__ import annotations
+
+import threading
+import warnings
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .candle_store import store as candle_store
+from .market_calendar import MARKET_TZ
+
+DAILY = "D"
+
+TRADING_DAYS = 252
+YEAR_BARS = TRADING_DAYS
+
+# Trailing windows in daily bars
+PERIOD_BARS = {"1d": 1, "1w": 5, "1m": 21, "3m": 63, "6m": 126, "1y": YEAR_BARS}
+# Calendar windows: base is the last close before the month / year started
+CALENDAR_PERIODS = ("mtd", "ytd")
+PERIODS = (*PERIOD_BARS, *CALENDAR_PERIODS)
+
+PERIOD_LABELS = {
+    "1d": "today",
+    "1w": "over the past week",
+    "1m": "over the past month",
+    "3m": "over the past three months",
+    "6m": "over the past six months",
+    "1y": "over the past year",
+    "mtd": "this month",
+    "ytd": "this year",
+}
+
+SMA_WINDOWS = (20, 50, 200)
+VOL_WINDOW = 21  # ~1 month of daily log returns, annualized
+
+# Enough bars for the longest window plus its base close
+LOOKBACK_BARS = YEAR_BARS + 1
+
+_lock = threading.Lock()
+_memo: Dict[Tuple[Tuple[str, ...], date], Dict[str, Dict[str, Any]]] = {}
+_memo_version = -1
+_hits = 0
+_misses = 0
+
+
+def _period_start(day: date, period: str) -> int:
+    start = date(day.year, day.month, 1) if period == "mtd" else date(day.year, 1, 1)
+    # Daily bars are stamped at 00:00 UTC of the trading date
+    return int(datetime(start.year, start.month, start.day, tzinfo=timezone.utc).timestamp())
+
+
+def _matrix(symbols: Sequence[str], bars: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(t, c) of shape (symbols, bars), right-aligned; padding is t=-1, c=NaN."""
+    t = np.full((len(symbols), bars), -1, dtype=np.int64)
+    c = np.full((len(symbols), bars), np.nan)
+    for i, sym in enumerate(symbols):
+        candles = candle_store.get(sym, DAILY).tail(bars)
+        n = len(candles)
+        if n:
+            t[i, bars - n:] = candles.t
+            c[i, bars - n:] = candles.c
+    return t, c
+
+
+def _pct(values: np.ndarray) -> List[Optional[float]]:
+    return [None if np.isnan(v) else round(v * 100, 2) for v in values.tolist()]
+
+
+def _num(values: np.ndarray) -> List[Optional[float]]:
+    return [None if np.isnan(v) else round(v, 4) for v in values.tolist()]
+
+
+def compute(t: np.ndarray, c: np.ndarray, today: date) -> Dict[str, Any]:
+    """All metrics for a (symbols x bars) close matrix, as per-metric columns."""
+    rows, bars = c.shape
+    last = c[:, -1]
+
+    with warnings.catch_warnings():
+        # All-NaN rows (symbols without history) are expected
+        warnings.simplefilter("ignore", RuntimeWarning)
+
+        returns: Dict[str, np.ndarray] = {}
+        for name, k in PERIOD_BARS.items():
+            base = c[:, -1 - k] if bars > k else np.full(rows, np.nan)
+            returns[name] = last / base - 1
+        for name in CALENDAR_PERIODS:
+            # index of the last bar before the period (padding counts, so a
+            # short series lands on NaN instead of a wrong base)
+            idx = (t < _period_start(today, name)).sum(axis=1) - 1
+            base = np.where(idx >= 0, c[np.arange(rows), np.maximum(idx, 0)], np.nan)
+            returns[name] = last / base - 1
+
+        sma = {
+            str(w): c[:, -w:].mean(axis=1) if bars >= w else np.full(rows, np.nan)
+            for w in SMA_WINDOWS
+        }
+
+        log_returns = np.diff(np.log(c[:, -(VOL_WINDOW + 1):]), axis=1)
+        volatility = log_returns.std(axis=1, ddof=1) * np.sqrt(TRADING_DAYS)
+
+        year = c[:, -YEAR_BARS:]
+        high = np.nanmax(year, axis=1)
+        low = np.nanmin(year, axis=1)
+        # fmax skips the NaN padding when carrying the running peak forward
+        peak = np.fmax.accumulate(year, axis=1)
+        max_drawdown = np.nanmin(year / peak - 1, axis=1)
+
+    return {
+        "asOf": t[:, -1],
+        "price": last,
+        "returns": returns,
+        "sma": sma,
+        "volatility": volatility,
+        "high52w": high,
+        "low52w": low,
+        "fromHigh52w": last / high - 1,
+        "fromLow52w": last / low - 1,
+        "maxDrawdown": max_drawdown,
+    }
+
+
+def _rows(symbols: Sequence[str], m: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    returns = {k: _pct(v) for k, v in m["returns"].items()}
+    sma = {k: _num(v) for k, v in m["sma"].items()}
+    cols = {
+        "price": _num(m["price"]),
+        "volatility": _pct(m["volatility"]),
+        "high52w": _num(m["high52w"]),
+        "low52w": _num(m["low52w"]),
+        "fromHigh52w": _pct(m["fromHigh52w"]),
+        "fromLow52w": _pct(m["fromLow52w"]),
+        "maxDrawdown": _pct(m["maxDrawdown"]),
+    }
+    as_of = m["asOf"].tolist()
+
+    out: Dict[str, Dict[str, Any]] = {}
+    for i, sym in enumerate(symbols):
+        if as_of[i] < 0:
+            continue  # no stored history
+        out[sym] = {
+            "symbol": sym,
+            "asOf": as_of[i],
+            "returns": {k: v[i] for k, v in returns.items()},
+            "sma": {k: v[i] for k, v in sma.items()},
+            **{k: v[i] for k, v in cols.items()},
+        }
+    return out
+
+
+def watchlist_analytics(symbols: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    {symbol: metrics} for every symbol with stored daily history.
+    Percentages are in percent (8.4 == +8.4%); unknown values are None.
+    """
+    global _memo_version, _hits, _misses
+
+    syms = tuple(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+    today = datetime.now(MARKET_TZ).date()
+    key = (syms, today)
+
+    with _lock:
+        if candle_store.version != _memo_version:
+            _memo.clear()
+            _memo_version = candle_store.version
+        cached = _memo.get(key)
+        if cached is not None:
+            _hits += 1
+            return cached
+        _misses += 1
+        version = _memo_version
+
+    if not syms:
+        result: Dict[str, Dict[str, Any]] = {}
+    else:
+        t, c = _matrix(syms, LOOKBACK_BARS)
+        result = _rows(syms, compute(t, c, today))
+
+    with _lock:
+        # Don't memoize under a newer version than the data we read
+        if version == candle_store.version == _memo_version:
+            _memo[key] = result
+    return result
+
+
+def symbol_analytics(symbol: str) -> Optional[Dict[str, Any]]:
+    sym = symbol.strip().upper()
+    return watchlist_analytics([sym]).get(sym)
+
+
+def movers(symbols: Sequence[str], period: str = "1d", n: int = 3) -> List[Dict[str, Any]]:
+    """Largest absolute moves over `period`: [{"symbol", "change", "price"}, ...]."""
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period: {period}")
+    rows = [
+        {"symbol": sym, "change": m["returns"][period], "price": m["price"]}
+        for sym, m in watchlist_analytics(symbols).items()
+        if m["returns"][period] is not None
+    ]
+    rows.sort(key=lambda r: abs(r["change"]), reverse=True)
+    return rows[:n]
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "version": _memo_version,
+            "entries": len(_memo),
+            "hits": _hits,
+            "misses": _misses,
+        }
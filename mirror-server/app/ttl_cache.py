@@ -0,0 +1,364 @@
+# mirror-server/app/ttl_cache.py
+
+"""
+In-memory TTL cache for upstream data (weather, news, stocks, quotes).
+
+- per-cache TTL (or per-put, e.g. quotes: 30 s in market hours)
+- stale-while-revalidate: an expired entry is still served for
+  `stale_ttl` seconds while one background refresh runs
+- last-known-good: past the stale window a value is kept for
+  `keep_ttl` more seconds and returned if the reload fails (provider
+  down, circuit open) instead of raising
+- negative caching: a failed load is remembered for `negative_ttl`
+  seconds; callers get the last-known-good value (or the same error)
+  right away instead of each waiting on the failing provider
+- bounded size, LRU eviction
+- hit / miss / stale / refresh / fallback counters, see stats()
+
+Loaders must raise on failure. Cached values are shared between
+callers, so treat them as read-only.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple, Union
+
+from .rate_limit import background
+from .upstream import describe_error
+
+# Background refreshes for sync callers. Small on purpose: upstream.py
+# already caps per-provider concurrency.
+_refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+
+_MISSING = object()
+
+NEGATIVE_TTL_SECONDS = 15.0
+KEEP_TTL_SECONDS = 6 * 60 * 60
+
+# Seconds, or a callable returning seconds at store time.
+TTL = Union[float, Callable[[], float], None]
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expires_at: float
+    stale_until: float
+    keep_until: float  # last-known-good fallback after a failed reload
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    refreshes: int = 0
+    refresh_errors: int = 0
+    evictions: int = 0
+    fail_fast: int = 0   # remembered error re-raised without calling the loader
+    fallbacks: int = 0   # last-known-good value served after a failure
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "refreshes": self.refreshes,
+            "refreshErrors": self.refresh_errors,
+            "evictions": self.evictions,
+            "failFast": self.fail_fast,
+            "fallbacks": self.fallbacks,
+        }
+
+
+class TTLCache:
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        stale_ttl: Optional[float] = None,
+        maxsize: int = 128,
+        negative_ttl: float = NEGATIVE_TTL_SECONDS,
+        keep_ttl: float = KEEP_TTL_SECONDS,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = ttl if stale_ttl is None else stale_ttl
+        self.maxsize = maxsize
+        self.negative_ttl = negative_ttl
+        self.keep_ttl = keep_ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._failures: Dict[Hashable, Tuple[Exception, float]] = {}
+        self._refreshing: Set[Hashable] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats = CacheStats()
+        _registry[name] = self
+
+    # ---------- core ----------
+
+    def _lookup(self, key: Hashable) -> tuple:
+        """
+        Returns (value, needs_refresh). value is _MISSING on a miss.
+        Caller holds self._lock.
+        """
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry is None or now >= entry.stale_until:
+            if entry is not None and now >= entry.keep_until:
+                del self._entries[key]
+            self._stats.misses += 1
+            return _MISSING, False
+
+        self._entries.move_to_end(key)
+        if now < entry.expires_at:
+            self._stats.hits += 1
+            return entry.value, False
+
+        self._stats.stale += 1
+        # No point re-trying a load that just failed
+        refresh = key not in self._refreshing and self._recent_failure(key, now) is None
+        if refresh:
+            self._refreshing.add(key)
+        return entry.value, refresh
+
+    def _recent_failure(self, key: Hashable, now: float) -> Optional[Exception]:
+        # caller holds self._lock
+        failure = self._failures.get(key)
+        if failure is None:
+            return None
+        if now >= failure[1]:
+            del self._failures[key]
+            return None
+        return failure[0]
+
+    def _last_good(self, key: Hashable, now: float) -> Any:
+        # caller holds self._lock
+        entry = self._entries.get(key)
+        if entry is None or now >= entry.keep_until:
+            return _MISSING
+        return entry.value
+
+    def _cached_failure(self, key: Hashable) -> Any:
+        """
+        On a miss: _MISSING if the loader should run; the last-known-good
+        value if a recent load failed; else re-raise that failure.
+        """
+        now = time.monotonic()
+        with self._lock:
+            error = self._recent_failure(key, now)
+            if error is None:
+                return _MISSING
+            value = self._last_good(key, now)
+            if value is _MISSING:
+                self._stats.fail_fast += 1
+            else:
+                self._stats.fallbacks += 1
+        if value is _MISSING:
+            raise error.with_traceback(None)
+        return value
+
+    def _failed(self, key: Hashable, error: Exception, fallback: bool = False) -> Any:
+        """
+        Remember a failed load. With fallback=True, returns the
+        last-known-good value to serve instead (or _MISSING).
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.negative_ttl > 0:
+                self._failures[key] = (error, now + self.negative_ttl)
+            if not fallback:
+                return _MISSING
+            value = self._last_good(key, now)
+            if value is not _MISSING:
+                self._stats.fallbacks += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        with self._lock:
+            stale_until = now + ttl + self.stale_ttl
+            self._entries[key] = _Entry(value, now + ttl, stale_until, stale_until + self.keep_ttl)
+            self._failures.pop(key, None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Current value (fresh or stale) without touching stats or LRU order."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry.stale_until:
+                return default
+            return entry.value
+
+    def peek_last(self, key: Hashable, default: Any = None) -> Any:
+        """Last stored value, even expired (within keep_ttl); no stats or LRU."""
+        with self._lock:
+            value = self._last_good(key, time.monotonic())
+            return default if value is _MISSING else value
+
+    def invalidate(self, key: Any = _MISSING) -> None:
+        with self._lock:
+            if key is _MISSING:
+                self._entries.clear()
+                self._failures.clear()
+            else:
+                self._entries.pop(key, None)
+                self._failures.pop(key, None)
+
+    def _load_fresh(self, key: Hashable, value: Any, ttl: TTL) -> Any:
+        self.put(key, value, _resolve(ttl))
+        with self._lock:
+            self._stats.refreshes += 1
+        return value
+
+    def _refreshed(self, key: Hashable, ok: bool) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+            self._stats.refreshes += 1
+            if not ok:
+                self._stats.refresh_errors += 1
+
+    # ---------- sync ----------
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: TTL = None, fresh: bool = False) -> Any:
+        """
+        Cached value for `key`; on a miss calls loader() inline.
+        A stale hit returns immediately and refreshes in the background.
+        fresh=True always loads (and stores) a new value.
+        """
+        if fresh:
+            try:
+                value = loader()
+            except Exception as e:
+                self._failed(key, e)
+                raise
+            return self._load_fresh(key, value, ttl)
+
+        with self._lock:
+            value, refresh = self._lookup(key)
+
+        if value is _MISSING:
+            value = self._cached_failure(key)
+            if value is not _MISSING:
+                return value
+            try:
+                value = loader()
+            except Exception as e:
+                value = self._failed(key, e, fallback=True)
+                if value is _MISSING:
+                    raise
+                return value
+            self.put(key, value, _resolve(ttl))
+            return value
+
+        if refresh:
+            _refresh_pool.submit(self._refresh, key, loader, ttl)
+        return value
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Any], ttl: TTL) -> None:
+        # Someone is already being served the stale value -> low priority
+        ok = False
+        try:
+            with background():
+                value = loader()
+            self.put(key, value, _resolve(ttl))
+            ok = True
+        except Exception as e:
+            print(f"[CACHE] {self.name}: background refresh failed for {key!r}: {describe_error(e)}")
+            self._failed(key, e)
+        finally:
+            # also on cancellation, or the key never refreshes again
+            self._refreshed(key, ok=ok)
+
+    # ---------- async ----------
+
+    async def aget_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: TTL = None,
+        fresh: bool = False,
+    ) -> Any:
+        """Async get_or_load(): background refreshes run as tasks on the current loop."""
+        if fresh:
+            try:
+                value = await loader()
+            except Exception as e:
+                self._failed(key, e)
+                raise
+            return self._load_fresh(key, value, ttl)
+
+        with self._lock:
+            value, refresh = self._lookup(key)
+
+        if value is _MISSING:
+            value = self._cached_failure(key)
+            if value is not _MISSING:
+                return value
+            try:
+                value = await loader()
+            except Exception as e:
+                value = self._failed(key, e, fallback=True)
+                if value is _MISSING:
+                    raise
+                return value
+            self.put(key, value, _resolve(ttl))
+            return value
+
+        if refresh:
+            task = asyncio.get_running_loop().create_task(self._arefresh(key, loader, ttl))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return value
+
+    async def _arefresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: TTL) -> None:
+        ok = False
+        try:
+            with background():
+                value = await loader()
+            self.put(key, value, _resolve(ttl))
+            ok = True
+        except Exception as e:
+            print(f"[CACHE] {self.name}: background refresh failed for {key!r}: {describe_error(e)}")
+            self._failed(key, e)
+        finally:
+            # also on cancellation, or the key never refreshes again
+            self._refreshed(key, ok=ok)
+
+    # ---------- stats ----------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats.hits + self._stats.misses + self._stats.stale
+            return {
+                **self._stats.as_dict(),
+                "hitRate": round((self._stats.hits + self._stats.stale) / lookups, 3) if lookups else None,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttlSeconds": self.ttl,
+                "staleSeconds": self.stale_ttl,
+                "negative": len(self._failures),
+            }
+
+
+def _resolve(ttl: TTL) -> Optional[float]:
+    return ttl() if callable(ttl) else ttl
+
+
+_registry: Dict[str, TTLCache] = {}
+
+
+def stats() -> Dict[str, Any]:
+    """Stats for every cache, keyed by cache name."""
+    return {name: cache.stats() for name, cache in _registry.items()}
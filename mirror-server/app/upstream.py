@@ -0,0 +1,451 @@
+# mirror-server/app/upstream.py
+
+"""
+Shared HTTP client for all upstream data providers.
+
+One requests.Session per provider (newsapi.org, finnhub.io, api-ninjas,
+openweathermap) keeps TCP + TLS connections alive between calls, which
+saves hundreds of ms per request on a Pi over Wi-Fi.
+
+- (connect, read) timeouts per provider
+- retry with exponential backoff + jitter on connection errors / 429 / 5xx
+- per-provider request, error, retry and latency counters
+- single-flight: identical concurrent GETs of the same priority share
+  one HTTP call
+- per-provider token bucket + daily quota (rate_limit.py); foreground
+  calls go ahead of background refreshes, excess calls are shed with
+  RateLimited instead of tripping a 429
+- per-provider circuit breaker (circuit_breaker.py): after repeated
+  timeouts / 5xx, calls fail fast with CircuitOpen until a probe succeeds
+
+get_json() is blocking (voice_zo.py, sync routes, threads);
+get_json_async() is the same thing on httpx for async route handlers,
+so a slow provider never stalls the uvicorn event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Hashable, Iterator, Optional, Tuple
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from .circuit_breaker import CircuitBreaker
+from .rate_limit import RateLimited, limiter, priority
+from .singleflight import SingleFlight
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+POOL_MAXSIZE = int(os.getenv("MAISON_UPSTREAM_POOL_SIZE", "8"))
+
+
+class UpstreamError(Exception):
+    pass
+
+
+@dataclass
+class ProviderSettings:
+    connect_timeout: float = 3.05
+    read_timeout: float = 10.0
+    retries: int = 2
+    backoff: float = 0.25      # first retry waits ~backoff s, then doubles
+    max_backoff: float = 2.0
+    max_concurrency: int = 0   # simultaneous requests in flight; 0 = unlimited
+    rate_per_minute: float = 0  # token refill rate; 0 = no rate limit
+    burst: int = 1              # bucket size; keep burst + rate_per_minute under the per-minute cap
+    daily_quota: int = 0        # calls per UTC day; 0 = unlimited
+    failure_threshold: int = 3  # consecutive failed calls that open the circuit
+    reset_timeout: float = 30.0  # seconds open before a probe call
+
+
+PROVIDERS: Dict[str, ProviderSettings] = {
+    # Free tier: 60 calls/min
+    "openweather": ProviderSettings(read_timeout=5.0, rate_per_minute=50, burst=10),
+    # Developer plan: 100 requests/day
+    "newsapi": ProviderSettings(daily_quota=100),
+    # Free tier: 30 calls/s, 60/min -- don't fan a watchlist out all at once
+    "finnhub": ProviderSettings(max_concurrency=4, rate_per_minute=50, burst=10),
+    # Free tier: 10k calls/month
+    "apininjas": ProviderSettings(daily_quota=300),
+}
+
+
+@dataclass
+class ProviderStats:
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    total_latency_ms: float = 0.0
+    last_latency_ms: float = 0.0
+    last_error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        ok = max(1, self.requests - self.errors)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avgLatencyMs": round(self.total_latency_ms / ok, 1),
+            "lastLatencyMs": round(self.last_latency_ms, 1),
+            "lastError": self.last_error,
+        }
+
+
+_lock = threading.Lock()
+_sessions: Dict[str, requests.Session] = {}
+_async_clients: Dict[str, httpx.AsyncClient] = {}
+_stats: Dict[str, ProviderStats] = {}
+_flight = SingleFlight()
+_limits: Dict[str, threading.BoundedSemaphore] = {}
+_async_limits: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def configure(provider: str, **overrides: Any) -> ProviderSettings:
+    """Tweak timeouts / retries for one provider, e.g. configure("finnhub", read_timeout=4)."""
+    settings = PROVIDERS.setdefault(provider, ProviderSettings())
+    for k, v in overrides.items():
+        setattr(settings, k, v)
+    return settings
+
+
+def _session(provider: str) -> requests.Session:
+    with _lock:
+        session = _sessions.get(provider)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[provider] = session
+        return session
+
+
+@contextmanager
+def _limit(provider: str, settings: ProviderSettings) -> Iterator[None]:
+    if settings.max_concurrency <= 0:
+        yield
+        return
+    with _lock:
+        sem = _limits.get(provider)
+        if sem is None:
+            sem = _limits[provider] = threading.BoundedSemaphore(settings.max_concurrency)
+    with sem:
+        yield
+
+
+def _async_limit(provider: str, settings: ProviderSettings):
+    if settings.max_concurrency <= 0:
+        return nullcontext()
+    # An asyncio.Semaphore binds to the loop it first waits on; one per loop.
+    loop = asyncio.get_running_loop()
+    entry = _async_limits.get(provider)
+    if entry is None or entry[0] is not loop:
+        entry = _async_limits[provider] = (loop, asyncio.Semaphore(settings.max_concurrency))
+    return entry[1]
+
+
+def _breaker(provider: str, settings: ProviderSettings) -> CircuitBreaker:
+    with _lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = _breakers[provider] = CircuitBreaker(
+                provider,
+                failure_threshold=settings.failure_threshold,
+                reset_timeout=settings.reset_timeout,
+            )
+        return breaker
+
+
+def _is_outage(e: Exception) -> bool:
+    """Timeouts, connection errors, 5xx and garbage bodies; not 4xx (our request was wrong)."""
+    response = getattr(e, "response", None)
+    status = getattr(response, "status_code", None)
+    return status is None or status >= 500
+
+
+# Request URLs carry API keys (token=, apiKey=, appid=)
+_QUERY_STRING = re.compile(r"\?[^\s'\"]*")
+
+
+def describe_error(e: BaseException) -> str:
+    """
+    Safe one-line description of an upstream failure for API responses,
+    logs and stats: "HTTP <status>" for status errors, otherwise the
+    message with any URL query string cut off.
+    """
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    if status is not None:
+        return f"HTTP {status}"
+    return _QUERY_STRING.sub("", str(e)).strip() or type(e).__name__
+
+
+def _failure_label(e: BaseException) -> str:
+    """Breaker lastError: exception type + status only (shown in /api/system/breakers)."""
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    return f"{type(e).__name__} (HTTP {status})" if status is not None else type(e).__name__
+
+
+def _record(provider: str, latency_ms: float, error: Optional[str] = None, retried: bool = False) -> None:
+    with _lock:
+        st = _stats.setdefault(provider, ProviderStats())
+        st.requests += 1
+        st.last_latency_ms = latency_ms
+        if error is None:
+            st.total_latency_ms += latency_ms
+        else:
+            st.errors += 1
+            st.last_error = error
+        if retried:
+            st.retries += 1
+
+
+def backoff_delay(settings: ProviderSettings, attempt: int) -> float:
+    base = min(settings.max_backoff, settings.backoff * (2 ** attempt))
+    return base * random.uniform(0.5, 1.5)
+
+
+def _flight_key(
+    provider: str,
+    url: str,
+    params: Optional[Dict[str, Any]],
+    headers: Optional[Dict[str, str]],
+) -> Hashable:
+    def freeze(d: Optional[Dict[str, Any]]) -> tuple:
+        return tuple(sorted((str(k), str(v)) for k, v in (d or {}).items()))
+
+    # Priority is part of the key: a foreground call joining a background
+    # leader would wait out the background token budget (up to
+    # BACKGROUND_MAX_WAIT) instead of going ahead of it.
+    return (provider, url, freeze(params), freeze(headers), priority())
+
+
+def get_json(
+    provider: str,
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> Any:
+    """
+    GET `url` through the provider's pooled session and return parsed JSON.
+    Concurrent identical calls are coalesced into one request.
+    Raises UpstreamError, RateLimited (shed by the limiter), CircuitOpen
+    (provider marked down), or requests.HTTPError for non-retryable statuses.
+    """
+    return _flight.do(
+        _flight_key(provider, url, params, headers),
+        lambda: _fetch_json(provider, url, params, headers),
+    )
+
+
+def _fetch_json(
+    provider: str,
+    url: str,
+    params: Optional[Dict[str, Any]],
+    headers: Optional[Dict[str, str]],
+) -> Any:
+    settings = PROVIDERS.get(provider) or ProviderSettings()
+    breaker = _breaker(provider, settings)
+    breaker.before_call()
+    try:
+        data = _request_json(provider, settings, url, params, headers)
+    except RateLimited:
+        breaker.cancel()
+        raise
+    except Exception as e:
+        if _is_outage(e):
+            breaker.failure(_failure_label(e))
+        else:
+            breaker.success()
+        raise
+    breaker.success()
+    return data
+
+
+def _request_json(
+    provider: str,
+    settings: ProviderSettings,
+    url: str,
+    params: Optional[Dict[str, Any]],
+    headers: Optional[Dict[str, str]],
+) -> Any:
+    session = _session(provider)
+    timeout = (settings.connect_timeout, settings.read_timeout)
+
+    attempt = 0
+    while True:
+        limiter.acquire(provider, settings)
+        start = time.perf_counter()
+        try:
+            with _limit(provider, settings):
+                resp = session.get(url, params=params, headers=headers, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            latency_ms = (time.perf_counter() - start) * 1000
+            if attempt < settings.retries:
+                _record(provider, latency_ms, error=type(e).__name__, retried=True)
+                time.sleep(backoff_delay(settings, attempt))
+                attempt += 1
+                continue
+            _record(provider, latency_ms, error=type(e).__name__)
+            raise UpstreamError(f"{provider}: {type(e).__name__}") from e
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        if resp.status_code == 429:
+            limiter.throttled(provider, settings, resp.headers.get("Retry-After"))
+
+        if resp.status_code in RETRY_STATUSES and attempt < settings.retries:
+            _record(provider, latency_ms, error=f"HTTP {resp.status_code}", retried=True)
+            resp.close()
+            time.sleep(backoff_delay(settings, attempt))
+            attempt += 1
+            continue
+
+        if resp.status_code >= 400:
+            _record(provider, latency_ms, error=f"HTTP {resp.status_code}")
+            resp.raise_for_status()
+
+        _record(provider, latency_ms)
+        return resp.json()
+
+
+def _async_client(provider: str, settings: ProviderSettings) -> httpx.AsyncClient:
+    # Only ever touched from the event loop thread -> no lock needed.
+    client = _async_clients.get(provider)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.read_timeout, connect=settings.connect_timeout),
+            limits=httpx.Limits(max_connections=POOL_MAXSIZE, max_keepalive_connections=POOL_MAXSIZE),
+        )
+        _async_clients[provider] = client
+    return client
+
+
+async def get_json_async(
+    provider: str,
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> Any:
+    """
+    Async twin of get_json(): same pooling, timeouts, retries, rate limits,
+    coalescing and counters.
+    Raises UpstreamError (or httpx.HTTPStatusError for non-retryable statuses).
+    """
+    return await _flight.do_async(
+        _flight_key(provider, url, params, headers),
+        lambda: _fetch_json_async(provider, url, params, headers),
+    )
+
+
+async def _fetch_json_async(
+    provider: str,
+    url: str,
+    params: Optional[Dict[str, Any]],
+    headers: Optional[Dict[str, str]],
+) -> Any:
+    settings = PROVIDERS.get(provider) or ProviderSettings()
+    breaker = _breaker(provider, settings)
+    breaker.before_call()
+    try:
+        data = await _request_json_async(provider, settings, url, params, headers)
+    except (RateLimited, asyncio.CancelledError):
+        breaker.cancel()
+        raise
+    except Exception as e:
+        if _is_outage(e):
+            breaker.failure(_failure_label(e))
+        else:
+            breaker.success()
+        raise
+    breaker.success()
+    return data
+
+
+async def _request_json_async(
+    provider: str,
+    settings: ProviderSettings,
+    url: str,
+    params: Optional[Dict[str, Any]],
+    headers: Optional[Dict[str, str]],
+) -> Any:
+    client = _async_client(provider, settings)
+
+    attempt = 0
+    while True:
+        await limiter.acquire_async(provider, settings)
+        start = time.perf_counter()
+        try:
+            async with _async_limit(provider, settings):
+                resp = await client.get(url, params=params, headers=headers)
+        except (httpx.TransportError, httpx.TimeoutException) as e:
+            latency_ms = (time.perf_counter() - start) * 1000
+            if attempt < settings.retries:
+                _record(provider, latency_ms, error=type(e).__name__, retried=True)
+                await asyncio.sleep(backoff_delay(settings, attempt))
+                attempt += 1
+                continue
+            _record(provider, latency_ms, error=type(e).__name__)
+            raise UpstreamError(f"{provider}: {type(e).__name__}") from e
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        if resp.status_code == 429:
+            limiter.throttled(provider, settings, resp.headers.get("Retry-After"))
+
+        if resp.status_code in RETRY_STATUSES and attempt < settings.retries:
+            _record(provider, latency_ms, error=f"HTTP {resp.status_code}", retried=True)
+            await asyncio.sleep(backoff_delay(settings, attempt))
+            attempt += 1
+            continue
+
+        if resp.status_code >= 400:
+            _record(provider, latency_ms, error=f"HTTP {resp.status_code}")
+            resp.raise_for_status()
+
+        _record(provider, latency_ms)
+        return resp.json()
+
+
+async def aclose() -> None:
+    """Close async clients (app shutdown)."""
+    clients = list(_async_clients.values())
+    _async_clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+def stats() -> Dict[str, Any]:
+    flight = _flight.stats()["groups"]
+    with _lock:
+        return {
+            name: {
+                **_stats.get(name, ProviderStats()).as_dict(),
+                "deduplicated": flight.get(name, {}).get("deduplicated", 0),
+                "connectTimeout": settings.connect_timeout,
+                "readTimeout": settings.read_timeout,
+                "retries": settings.retries,
+            }
+            for name, settings in PROVIDERS.items()
+        }
+
+
+def breaker_stats() -> Dict[str, Any]:
+    """Circuit breaker state per provider (closed / open / half_open)."""
+    return {name: _breaker(name, settings).as_dict() for name, settings in PROVIDERS.items()}
+
+
+def rate_limit_stats() -> Dict[str, Any]:
+    """Token buckets, today's quota use and shed counts per provider."""
+    return limiter.stats(PROVIDERS)
+
+
+def flight_stats() -> Dict[str, Any]:
+    """Single-flight counters: calls, executed, deduplicated per provider."""
+    return _flight.stats()
@@ -1,11 +1,17 @@
 # mirror-server/app/weather_service.py
 
 from typing import Dict, Any
-import requests
 from .config_store import get_api_key
+from . import upstream
+from .ttl_cache import TTLCache
 
 OPENWEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
 
+# OpenWeather current conditions update ~every 10 minutes
+CACHE_TTL_SECONDS = 10 * 60
+
+_cache = TTLCache("weather", ttl=CACHE_TTL_SECONDS, stale_ttl=30 * 60, maxsize=16)
+
 
 def _symbol_for_condition(main: str) -> str:
     main = (main or "").lower()
@@ -32,9 +38,44 @@ def _fallback_weather(reason: str) -> Dict[str, Any]:
         "temperatureF": 72.0,
         "weatherDescription": "Clear skies (fallback)",
         "symbol": "☀️",
+        "fallback": True,
+    }
+
+
+def is_fallback(data: Dict[str, Any]) -> bool:
+    """True for the placeholder served when there's no key or the API failed."""
+    return bool(data.get("fallback"))
+
+
+def _request_params(city: str, api_key: str) -> Dict[str, Any]:
+    return {
+        "q": city,
+        "appid": api_key,
+        "units": "imperial",  # ✅ get °F directly
     }
 
 
+def _parse_weather(data: Dict[str, Any]) -> Dict[str, Any]:
+    main = data.get("main", {})
+    weather_list = data.get("weather", [])
+    weather0 = weather_list[0] if weather_list else {}
+
+    temp_f = float(main.get("temp"))
+    description = weather0.get("description", "Unknown").capitalize()
+    condition_main = weather0.get("main", "")
+    symbol = _symbol_for_condition(condition_main)
+
+    return {
+        "temperatureF": round(temp_f, 1),
+        "weatherDescription": description,
+        "symbol": symbol,
+    }
+
+
+def _cache_key(city: str) -> str:
+    return (city or "").strip().lower()
+
+
 def get_weather_for_city(city: str) -> Dict[str, Any]:
     """
     Return weather dict for /weather endpoint AND Zo's weather context.
@@ -44,6 +85,7 @@ def get_weather_for_city(city: str) -> Dict[str, Any]:
           "temperatureF": float,
           "weatherDescription": str,
           "symbol": str,
+          "fallback": True,   # only on the placeholder, see is_fallback()
         }
     """
     api_key = get_api_key("OPENWEATHER_API_KEY")
@@ -51,30 +93,34 @@ def get_weather_for_city(city: str) -> Dict[str, Any]:
         # Fallback used when no API key configured
         return _fallback_weather("no OPENWEATHER_API_KEY set")
 
+    def load() -> Dict[str, Any]:
+        return _parse_weather(upstream.get_json("openweather", OPENWEATHER_URL, params=_request_params(city, api_key)))
+
     try:
-        params = {
-            "q": city,
-            "appid": api_key,
-            "units": "imperial",  # ✅ get °F directly
-        }
-        resp = requests.get(OPENWEATHER_URL, params=params, timeout=5)
-        resp.raise_for_status()
-        data = resp.json()
-
-        main = data.get("main", {})
-        weather_list = data.get("weather", [])
-        weather0 = weather_list[0] if weather_list else {}
-
-        temp_f = float(main.get("temp"))
-        description = weather0.get("description", "Unknown").capitalize()
-        condition_main = weather0.get("main", "")
-        symbol = _symbol_for_condition(condition_main)
-
-        return {
-            "temperatureF": round(temp_f, 1),
-            "weatherDescription": description,
-            "symbol": symbol,
-        }
+        return _cache.get_or_load(_cache_key(city), load)
     except Exception as e:
         # Log + fallback
-        return _fallback_weather(f"API error for {city}: {e}")
+        return _fallback_weather(f"API error for {city}: {upstream.describe_error(e)}")
+
+
+async def get_weather_for_city_async(city: str, fresh: bool = False, strict: bool = False) -> Dict[str, Any]:
+    """
+    Non-blocking get_weather_for_city() for async route handlers.
+    fresh=True skips the cache and strict=True raises instead of
+    returning the fallback (both used by the refresh scheduler).
+    """
+    api_key = get_api_key("OPENWEATHER_API_KEY")
+    if not api_key:
+        if strict:
+            raise RuntimeError("OPENWEATHER_API_KEY is not set")
+        return _fallback_weather("no OPENWEATHER_API_KEY set")
+
+    async def load() -> Dict[str, Any]:
+        return _parse_weather(await upstream.get_json_async("openweather", OPENWEATHER_URL, params=_request_params(city, api_key)))
+
+    try:
+        return await _cache.aget_or_load(_cache_key(city), load, fresh=fresh)
+    except Exception as e:
+        if strict:
+            raise
+        return _fallback_weather(f"API error for {city}: {upstream.describe_error(e)}")
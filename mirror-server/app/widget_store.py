@@ -2,6 +2,31 @@
 
 from typing import Dict, Any
 
+from . import change_feed
+
 # simple in-memory dict the backend + UI can share
 widget_state: Dict[str, Any] = {}
 
+# bumped on every change (long-poll ?since=)
+_version = 0
+
+
+def get_widget_state_version() -> int:
+    return _version
+
+
+def set_widget_state(widget: str, data: Any) -> None:
+    """Update one widget's ephemeral state and push it to the kiosk."""
+    global _version
+    widget_state[widget] = data
+    _version += 1
+    change_feed.publish("widget_state", {"widget": widget, "version": _version, "state": dict(widget_state)})
+
+
+def replace_widget_state(state: Dict[str, Any]) -> None:
+    """Swap in a whole widget_state (e.g. rollback of a failed action batch)."""
+    global _version
+    widget_state.clear()
+    widget_state.update(state)
+    _version += 1
+    change_feed.publish("widget_state", {"widget": None, "version": _version, "state": dict(widget_state)})
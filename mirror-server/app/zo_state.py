@@ -5,6 +5,8 @@ from threading import Lock
 from typing import Optional, Literal
 import time
 
+from . import change_feed
+
 
 ZoMode = Literal["idle", "listening", "thinking", "speaking"]
 
@@ -15,6 +17,7 @@ class ZoState:
   last_user: Optional[str] = None
   last_zo: Optional[str] = None
   updated_at: float = 0.0  # unix timestamp
+  version: int = 0  # bumped on every set_state (long-poll ?since=)
 
 
 _state = ZoState()
@@ -33,6 +36,14 @@ def set_state(mode: ZoMode,
       _state.last_zo = last_zo
     _state.mode = mode
     _state.updated_at = time.time()
+    _state.version += 1
+    snapshot = asdict(_state)
+  change_feed.publish("zo_state", snapshot)
+
+
+def get_version() -> int:
+  with _lock:
+    return _state.version
 
 
 def get_state() -> dict:
@@ -0,0 +1,42 @@
+"""
+Micro-benchmark: config_store.load_config() throughput, uncached vs cached.
+
+Usage (from mirror-server folder):
+    python scripts/bench_config_load.py [iterations]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import config_store  # noqa: E402
+
+
+def _run(n: int, invalidate: bool) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        if invalidate:
+            config_store.invalidate_config_cache()
+        config_store.load_config()
+    elapsed = time.perf_counter() - start
+    return n / elapsed
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    config_store.load_config()  # warm imports / page cache
+
+    before = _run(n, invalidate=True)
+    after = _run(n, invalidate=False)
+
+    print(f"config: {config_store.CONFIG_PATH}")
+    print(f"uncached (read + json.loads + validate): {before:>12,.0f} loads/s")
+    print(f"cached   (stat + compare):               {after:>12,.0f} loads/s")
+    print(f"speedup: {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
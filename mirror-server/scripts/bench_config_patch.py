@@ -0,0 +1,59 @@
+"""
+Micro-benchmark: validation cost per config patch.
+
+Compares the old path (model_dump -> edit -> MirrorConfig(**data)) with the
+incremental path used by PATCH /config and the actions modules (merge patch
+-> re-validate only the touched top-level fields).
+
+Usage (from mirror-server folder):
+    python scripts/bench_config_patch.py [iterations]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config_store import load_config  # noqa: E402
+from app.config_patch import apply_merge_patch, changed_fields, rebuild_config  # noqa: E402
+from app.models import MirrorConfig  # noqa: E402
+
+PATCHES = {
+    "widgets.news": {"widgets": {"news": False}},
+    "display.theme": {"display": {"theme": "maisonAzure"}},
+    "layouts.clock": {"layouts": {"clock": {"position": "topLeft", "size": "large"}}},
+}
+
+
+def _full(base: MirrorConfig, patch: dict) -> MirrorConfig:
+    data = apply_merge_patch(base.model_dump(), patch)
+    return MirrorConfig(**data)
+
+
+def _incremental(base: MirrorConfig, patch: dict) -> MirrorConfig:
+    before = base.model_dump()
+    data = apply_merge_patch(before, patch)
+    return rebuild_config(base, data, changed_fields(before, data))
+
+
+def _time(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    base = load_config()
+
+    print(f"{'patch':<16}{'full (us)':>12}{'incremental (us)':>20}{'speedup':>10}")
+    for name, patch in PATCHES.items():
+        full_us = _time(lambda: _full(base, patch), n)
+        inc_us = _time(lambda: _incremental(base, patch), n)
+        print(f"{name:<16}{full_us:>12.1f}{inc_us:>20.1f}{full_us / inc_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Benchmark: get_mirror_snapshot() latency against local stub upstreams.
+
+Starts a stub HTTP server that answers every provider after a
+per-provider delay (--weather, --news, --finnhub seconds), points the
+services at it and times snapshots for:
+
+  sequential  sections built one after another (the old snapshot shape)
+  parallel    snapshot engine, upstream sections built concurrently
+  stalled     parallel, no deadline, while news stalls for --stall seconds
+  deadline    same stall with --deadline; sections past the deadline are
+              served stale
+
+Every iteration starts with the provider caches cleared. The deadline
+case keeps the previous snapshot's sections (expired, not dropped) so
+it has something stale to serve, like a running server would.
+
+Usage (from mirror-server folder):
+    python scripts/bench_snapshot.py [--runs 30] [--deadline 1.0] [--stall 3]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Keep the benchmark's side effects out of the app folder
+_tmp = tempfile.mkdtemp(prefix="maison-bench-")
+os.environ["MAISON_REFRESH_SCHEDULER"] = "0"
+os.environ["MAISON_QUOTA_PATH"] = os.path.join(_tmp, "quota.json")
+os.environ["MAISON_CANDLE_DIR"] = os.path.join(_tmp, "candles")
+for key in ("OPENWEATHER_API_KEY", "NEWS_API_KEY", "FINNHUB_API_KEY"):
+    os.environ.setdefault(key, "bench")
+
+# One body every provider parser accepts
+STUB_BODY = (
+    b'{"main": {"temp": 70.0}, "weather": [{"main": "Clear", "description": "clear sky"}],'
+    b' "articles": [{"title": "Stub headline", "source": {"name": "Stub"}}],'
+    b' "c": 100.0, "dp": 1.0, "pc": 99.0, "s": "no_data"}'
+)
+
+# path prefix -> delay (s); mutable so a case can stall one provider
+DELAYS = {"/weather": 0.0, "/news": 0.0, "/finnhub": 0.0}
+
+
+def start_stub_upstream(port: int) -> ThreadingHTTPServer:
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):  # noqa: N802
+            for prefix, delay in DELAYS.items():
+                if self.path.startswith(prefix):
+                    time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(STUB_BODY)))
+            self.end_headers()
+            self.wfile.write(STUB_BODY)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def point_providers_at(base: str) -> None:
+    from app import services_news, services_stocks, upstream, weather_service
+
+    weather_service.OPENWEATHER_URL = f"{base}/weather"
+    services_news.NEWS_API_URL = f"{base}/news"
+    services_stocks.BASE = f"{base}/finnhub"
+    # Measure assembly, not the rate limiter / breaker
+    for name in upstream.PROVIDERS:
+        upstream.configure(name, retries=0, rate_per_minute=0, daily_quota=0, read_timeout=60)
+
+
+def clear_provider_caches() -> None:
+    from app import snapshot_engine, ttl_cache
+
+    for cache in ttl_cache._registry.values():
+        if cache is not snapshot_engine._cache:
+            cache.invalidate()
+
+
+def expire_sections() -> None:
+    """Expire every snapshot section but keep it as last-known-good."""
+    from app import snapshot_engine
+
+    cache = snapshot_engine._cache
+    with cache._lock:
+        for entry in cache._entries.values():
+            entry.expires_at = entry.stale_until = 0.0
+
+
+def sequential() -> None:
+    from app import snapshot_engine
+
+    for name in ("weather", "stock_quotes", "stock_history", "news", "today", "quotes"):
+        snapshot_engine.section(name)
+
+
+def run_case(name: str, fn, runs: int, cold_sections: bool) -> None:
+    from app import snapshot_engine
+
+    samples = []
+    stale = 0
+    for _ in range(runs):
+        clear_provider_caches()
+        if cold_sections:
+            snapshot_engine._cache.invalidate()
+        else:
+            expire_sections()
+        start = time.perf_counter()
+        snapshot = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+        if snapshot and any(w.get("stale") for w in snapshot["widgets"].values()):
+            stale += 1
+
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(
+        f"{name:<11} n={runs:<4} p50={statistics.median(samples):8.1f} ms  "
+        f"p99={p99:8.1f} ms  max={samples[-1]:8.1f} ms  stale snapshots={stale}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--weather", type=float, default=0.30, help="stub weather latency (s)")
+    parser.add_argument("--news", type=float, default=0.40, help="stub news latency (s)")
+    parser.add_argument("--finnhub", type=float, default=0.25, help="stub Finnhub latency (s)")
+    parser.add_argument("--deadline", type=float, default=1.0, help="snapshot deadline (s)")
+    parser.add_argument("--stall", type=float, default=3.0, help="news latency in the deadline case (s)")
+    parser.add_argument("--port", type=int, default=8913)
+    args = parser.parse_args()
+
+    DELAYS.update({"/weather": args.weather, "/news": args.news, "/finnhub": args.finnhub})
+    start_stub_upstream(args.port)
+    point_providers_at(f"http://127.0.0.1:{args.port}")
+
+    from app.maison_os.mirror_snapshot import get_mirror_snapshot
+
+    print(
+        f"stub latency: weather={args.weather}s news={args.news}s finnhub={args.finnhub}s, "
+        f"{args.runs} snapshots per case\n"
+    )
+    run_case("sequential", sequential, args.runs, cold_sections=True)
+    run_case("parallel", lambda: get_mirror_snapshot(deadline=None), args.runs, cold_sections=True)
+
+    # Warm once, then stall news past the deadline
+    get_mirror_snapshot(deadline=None)
+    DELAYS["/news"] = args.stall
+    run_case("stalled", lambda: get_mirror_snapshot(deadline=None), args.runs, cold_sections=False)
+    run_case("deadline", lambda: get_mirror_snapshot(deadline=args.deadline), args.runs, cold_sections=False)
+
+    from app import snapshot_engine
+    print(f"\nsnapshot engine: {snapshot_engine.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: /api/stocks/history payload size and CPU per format.
+
+Builds a synthetic watchlist of 1m candles (random walk) and encodes it
+the way the endpoint does, for:
+
+  points          original [{"t", "price"}, ...], every bar
+  points+lttb     same shape, downsampled to --width
+  columnar+lttb   {"t0", "dt": [...], "p": [...]}
+  columnar+f32    columnar, prices at float32 precision
+
+Reports JSON bytes, server encode time (shape + json.dumps) and client
+parse time (json.loads as a stand-in for JSON.parse).
+
+Usage (from mirror-server folder):
+    python scripts/bench_sparkline.py [--symbols 8] [--points 390] [--width 120]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import sparkline  # noqa: E402
+
+
+def make_series(n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    t = 1_717_000_000 + np.arange(n, dtype=np.int64) * 60
+    p = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.0008, n)))
+    return t, p
+
+
+def _time(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=8)
+    parser.add_argument("--points", type=int, default=390, help="bars per symbol (390 = one session of 1m)")
+    parser.add_argument("--width", type=int, default=120)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    series = {f"SYM{i}": make_series(args.points, i) for i in range(args.symbols)}
+
+    cases = {
+        "points": dict(width=None, fmt="points", precision="f64"),
+        "points+lttb": dict(width=args.width, fmt="points", precision="f64"),
+        "columnar+lttb": dict(width=args.width, fmt="columnar", precision="f64"),
+        "columnar+f32": dict(width=args.width, fmt="columnar", precision="f32"),
+    }
+
+    print(f"{args.symbols} symbols x {args.points} bars, width={args.width}\n")
+    print(f"{'format':<16}{'bytes':>10}{'vs points':>11}{'encode ms':>11}{'parse ms':>10}")
+
+    baseline = None
+    for name, opts in cases.items():
+        def build():
+            items = {sym: sparkline.encode(t, p, **opts) for sym, (t, p) in series.items()}
+            return json.dumps({"items": items}, separators=(",", ":"))
+
+        body = build()
+        encode_ms = _time(build, args.iterations)
+        parse_ms = _time(lambda: json.loads(body), args.iterations)
+        size = len(body.encode("utf-8"))
+        baseline = baseline or size
+        print(f"{name:<16}{size:>10}{size / baseline:>10.1%}{encode_ms:>11.3f}{parse_ms:>10.3f}")
+
+    # Shape check: LTTB keeps the extremes that naive striding can miss
+    t, p = series["SYM0"]
+    idx = sparkline.lttb_indices(t, p, args.width)
+    stride = np.linspace(0, len(p) - 1, args.width).astype(int)
+    print(
+        f"\nSYM0 range  full={np.ptp(p):.3f}  lttb={np.ptp(p[idx]):.3f}  "
+        f"every-nth={np.ptp(p[stride]):.3f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Load test: do saturated providers starve the cheap kiosk endpoints?
+
+Starts a stub upstream that answers every provider (weather, news,
+Finnhub) after --delay seconds, keeps the data caches cold, and fires
+--concurrency concurrent /api/mirror/snapshot requests in a loop. While
+that runs, /config (async) and /os/mode (sync, shared anyio pool) are
+sampled and their latency reported, for:
+
+  before: snapshot as a plain sync route on FastAPI's shared thread pool
+  after:  the real /api/mirror/snapshot on the upstream bulkhead
+          (excess requests get 503 + Retry-After)
+
+Usage (from mirror-server folder):
+    python scripts/loadtest_bulkheads.py [--delay 2] [--concurrency 64] [--duration 6]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Keep the test's side effects out of the app folder
+_tmp = tempfile.mkdtemp(prefix="maison-loadtest-")
+os.environ["MAISON_REFRESH_SCHEDULER"] = "0"
+os.environ["MAISON_QUOTA_PATH"] = os.path.join(_tmp, "quota.json")
+os.environ["MAISON_CANDLE_DIR"] = os.path.join(_tmp, "candles")
+for key in ("OPENWEATHER_API_KEY", "NEWS_API_KEY", "FINNHUB_API_KEY"):
+    os.environ.setdefault(key, "loadtest")
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+# One body every provider parser accepts
+STUB_BODY = (
+    b'{"main": {"temp": 70.0}, "weather": [{"main": "Clear", "description": "clear sky"}],'
+    b' "articles": [], "c": 100.0, "dp": 1.0, "pc": 99.0, "s": "no_data"}'
+)
+
+
+def start_stub_upstream(delay: float, port: int) -> ThreadingHTTPServer:
+    class SlowHandler(BaseHTTPRequestHandler):
+        def do_GET(self):  # noqa: N802
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(STUB_BODY)))
+            self.end_headers()
+            self.wfile.write(STUB_BODY)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), SlowHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def point_providers_at(base: str) -> None:
+    from app import services_news, services_stocks, upstream, weather_service
+
+    weather_service.OPENWEATHER_URL = f"{base}/weather"
+    services_news.NEWS_API_URL = f"{base}/news"
+    services_stocks.BASE = base
+    # Measure thread starvation, not the rate limiter / breaker shedding load
+    for name in upstream.PROVIDERS:
+        upstream.configure(name, retries=0, rate_per_minute=0, daily_quota=0, read_timeout=60)
+
+
+def keep_caches_cold(stop: threading.Event) -> None:
+    from app import ttl_cache
+
+    while not stop.is_set():
+        for cache in ttl_cache._registry.values():
+            cache.invalidate()
+        time.sleep(0.1)
+
+
+def start_app(port: int) -> uvicorn.Server:
+    from app.main import app
+    from app.maison_os.mirror_snapshot import get_mirror_snapshot
+
+    # "before": the original handler shape, a sync route on the shared pool
+    def snapshot_threadpool():
+        return get_mirror_snapshot()
+
+    app.add_api_route("/bench/snapshot-threadpool", snapshot_threadpool, methods=["GET"])
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def run_case(base: str, path: str, concurrency: int, duration: float):
+    latencies = {"/config": [], "/os/mode": []}
+    statuses: Counter = Counter()
+    deadline = time.perf_counter() + duration
+
+    limits = httpx.Limits(max_connections=concurrency + 4)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+
+        async def load() -> None:
+            while time.perf_counter() < deadline:
+                try:
+                    resp = await client.get(f"{base}{path}")
+                    statuses[resp.status_code] += 1
+                    if resp.status_code == 503:
+                        # Well-behaved client: back off as told
+                        retry_after = float(resp.headers.get("Retry-After", "1"))
+                        await asyncio.sleep(min(retry_after, max(0.0, deadline - time.perf_counter())))
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+
+        workers = [asyncio.create_task(load()) for _ in range(concurrency)]
+        await asyncio.sleep(0.5)  # let the pools fill up
+
+        async with httpx.AsyncClient(timeout=120) as probe:
+            while time.perf_counter() < deadline:
+                for endpoint, samples in latencies.items():
+                    start = time.perf_counter()
+                    await probe.get(f"{base}{endpoint}")
+                    samples.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0.05)
+
+        await asyncio.gather(*workers)
+    return latencies, statuses
+
+
+def report(name: str, latencies: dict, statuses: Counter) -> None:
+    for endpoint, samples in latencies.items():
+        samples = sorted(samples)
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        print(
+            f"{name:<8} {endpoint:<10} n={len(samples):<4} "
+            f"p50={statistics.median(samples):8.1f} ms  p99={p99:8.1f} ms  max={samples[-1]:8.1f} ms"
+        )
+    print(f"{'':<8} snapshot responses: {dict(statuses)}\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--delay", type=float, default=2.0, help="stub upstream latency (s)")
+    parser.add_argument("--concurrency", type=int, default=64, help="concurrent snapshot clients")
+    parser.add_argument("--duration", type=float, default=6.0, help="seconds per case")
+    parser.add_argument("--upstream-port", type=int, default=8911)
+    parser.add_argument("--app-port", type=int, default=8912)
+    args = parser.parse_args()
+
+    start_stub_upstream(args.delay, args.upstream_port)
+    point_providers_at(f"http://127.0.0.1:{args.upstream_port}")
+    start_app(args.app_port)
+    base = f"http://127.0.0.1:{args.app_port}"
+
+    stop = threading.Event()
+    threading.Thread(target=keep_caches_cold, args=(stop,), daemon=True).start()
+
+    print(f"stub upstream delay={args.delay}s, {args.concurrency} snapshot clients, {args.duration}s per case\n")
+    report("before", *asyncio.run(run_case(base, "/bench/snapshot-threadpool", args.concurrency, args.duration)))
+    report("after", *asyncio.run(run_case(base, "/api/mirror/snapshot", args.concurrency, args.duration)))
+    stop.set()
+
+    from app import bulkhead
+    print(f"bulkheads: {bulkhead.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Load test: does a slow upstream stall the event loop?
+
+Starts a stub "Finnhub" that takes --delay seconds per request, points
+services_stocks at it, and runs the FastAPI app in-process. While a burst of
+concurrent stock-quote requests is in flight, /zo/state is sampled and its
+latency reported, for:
+
+  before: the old handler shape (blocking fetch inside `async def`)
+  after:  the real /api/stocks/quotes (async upstream client)
+
+Usage (from mirror-server folder):
+    python scripts/loadtest_slow_upstream.py [--delay 2] [--concurrency 8]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+
+def start_stub_upstream(delay: float, port: int) -> ThreadingHTTPServer:
+    class SlowHandler(BaseHTTPRequestHandler):
+        def do_GET(self):  # noqa: N802
+            time.sleep(delay)
+            body = b'{"c": 100.0, "dp": 1.0, "pc": 99.0}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_app(port: int) -> uvicorn.Server:
+    from app.main import app
+    from app.services_stocks import fetch_stock_quotes
+
+    # "before": the original handler shape — blocking call inside async def
+    async def blocking_quotes(symbols: str):
+        return {"items": fetch_stock_quotes(symbols.split(","))}
+
+    app.add_api_route("/bench/blocking-quotes", blocking_quotes, methods=["GET"])
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def run_case(base: str, path: str, concurrency: int, delay: float) -> list:
+    latencies = []
+    async with httpx.AsyncClient(timeout=60) as client:
+        burst = [
+            asyncio.create_task(client.get(f"{base}{path}", params={"symbols": f"SYM{i}"}))
+            for i in range(concurrency)
+        ]
+        deadline = time.perf_counter() + delay * 1.5
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await client.get(f"{base}/zo/state")
+            latencies.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(0.05)
+        await asyncio.gather(*burst)
+    return latencies
+
+
+def report(name: str, samples: list) -> None:
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(
+        f"{name:<8} /zo/state  n={len(samples):<4} "
+        f"p50={statistics.median(samples):8.1f} ms  p99={p99:8.1f} ms  max={samples[-1]:8.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--delay", type=float, default=2.0, help="stub upstream latency (s)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--upstream-port", type=int, default=8901)
+    parser.add_argument("--app-port", type=int, default=8902)
+    args = parser.parse_args()
+
+    os.environ.setdefault("FINNHUB_API_KEY", "loadtest")
+    start_stub_upstream(args.delay, args.upstream_port)
+
+    from app import services_stocks, upstream
+    services_stocks.BASE = f"http://127.0.0.1:{args.upstream_port}"
+    upstream.configure("finnhub", retries=0, read_timeout=args.delay + 5)
+
+    start_app(args.app_port)
+    base = f"http://127.0.0.1:{args.app_port}"
+
+    print(f"stub upstream delay={args.delay}s, {args.concurrency} concurrent quote requests\n")
+    report("before", asyncio.run(run_case(base, "/bench/blocking-quotes", args.concurrency, args.delay)))
+    report("after", asyncio.run(run_case(base, "/api/stocks/quotes", args.concurrency, args.delay)))
+
+
+if __name__ == "__main__":
+    main()
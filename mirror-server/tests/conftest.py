@@ -0,0 +1,20 @@
+# mirror-server/tests/conftest.py
+
+"""
+Run from the mirror-server folder:  python -m pytest -q
+
+Keeps side effects (quota file, candle store, background refresh jobs)
+out of the app folder.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_tmp = tempfile.mkdtemp(prefix="maison-tests-")
+os.environ.setdefault("MAISON_REFRESH_SCHEDULER", "0")
+os.environ.setdefault("MAISON_QUOTA_PATH", os.path.join(_tmp, "quota.json"))
+os.environ.setdefault("MAISON_CANDLE_DIR", os.path.join(_tmp, "candles"))
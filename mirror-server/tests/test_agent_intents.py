@@ -0,0 +1,72 @@
+# mirror-server/tests/test_agent_intents.py
+
+import pytest
+
+from app.maison_os import agent
+from app.snapshot_engine import SNAPSHOT_DEADLINE_SECONDS
+from app.maison_os.agent import MaisonAgent, _mentioned_symbols
+
+WATCHLIST = ["NVDA", "AAPL", "SPY", "NOW", "IT"]
+
+
+@pytest.fixture
+def mirror_agent(monkeypatch):
+    monkeypatch.setattr(agent, "_watchlist", lambda: list(WATCHLIST))
+    return MaisonAgent()
+
+
+def _intent(mirror_agent, text):
+    return mirror_agent._detect_data_intent(text.lower(), text)
+
+
+@pytest.mark.parametrize("text", [
+    "read me the quote about metaphors",
+    "what's in the pineapple news",
+    "is it going to rain now",
+    "it is cold now, isn't it",
+    "I had an apple for lunch",
+    "let me google it",
+    "tell me about the amazon rainforest",
+    "that's so meta",
+])
+def test_everyday_words_are_not_symbols(text):
+    assert _mentioned_symbols(text, WATCHLIST) == []
+
+
+def test_quote_and_weather_questions_keep_their_intent(mirror_agent):
+    assert _intent(mirror_agent, "read the quote about metaphors") == "quote_reading"
+    assert _intent(mirror_agent, "is it going to rain now") == "weather_summary"
+    assert _intent(mirror_agent, "any pineapple news") == "news_summary"
+    assert _intent(mirror_agent, "I had an apple, is it cold out") == "weather_summary"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("how is meta stock doing", ["META"]),
+    ("how is Meta doing", ["META"]),
+    ("apple shares today", ["AAPL"]),
+    ("how did Apple do this week", ["AAPL"]),
+    ("how's NOW doing", ["NOW"]),
+    ("what's $now at", ["NOW"]),
+    ("price of now stock", ["NOW"]),
+    ("how is tsla doing", ["TSLA"]),
+])
+def test_real_symbol_mentions(text, expected):
+    assert _mentioned_symbols(text, WATCHLIST) == expected
+
+
+def test_ticker_question_routes_to_stocks(mirror_agent):
+    assert _intent(mirror_agent, "how's NOW doing") == "stocks_summary"
+    assert _intent(mirror_agent, "how did nvidia do this month") == "stocks_analytics"
+
+
+def test_voice_answers_wait_past_the_kiosk_deadline(mirror_agent, monkeypatch):
+    calls = []
+
+    def snapshot(include=None, deadline=None):
+        calls.append(deadline)
+        return {"widgets": {"weather": {"enabled": True, "temperatureF": 70.0, "description": "Clear"}}}
+
+    monkeypatch.setattr(agent, "get_mirror_snapshot", snapshot)
+    assert "70" in mirror_agent._answer_with_snapshot("how's the weather", "weather_summary")
+    assert calls == [agent.VOICE_SNAPSHOT_DEADLINE_SECONDS]
+    assert agent.VOICE_SNAPSHOT_DEADLINE_SECONDS > SNAPSHOT_DEADLINE_SECONDS
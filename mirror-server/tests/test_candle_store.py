@@ -0,0 +1,66 @@
+# mirror-server/tests/test_candle_store.py
+
+import numpy as np
+
+from app import candle_store
+from app.candle_store import Candles, CandleStore
+
+T0 = 1_700_000_000
+
+
+def bars(start, n, price=100.0):
+    t = np.arange(T0 + start * 60, T0 + (start + n) * 60, 60, dtype=np.int64)
+    c = price + np.arange(start, start + n, dtype=np.float64)
+    return Candles(t=t, o=c, h=c, l=c, c=c, v=np.ones(n))
+
+
+def test_incremental_merges_append_instead_of_rewriting(tmp_path):
+    store = CandleStore(tmp_path)
+    store.merge("MSFT", "1", bars(0, 1000), covered_from=T0)
+    assert store.saves == 1  # first backfill writes the base
+
+    full = store.bytes_written
+    for i in range(1000, 1010):
+        store.merge("MSFT", "1", bars(i - 1, 2))  # re-fetch the last bar + one new
+    assert store.saves == 1
+    assert store.appends == 10
+    assert store.bytes_written - full == 10 * candle_store.LOG_RECORD.itemsize
+
+    reloaded = CandleStore(tmp_path).get("MSFT", "1")
+    assert np.array_equal(reloaded.t, store.get("MSFT", "1").t)
+    assert np.array_equal(reloaded.c, store.get("MSFT", "1").c)
+
+
+def test_updated_bar_wins_on_replay(tmp_path):
+    store = CandleStore(tmp_path)
+    store.merge("MSFT", "1", bars(0, 5), covered_from=T0)
+    store.merge("MSFT", "1", bars(4, 1, price=1.0))
+    store.merge("MSFT", "1", bars(4, 1, price=2.0))
+
+    assert CandleStore(tmp_path).get("MSFT", "1").c[-1] == bars(4, 1, price=2.0).c[0]
+
+
+def test_log_is_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, "COMPACT_AFTER_BARS", 5)
+    store = CandleStore(tmp_path)
+    store.merge("MSFT", "1", bars(0, 3), covered_from=T0)
+    for i in range(3, 10):
+        store.merge("MSFT", "1", bars(i, 1))
+
+    assert store.saves == 2
+    log = tmp_path / "MSFT_1.bars"
+    assert log.stat().st_size < 5 * candle_store.LOG_RECORD.itemsize
+    assert len(CandleStore(tmp_path).get("MSFT", "1")) == 10
+
+
+def test_torn_record_is_dropped(tmp_path):
+    store = CandleStore(tmp_path)
+    store.merge("MSFT", "1", bars(0, 3), covered_from=T0)
+    store.merge("MSFT", "1", bars(3, 1))
+    log = tmp_path / "MSFT_1.bars"
+    with open(log, "ab") as f:
+        f.write(b"\0" * 7)
+
+    reloaded = CandleStore(tmp_path)
+    assert len(reloaded.get("MSFT", "1")) == 4
+    assert log.stat().st_size == candle_store.LOG_RECORD.itemsize
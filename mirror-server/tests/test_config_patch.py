@@ -0,0 +1,45 @@
+# mirror-server/tests/test_config_patch.py
+
+import pytest
+
+from app.config_patch import ConfigPatchError, apply_json_patch, make_json_patch
+
+DOC = {"display": {"theme": "maisonAzure"}, "widgets": {"news": True, "stocks": False}}
+
+
+@pytest.mark.parametrize("kind", ["move", "copy"])
+def test_move_or_copy_without_from_is_a_patch_error(kind):
+    with pytest.raises(ConfigPatchError):
+        apply_json_patch(DOC, [{"op": kind, "path": "/widgets/clock"}])
+
+
+def test_move_and_copy_with_from():
+    out = apply_json_patch(DOC, [
+        {"op": "copy", "from": "/widgets/news", "path": "/widgets/clock"},
+        {"op": "move", "from": "/widgets/stocks", "path": "/widgets/quotes"},
+    ])
+    assert out["widgets"] == {"news": True, "clock": True, "quotes": False}
+
+
+def test_patch_without_from_returns_400():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    resp = TestClient(app).patch("/config", json=[{"op": "move", "path": "/widgets/news"}])
+    assert resp.status_code == 400
+
+
+def test_make_json_patch_round_trips():
+    after = {"display": {"theme": "maisonNoir"}, "widgets": {"news": False}, "os_mode": "focus"}
+    assert apply_json_patch(DOC, make_json_patch(DOC, after)) == after
+
+
+@pytest.mark.parametrize("value", [[], "x", 1, None])
+def test_patch_replacing_the_root_with_a_non_object_returns_400(value):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    resp = TestClient(app).patch("/config", json=[{"op": "replace", "path": "", "value": value}])
+    assert resp.status_code == 400
@@ -0,0 +1,77 @@
+# mirror-server/tests/test_config_store.py
+
+import shutil
+
+import pytest
+
+from app import config_store, persistence
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    shutil.copy(config_store.CONFIG_PATH, path)
+    monkeypatch.setattr(config_store, "CONFIG_PATH", path)
+    monkeypatch.setattr(config_store, "_cached_cfg", None)
+    monkeypatch.setattr(config_store, "_cached_key", None)
+    monkeypatch.setattr(config_store, "_dirty", False)
+    return path
+
+
+def test_failed_write_falls_back_to_disk(config_file, monkeypatch):
+    def broken_write(path, data):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(persistence, "atomic_write_bytes", broken_write)
+
+    before = config_store.load_config()
+    version = config_store.get_config_version()
+    changed = before.model_copy(update={"os_mode": "focus" if before.os_mode != "focus" else "default"})
+    config_store.save_config(changed)
+    assert config_store.load_config().os_mode == changed.os_mode
+
+    config_store.flush_config()
+
+    assert config_store._dirty is False
+    assert config_store.load_config().os_mode == before.os_mode
+    # save + revert are both visible to version watchers
+    assert config_store.get_config_version() == version + 2
+
+
+def test_successful_write_reaches_disk(config_file):
+    before = config_store.load_config()
+    changed = before.model_copy(update={"os_mode": "focus" if before.os_mode != "focus" else "default"})
+    config_store.save_config(changed)
+    config_store.flush_config()
+
+    assert config_store._dirty is False
+    config_store.invalidate_config_cache()
+    assert config_store.load_config().os_mode == changed.os_mode
+
+
+def test_external_edit_bumps_version_and_wakes_long_poll(config_file):
+    import asyncio
+    import json
+
+    from app import change_feed, main
+
+    config_store.load_config()
+    version = config_store.get_config_version()
+    raw = json.loads(config_file.read_text())
+    raw["os_mode"] = "focus" if raw.get("os_mode") != "focus" else "default"
+
+    async def scenario():
+        async def edit_later():
+            await asyncio.sleep(0.1)
+            config_file.write_text(json.dumps(raw, indent=4))
+
+        cursor = change_feed.feed.last_id
+        edit = asyncio.ensure_future(edit_later())
+        got = await main._wait_for_change(config_store.get_config_version, version, 5, poll=0.05)
+        await edit
+        return got, change_feed.feed.events_after(cursor)
+
+    got, events = asyncio.run(scenario())
+    assert got == version + 1
+    assert config_store.load_config().os_mode == raw["os_mode"]
+    assert [e.topic for e in events] == ["config"]
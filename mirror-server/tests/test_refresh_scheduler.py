@@ -0,0 +1,21 @@
+# mirror-server/tests/test_refresh_scheduler.py
+
+import asyncio
+
+import pytest
+
+from app import refresh_scheduler, upstream, weather_service
+
+
+def test_weather_job_fails_when_the_fetch_fails(monkeypatch):
+    async def broken(*args, **kwargs):
+        raise RuntimeError("openweather down")
+
+    monkeypatch.setattr(weather_service, "get_api_key", lambda name: "test-key")
+    monkeypatch.setattr(upstream, "get_json_async", broken)
+
+    with pytest.raises(RuntimeError, match="openweather down"):
+        asyncio.run(refresh_scheduler._refresh_weather("Testville"))
+    # request handlers still get the fallback
+    data = asyncio.run(weather_service.get_weather_for_city_async("Testville", fresh=True))
+    assert weather_service.is_fallback(data)
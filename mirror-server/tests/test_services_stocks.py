@@ -0,0 +1,85 @@
+# mirror-server/tests/test_services_stocks.py
+
+import httpx
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+from app import main, services_stocks, upstream
+
+SECRET = "sekrit-finnhub-key"
+
+
+def _status_error(url, params):
+    request = httpx.Request("GET", url, params=params)
+    response = httpx.Response(500, request=request)
+    return httpx.HTTPStatusError(f"Server error '500' for url '{request.url}'", request=request, response=response)
+
+
+def _fail_finnhub(monkeypatch):
+    async def fail_async(provider, url, params=None, headers=None):
+        raise _status_error(url, params)
+
+    def fail(provider, url, params=None, headers=None):
+        raise _status_error(url, params)
+
+    monkeypatch.setattr(services_stocks, "get_api_key", lambda name: SECRET)
+    monkeypatch.setattr(upstream, "get_json_async", fail_async)
+    monkeypatch.setattr(upstream, "get_json", fail)
+    services_stocks._quote_cache.invalidate()
+    services_stocks._history_cache.invalidate()
+
+
+def test_quote_errors_do_not_leak_the_api_key(monkeypatch, capsys):
+    _fail_finnhub(monkeypatch)
+
+    resp = TestClient(main.app).get("/api/stocks/quotes", params={"symbols": "MSFT"})
+    assert resp.status_code == 200
+    assert resp.json()["errors"] == {"MSFT": "HTTP 500"}
+    assert SECRET not in resp.text
+    assert SECRET not in capsys.readouterr().out
+
+
+def test_history_errors_do_not_leak_the_api_key(monkeypatch, capsys):
+    _fail_finnhub(monkeypatch)
+
+    resp = TestClient(main.app).get("/api/stocks/history", params={"symbols": "MSFT"})
+    assert resp.json()["errors"] == {"MSFT": "HTTP 500"}
+    assert SECRET not in resp.text
+    assert SECRET not in str(services_stocks.fetch_stock_history_batch(["MSFT"]))
+    assert SECRET not in capsys.readouterr().out
+
+
+def test_describe_error_drops_query_strings():
+    e = requests.ConnectionError(f"Max retries exceeded with url: /api/v1/quote?symbol=MSFT&token={SECRET} (Caused by x)")
+    assert SECRET not in upstream.describe_error(e)
+    assert upstream.describe_error(_status_error("https://finnhub.io/api/v1/quote", {"token": SECRET})) == "HTTP 500"
+
+
+def test_is_degraded():
+    assert services_stocks.is_degraded({"items": [{"symbol": "MSFT", "price": None}], "errors": {}})
+    assert services_stocks.is_degraded({"items": {"MSFT": None}, "errors": {}})
+    assert services_stocks.is_degraded({"items": {"MSFT": {"t0": 1, "dt": [], "p": []}}, "errors": {"MSFT": "HTTP 500"}})
+    assert not services_stocks.is_degraded({"items": [{"symbol": "MSFT", "price": 1.0}], "errors": {}})
+    assert not services_stocks.is_degraded({"items": {"MSFT": [{"t": 1, "price": 1.0}]}, "errors": {}})
+    assert not services_stocks.is_degraded({"items": {"MSFT": {"t0": 1, "dt": [60], "p": [1.0, 2.0]}}, "errors": {}})
+
+
+@pytest.mark.parametrize("fmt", ["points", "columnar"])
+def test_healthy_history_is_cached_until_the_next_refresh(monkeypatch, fmt):
+    import numpy as np
+
+    from app.candle_store import Candles
+
+    t = np.arange(1_700_000_000, 1_700_000_000 + 10 * 86400, 86400, dtype=np.int64)
+    c = np.linspace(100.0, 110.0, len(t))
+    candles = Candles(t=t, o=c, h=c, l=c, c=c, v=np.ones(len(t)))
+
+    async def history(sym, points, resolution="D", fresh=False):
+        return candles
+
+    monkeypatch.setattr(services_stocks, "_fetch_history_async", history)
+    resp = TestClient(main.app).get("/api/stocks/history", params={"symbols": "MSFT", "format": fmt})
+    assert resp.json()["errors"] == {}
+    max_age = int(resp.headers["Cache-Control"].split("max-age=")[1].split(",")[0])
+    assert max_age > services_stocks.RETRY_SECONDS
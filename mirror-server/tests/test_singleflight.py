@@ -0,0 +1,54 @@
+# mirror-server/tests/test_singleflight.py
+
+import asyncio
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+        runs = 0
+
+        async def fetch():
+            nonlocal runs
+            runs += 1
+            await release.wait()
+            return {"value": 42}
+
+        leader = asyncio.create_task(flight.do_async(("test", "k"), fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do_async(("test", "k"), fetch))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+        release.set()
+        assert await follower == {"value": 42}
+        assert runs == 1
+        assert flight.stats()["inflight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_async_failure_reaches_followers():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def boom():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream down")
+
+        results = await asyncio.gather(
+            flight.do_async(("test", "k"), boom),
+            flight.do_async(("test", "k"), boom),
+            return_exceptions=True,
+        )
+        assert all(isinstance(r, ValueError) for r in results)
+
+    asyncio.run(scenario())
@@ -0,0 +1,34 @@
+# mirror-server/tests/test_snapshot_engine.py
+
+import dataclasses
+import threading
+import time
+
+from app import snapshot_engine
+from app.config_store import load_config
+
+
+def test_deadline_bounds_config_sections(monkeypatch):
+    release = threading.Event()
+    slow_threads = []
+
+    def slow_display(cfg):
+        slow_threads.append(threading.current_thread())
+        release.wait(5)
+        return {"theme": "slow"}
+
+    spec = dataclasses.replace(snapshot_engine.SECTIONS["display"], build=slow_display)
+    monkeypatch.setitem(snapshot_engine.SECTIONS, "display", spec)
+    snapshot_engine._cache.invalidate()
+    cfg = load_config()
+
+    start = time.monotonic()
+    late = snapshot_engine.sections(["display", "today"], cfg, deadline=0.1)
+    assert time.monotonic() - start < 1.0
+    assert late["display"] == {"stale": True}
+    assert isinstance(late["today"], list)
+    assert slow_threads and slow_threads[0] is not threading.current_thread()
+
+    release.set()
+    assert snapshot_engine.sections(["display"], cfg)["display"] == {"theme": "slow"}
+    snapshot_engine._cache.invalidate()
@@ -0,0 +1,37 @@
+# mirror-server/tests/test_ttl_cache.py
+
+import asyncio
+
+from app.ttl_cache import TTLCache
+
+
+def test_cancelled_async_refresh_can_run_again():
+    cache = TTLCache("test-arefresh", ttl=0.01, stale_ttl=60)
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(60)
+
+        async def value():
+            return 2
+
+        cache.put("k", 1)
+        await asyncio.sleep(0.02)  # stale now
+
+        assert await cache.aget_or_load("k", hang) == 1
+        await started.wait()
+        for task in list(cache._tasks):
+            task.cancel()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert "k" not in cache._refreshing
+
+        assert await cache.aget_or_load("k", value) == 1
+        for task in list(cache._tasks):
+            await task
+        assert await cache.aget_or_load("k", value) == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,74 @@
+# mirror-server/tests/test_upstream.py
+
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+from app import main, upstream
+
+SECRET = "sekrit-appid"
+
+
+def test_breaker_errors_do_not_leak_query_strings(monkeypatch, capsys):
+    url = "https://api.example.test/data"
+
+    def fail(provider, settings, url, params, headers):
+        response = requests.Response()
+        response.status_code = 503
+        response.url = f"{url}?q=x&appid={params['appid']}"
+        raise requests.HTTPError(f"503 Server Error for url: {response.url}", response=response)
+
+    monkeypatch.setattr(upstream, "_request_json", fail)
+    upstream.configure("leaktest", failure_threshold=1)
+    with pytest.raises(requests.HTTPError):
+        upstream.get_json("leaktest", url, params={"q": "x", "appid": SECRET})
+
+    body = TestClient(main.app).get("/api/system/breakers").text
+    assert "HTTPError (HTTP 503)" in body
+    assert SECRET not in body
+    assert SECRET not in capsys.readouterr().out
+
+
+def test_transport_errors_are_wrapped_without_the_url(monkeypatch):
+    class Session:
+        def get(self, url, params=None, headers=None, timeout=None):
+            raise requests.ConnectionError(f"Max retries exceeded with url: /data?appid={SECRET}")
+
+    monkeypatch.setattr(upstream, "_session", lambda provider: Session())
+    upstream.configure("leaktest2", retries=0)
+    with pytest.raises(upstream.UpstreamError) as info:
+        upstream.get_json("leaktest2", "https://api.example.test/data", params={"appid": SECRET})
+    assert SECRET not in str(info.value)
+    assert SECRET not in str(upstream.breaker_stats())
+
+
+def test_foreground_call_does_not_join_a_background_flight(monkeypatch):
+    import threading
+
+    from app.rate_limit import background
+
+    release = threading.Event()
+    calls = []
+
+    def fetch(provider, url, params, headers):
+        calls.append(upstream.priority())
+        if len(calls) == 1:
+            release.wait(5)
+        return {"n": len(calls)}
+
+    monkeypatch.setattr(upstream, "_fetch_json", fetch)
+
+    def refresh():
+        with background():
+            upstream.get_json("flighttest", "https://api.example.test/q")
+
+    leader = threading.Thread(target=refresh)
+    leader.start()
+    while not calls:
+        pass
+
+    # Doesn't block behind the background leader
+    assert upstream.get_json("flighttest", "https://api.example.test/q") == {"n": 2}
+    release.set()
+    leader.join()
+    assert calls == ["background", "foreground"]
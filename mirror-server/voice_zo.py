@@ -24,7 +24,7 @@ from app.config_store import load_config, get_api_key
 from app.context_manager import build_context
 from app.maison_os.mirror_snapshot import get_mirror_snapshot
 from app.maison_os.agent import build_data_grounded_system_prompt, plan_ui_actions
-from app.actions import execute_action
+from app.actions import execute_actions
 
 
 # ---------- OpenAI client ----------
@@ -147,8 +147,7 @@ def _try_handle_ui_command(user_text: str) -> str | None:
     if response is None or not actions:
         return None
 
-    for a in actions:
-        execute_action(a["type"], a.get("payload", {}))
+    execute_actions(actions)
 
     return response
 